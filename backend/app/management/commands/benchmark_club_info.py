@@ -0,0 +1,63 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.test2 import EmailGenerator
+from app.services.llmUsage import LLMUsageTracker
+
+
+class Command(BaseCommand):
+    help = "Compare LLM calls, tokens and latency of the club info extraction modes (uses live APIs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', nargs='+', default=['per_question', 'batched'])
+        parser.add_argument('--runs', type=int, default=1)
+        parser.add_argument('--sponsorship-packet', default='./data/sponsorShipPacket.pdf')
+        parser.add_argument('--fdp', default='./data/fdp.pdf')
+        parser.add_argument('--email-template', default='./data/emailTemplates.txt')
+        parser.add_argument('--output', help="Optional path for a JSON copy of the results")
+
+    def handle(self, *args, **options):
+        generator = EmailGenerator()
+        club_retriever, _ = generator.load_club_context(
+            sponsorship_packet_path=options['sponsorship_packet'],
+            fdp_path=options['fdp'],
+            email_template_path=options['email_template']
+        )
+
+        tracker = LLMUsageTracker()
+        generator.llm.callbacks = [tracker]
+        generator.chat.enabled = False
+
+        results = []
+        for mode in options['modes']:
+            for run in range(options['runs']):
+                tracker.reset()
+                start_time = time.time()
+                # No ClubInfoCache here so every run pays the full extraction cost
+                club_info = generator.extract_club_info(club_retriever, mode=mode)
+                wall_seconds = time.time() - start_time
+
+                failed = sum(1 for a in club_info.values() if a.startswith("Information unavailable"))
+                results.append({
+                    'mode': mode,
+                    'run': run + 1,
+                    'wall_seconds': round(wall_seconds, 2),
+                    'questions': len(club_info),
+                    'failed_answers': failed,
+                    'answer_chars': sum(len(a) for a in club_info.values()),
+                    **tracker.summary()
+                })
+
+        self.stdout.write("\nmode            run  wall(s)  llm calls  prompt tok  output tok  failed")
+        for r in results:
+            self.stdout.write(
+                f"{r['mode']:<15} {r['run']:>3}  {r['wall_seconds']:>7}  {r['llm_calls']:>9}  "
+                f"{r['prompt_tokens']:>10}  {r['completion_tokens']:>10}  {r['failed_answers']:>6}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import random
+import shutil
+import resource
+import tempfile
+import subprocess
+from collections import defaultdict
+from typing import Dict, List
+
+from django.core.management.base import BaseCommand
+
+from app.test2 import EmailGenerator, GEMINI_MODEL, EMBEDDING_MODEL
+from app.services.concurrency import llm_limiter, search_limiter
+from app.services.generateEmails import GenerateEmails
+from app.services.llmCache import estimate_tokens
+from app.services.llmUsage import LLMUsageTracker
+from app.services.providers import build_generative_model, build_providers
+from app.services.vectorIndex import unload_indexes
+
+SCENARIOS = ['cold', 'warm', 'mixed', 'discovery']
+
+# backend/data; the fixtures are small stand-ins for the club documents, shared with the tests
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "data"))
+
+DISCOVERY_PARAMS = {
+    'industry': 'Aerospace',
+    'size': 'Large',
+    'sector': 'Private',
+    'location': 'United States',
+    'details': 'Interested in student engineering teams'
+}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    """Linearly interpolated percentile of values (pct in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _rss_mb() -> float:
+    """Current resident memory. ru_maxrss (the process high-water mark, KB on Linux) only
+    rises across scenarios, so it is just the fallback where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * resource.getpagesize() / (1024.0 * 1024.0), 1)
+    except (OSError, IndexError, ValueError):
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _lift(limiter) -> None:
+    limiter.rate = 1e6
+    limiter.capacity = 10 ** 6
+    limiter.tokens = float(limiter.capacity)
+
+
+class _CountingModel:
+    """Wraps the generative model GenerateEmails uses to count calls and prompt tokens."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def generate_content(self, prompt, generation_config=None):
+        self.calls += 1
+        self.prompt_tokens += estimate_tokens(prompt)
+        return self.model.generate_content(prompt, generation_config=generation_config)
+
+
+class _Workbench:
+    """An EmailGenerator on fake providers with an isolated cache dir, plus its call counters."""
+
+    def __init__(self):
+        # Stores loaded by an earlier workbench would serve this one's lookups from its cache
+        unload_indexes()
+        self.cache_dir = tempfile.mkdtemp(prefix="hypermail-bench-")
+        self.providers = build_providers(
+            mode="fake",
+            llm_model=GEMINI_MODEL,
+            embedding_model=EMBEDDING_MODEL,
+            cache_root=self.cache_dir
+        )
+        self.generator = EmailGenerator(self.providers)
+        self.tracker = LLMUsageTracker()
+        self.generator.llm.callbacks = [self.tracker]
+        self.seen = set()
+
+    def counters(self) -> Dict[str, int]:
+        return {
+            'llm_calls': self.providers.llm.behaviour.calls,
+            'search_calls': self.providers.search.behaviour.calls,
+            'embedding_calls': self.providers.embeddings.behaviour.calls,
+            'llm_cache_hits': self.generator.chat.stats()['hits'],
+            'search_cache_hits': self.generator.search.stats()['hits'],
+            'embedding_cache_hits': self.generator.embeddings.stats()['hits'],
+        }
+
+    def run(self, company_name: str, paths: Dict[str, str]) -> Dict:
+        before = self.counters()
+        self.tracker.reset()
+        steps, failed = {}, []
+
+        def on_event(event):
+            if event['event'] == 'finished':
+                steps[event['step']] = event['seconds']
+            elif event['event'] == 'failed':
+                failed.append(event['step'])
+
+        start_time = time.time()
+        self.generator.relationship_intelligence_workflow(company_name, on_event=on_event, **paths)
+        wall_seconds = time.time() - start_time
+
+        after = self.counters()
+        usage = self.tracker.summary()
+        result = {
+            'company': company_name,
+            'cache': 'warm' if company_name in self.seen else 'cold',
+            'wall_seconds': round(wall_seconds, 3),
+            'steps': steps,
+            'failed_steps': failed,
+            **{name: after[name] - before[name] for name in after},
+            'prompt_tokens': usage['prompt_tokens'],
+            'completion_tokens': usage['completion_tokens'],
+            'llm_errors': usage['llm_errors'],
+            'rss_mb': _rss_mb()
+        }
+        self.seen.add(company_name)
+        return result
+
+    def close(self, keep: bool) -> None:
+        unload_indexes()
+        if not keep:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def _summarize(runs: List[Dict], rss_before: float) -> Dict:
+    # A run that failed a step stops early, so its time would drag the percentiles down
+    walls = [r['wall_seconds'] for r in runs if not r.get('failed_steps')]
+    step_times = defaultdict(list)
+    for r in runs:
+        for step, seconds in r.get('steps', {}).items():
+            step_times[step].append(seconds)
+
+    counted = ['llm_calls', 'search_calls', 'embedding_calls', 'prompt_tokens']
+    return {
+        'runs': len(runs),
+        'p50_seconds': round(_percentile(walls, 50), 3),
+        'p95_seconds': round(_percentile(walls, 95), 3),
+        'steps_p50_seconds': {step: round(_percentile(t, 50), 3) for step, t in step_times.items()},
+        **{f"mean_{name}": round(sum(r.get(name, 0) for r in runs) / len(runs), 1) for name in counted},
+        'failed_runs': sum(1 for r in runs if r.get('failed_steps')),
+        'rss_mb': max(r['rss_mb'] for r in runs),
+        # Memory the scenario left resident, relative to just before it started
+        'rss_delta_mb': round(runs[-1]['rss_mb'] - rss_before, 1)
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark relationship_intelligence_workflow and company discovery against fake providers "
+        "with simulated latency, over cold, warm and mixed cache scenarios. No API calls are made."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--runs', type=int, default=5, help="Measured runs per scenario")
+        parser.add_argument('--companies', nargs='+', default=['SpaceX', 'Boeing', 'Lockheed Martin', 'Tesla'])
+        parser.add_argument('--sponsorship-packet', default=os.path.join(DATA_DIR, 'fixtures', 'sponsorship.txt'))
+        parser.add_argument('--fdp', default=os.path.join(DATA_DIR, 'fixtures', 'fdp.txt'))
+        parser.add_argument('--email-template', default=os.path.join(DATA_DIR, 'emailTemplates.txt'))
+        parser.add_argument('--llm-latency-ms', type=float, default=float(os.environ.get("FAKE_LLM_LATENCY_MS", "1200")))
+        parser.add_argument('--search-latency-ms', type=float, default=float(os.environ.get("FAKE_SEARCH_LATENCY_MS", "400")))
+        parser.add_argument('--embedding-latency-ms', type=float, default=float(os.environ.get("FAKE_EMBEDDING_LATENCY_MS", "150")))
+        parser.add_argument('--latency-sigma', type=float, default=0.5,
+                            help="Lognormal spread of every simulated latency (0 = fixed)")
+        parser.add_argument('--error-rate', type=float, default=0.0,
+                            help="Share of simulated LLM and search calls that fail with a retryable error")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--with-quota', action='store_true',
+                            help="Keep the Gemini/Search rate limiters (by default they are lifted so "
+                                 "results reflect the pipeline rather than the configured quota)")
+        parser.add_argument('--keep-cache', action='store_true', help="Leave the temporary cache dirs in place")
+        parser.add_argument('--output', help="Path for the JSON results (default benchmarks/workflow-<commit>.json)")
+
+    def _configure(self, options) -> None:
+        for prefix, latency in [("FAKE_LLM", options['llm_latency_ms']),
+                                ("FAKE_SEARCH", options['search_latency_ms']),
+                                ("FAKE_EMBEDDING", options['embedding_latency_ms'])]:
+            os.environ[f"{prefix}_LATENCY_MS"] = str(latency)
+            os.environ[f"{prefix}_LATENCY_SIGMA"] = str(options['latency_sigma'])
+        for prefix in ["FAKE_LLM", "FAKE_SEARCH"]:
+            os.environ[f"{prefix}_ERROR_RATE"] = str(options['error_rate'])
+        os.environ["FAKE_SEED"] = str(options['seed'])
+        if not options['with_quota']:
+            _lift(llm_limiter)
+            _lift(search_limiter)
+
+    def _workflow_scenario(self, scenario: str, options, paths: Dict[str, str]) -> List[Dict]:
+        companies, runs, keep = options['companies'], options['runs'], options['keep_cache']
+        results = []
+
+        if scenario == 'cold':
+            # A fresh generator and cache dir per run, so every cache starts empty
+            for run in range(runs):
+                bench = _Workbench()
+                try:
+                    results.append({'run': run + 1, **bench.run(companies[run % len(companies)], paths)})
+                finally:
+                    bench.close(keep)
+            return results
+
+        bench = _Workbench()
+        try:
+            if scenario == 'warm':
+                # Prime every company once, then measure repeats against the populated caches
+                for company_name in companies:
+                    bench.run(company_name, paths)
+                sequence = [companies[run % len(companies)] for run in range(runs)]
+            else:
+                # Shared caches with a seeded mix of repeat and first-time companies
+                rng = random.Random(options['seed'])
+                sequence = [rng.choice(companies) for _ in range(runs)]
+
+            for run, company_name in enumerate(sequence):
+                results.append({'run': run + 1, **bench.run(company_name, paths)})
+        finally:
+            bench.close(keep)
+        return results
+
+    def _discovery_scenario(self, options) -> List[Dict]:
+        model = _CountingModel(build_generative_model(mode="fake"))
+        generator = GenerateEmails(model=model)
+        results = []
+        for run in range(options['runs']):
+            calls, prompt_tokens = model.calls, model.prompt_tokens
+            start_time = time.time()
+            companies = generator.generateEmails(DISCOVERY_PARAMS)['companies']
+            results.append({
+                'run': run + 1,
+                'wall_seconds': round(time.time() - start_time, 3),
+                'companies': len(companies),
+                'llm_calls': model.calls - calls,
+                'search_calls': 0,
+                'embedding_calls': 0,
+                'prompt_tokens': model.prompt_tokens - prompt_tokens,
+                'rss_mb': _rss_mb()
+            })
+        return results
+
+    def handle(self, *args, **options):
+        self._configure(options)
+        paths = {
+            'sponsorship_packet_path': options['sponsorship_packet'],
+            'fdp_path': options['fdp'],
+            'email_template_path': options['email_template']
+        }
+
+        report = {
+            'commit': _commit(),
+            'created_at': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            'config': {k: options[k] for k in [
+                'runs', 'companies', 'llm_latency_ms', 'search_latency_ms', 'embedding_latency_ms',
+                'latency_sigma', 'error_rate', 'seed', 'with_quota'
+            ]},
+            'scenarios': {}
+        }
+
+        for scenario in options['scenarios']:
+            self.stdout.write(f"\n=== Scenario: {scenario} ===")
+            rss_before = _rss_mb()
+            if scenario == 'discovery':
+                runs = self._discovery_scenario(options)
+            else:
+                runs = self._workflow_scenario(scenario, options, paths)
+            report['scenarios'][scenario] = {'summary': _summarize(runs, rss_before), 'runs': runs}
+
+        self.stdout.write("\nscenario    runs  p50(s)  p95(s)  llm calls  searches  embeddings  prompt tok  rss(MB)  Δrss(MB)  failed")
+        for scenario, data in report['scenarios'].items():
+            s = data['summary']
+            self.stdout.write(
+                f"{scenario:<10} {s['runs']:>5}  {s['p50_seconds']:>6}  {s['p95_seconds']:>6}  "
+                f"{s['mean_llm_calls']:>9}  {s['mean_search_calls']:>8}  {s['mean_embedding_calls']:>10}  "
+                f"{s['mean_prompt_tokens']:>10}  {s['rss_mb']:>7}  {s['rss_delta_mb']:>8}  {s['failed_runs']:>6}"
+            )
+
+        output = options['output'] or os.path.join("benchmarks", f"workflow-{report['commit']}.json")
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
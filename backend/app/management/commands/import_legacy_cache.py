@@ -0,0 +1,144 @@
+import os
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from app.services.cacheStore import CacheStore, cache_backend_name, company_key
+from app.services.fileCache import cache_dir
+from app.services.freshness import max_age
+from app.services.llmCache import LLM_CACHE_TTL, LLM_CACHE_TTL_POLICIES
+from app.services.searchCache import SEARCH_CACHE_TTL
+
+# Hand-built per-company files (cache/<prefix>_<name>.json) and the namespace each moves to
+COMPANY_FILE_PREFIXES = {
+    'company': 'company',
+    'contacts': 'contacts',
+    'partnership': 'partnership',
+    'culture': 'culture',
+}
+
+# Directories of bare JSON values written by the caches before the unified store
+NAMESPACE_DIRS = ['llm', 'search', 'embeddings', 'club_info']
+
+
+def _legacy_company_name(slug: str) -> str:
+    # The old files replaced spaces with underscores and lowercased the rest
+    return slug.replace('_', ' ').strip()
+
+
+def _parse_timestamp(value, fallback: float) -> float:
+    try:
+        return time.mktime(time.strptime(value, '%Y-%m-%d %H:%M:%S'))
+    except (TypeError, ValueError):
+        return fallback
+
+
+def _namespace_ttl(namespace: str, value) -> int:
+    if namespace == 'llm':
+        return LLM_CACHE_TTL_POLICIES.get(value.get('site'), LLM_CACHE_TTL)
+    if namespace == 'search':
+        return SEARCH_CACHE_TTL
+    return 0
+
+
+class Command(BaseCommand):
+    help = "Import the JSON files under the old cache directory into the configured cache backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=os.path.join(os.getcwd(), "cache"),
+                            help="Directory holding the old cache files (default ./cache)")
+        parser.add_argument('--delete', action='store_true', help="Remove each legacy file once imported")
+        parser.add_argument('--dry-run', action='store_true')
+
+    def _store(self, store: CacheStore, key: str, value, stored_at: float, ttl=None, dry_run=False) -> bool:
+        existing = store.get_entry(key)
+        if existing is not None and existing['stored_at'] >= stored_at:
+            return False
+        if not dry_run:
+            store.set(key, value, ttl=ttl, stored_at=stored_at)
+        return True
+
+    def _import_company_files(self, source: str, options) -> dict:
+        counts = {'imported': 0, 'skipped': 0, 'failed': 0}
+        stores = {
+            prefix: CacheStore(namespace, ttl=max_age(namespace))
+            for prefix, namespace in COMPANY_FILE_PREFIXES.items()
+        }
+
+        for filename in sorted(os.listdir(source)):
+            path = os.path.join(source, filename)
+            prefix, _, rest = filename.partition('_')
+            if prefix not in stores or not rest.endswith('.json') or not os.path.isfile(path):
+                continue
+            company_name = _legacy_company_name(rest[:-len('.json')])
+            try:
+                with open(path, 'r') as f:
+                    value = json.load(f)
+                value.setdefault('company_name', company_name)
+                stored_at = _parse_timestamp(value.get('timestamp'), os.path.getmtime(path))
+                imported = self._store(stores[prefix], company_key(company_name), value, stored_at,
+                                       dry_run=options['dry_run'])
+            except Exception as e:
+                counts['failed'] += 1
+                self.stderr.write(f"  ❌ {filename}: {str(e)}")
+                continue
+
+            counts['imported' if imported else 'skipped'] += 1
+            self.stdout.write(f"  {'✓' if imported else '-'} {filename} -> {stores[prefix].namespace}/{company_name}")
+            if imported and options['delete'] and not options['dry_run']:
+                os.remove(path)
+        return counts
+
+    def _import_namespace_dirs(self, source: str, options) -> dict:
+        counts = {'imported': 0, 'skipped': 0, 'failed': 0}
+        for namespace in NAMESPACE_DIRS:
+            directory = os.path.join(source, namespace)
+            if not os.path.isdir(directory):
+                continue
+            store = CacheStore(namespace)
+            imported_before = counts['imported']
+            for filename in os.listdir(directory):
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    with open(path, 'r') as f:
+                        value = json.load(f)
+                    if isinstance(value, dict) and 'format' in value and 'value' in value:
+                        value = value['value']
+                    stored_at = os.path.getmtime(path)
+                    if isinstance(value, dict):
+                        stored_at = value.get('cached_at') or value.get('fetched_at') or stored_at
+                    imported = self._store(store, filename[:-len('.json')], value, stored_at,
+                                           ttl=_namespace_ttl(namespace, value), dry_run=options['dry_run'])
+                except Exception as e:
+                    counts['failed'] += 1
+                    self.stderr.write(f"  ❌ {namespace}/{filename}: {str(e)}")
+                    continue
+                counts['imported' if imported else 'skipped'] += 1
+            self.stdout.write(f"  {namespace}: {counts['imported'] - imported_before} imported")
+        return counts
+
+    def handle(self, *args, **options):
+        source = os.path.abspath(options['source'])
+        if not os.path.isdir(source):
+            self.stderr.write(f"No cache directory at {source}")
+            return
+
+        backend = cache_backend_name()
+        self.stdout.write(f"Importing {source} into the {backend} cache backend...")
+        results = {'company files': self._import_company_files(source, options)}
+
+        # The file backend already reads these directories in place when they are its own root
+        if backend != "file" or os.path.abspath(cache_dir()) != source:
+            results['cache namespaces'] = self._import_namespace_dirs(source, options)
+
+        for label, counts in results.items():
+            self.stdout.write(
+                f"{label}: {counts['imported']} imported, {counts['skipped']} already current, {counts['failed']} failed"
+            )
+        if options['dry_run']:
+            self.stdout.write("Dry run: nothing was written")
+        else:
+            self.stdout.write(self.style.SUCCESS("Import finished"))
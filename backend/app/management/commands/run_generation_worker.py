@@ -0,0 +1,47 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from app.services.generationJobs import claim_next_job, run_job, worker_name
+from app.services.warmState import start_preload
+
+
+class Command(BaseCommand):
+    help = "Run queued email generation jobs from the GenerationJob table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=int(os.environ.get('GENERATION_WORKER_CONCURRENCY', '2')),
+            help="Jobs this process runs at once"
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help="Seconds to wait before polling again when the queue is empty"
+        )
+        parser.add_argument('--no-preload', action='store_true', help="Build clients lazily on the first job")
+
+    def handle(self, *args, **options):
+        concurrency = options['concurrency']
+        name = worker_name()
+        if not options['no_preload']:
+            start_preload()
+
+        self.stdout.write(f"Generation worker {name} running {concurrency} job(s) at a time")
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="generation") as executor:
+            while True:
+                running = {future for future in running if not future.done()}
+                if len(running) >= concurrency:
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                job = claim_next_job(name)
+                if job is None:
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(f"Claimed job {job.id} for {job.company_name}")
+                running.add(executor.submit(run_job, job))
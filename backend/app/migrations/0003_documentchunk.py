@@ -0,0 +1,35 @@
+import django.utils.timezone
+import pgvector.django
+from django.db import migrations, models
+
+from app.models import EMBEDDING_DIMENSIONS
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_company_contact_person_company_description'),
+    ]
+
+    operations = [
+        pgvector.django.VectorExtension(),
+        migrations.CreateModel(
+            name='DocumentChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('corpus', models.CharField(max_length=64)),
+                ('index_key', models.CharField(max_length=64)),
+                ('position', models.IntegerField()),
+                ('content', models.TextField()),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('embedding', pgvector.django.VectorField(dimensions=EMBEDDING_DIMENSIONS)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['corpus', 'index_key'], name='documentchunk_corpus_key_idx'),
+                    pgvector.django.HnswIndex(ef_construction=64, fields=['embedding'], m=16, name='documentchunk_embedding_hnsw', opclasses=['vector_cosine_ops']),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_documentchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='title',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='body_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='parsed',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='analysis',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='analyzed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
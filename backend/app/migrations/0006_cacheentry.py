@@ -0,0 +1,30 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_generationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('namespace', models.CharField(max_length=128)),
+                ('key', models.CharField(max_length=128)),
+                ('value', models.JSONField()),
+                ('stored_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('namespace', 'key'), name='cacheentry_namespace_key_uniq')],
+                'indexes': [
+                    models.Index(fields=['namespace', 'stored_at'], name='cacheentry_stored_idx'),
+                    models.Index(fields=['expires_at'], name='cacheentry_expires_idx'),
+                ],
+            },
+        ),
+    ]
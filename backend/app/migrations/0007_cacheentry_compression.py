@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_cacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cacheentry',
+            name='codec',
+            field=models.CharField(default='json', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='cacheentry',
+            name='payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='cacheentry',
+            name='value',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
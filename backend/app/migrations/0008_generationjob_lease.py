@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_cacheentry_compression'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_generationjob_lease'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='generationjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='partial_result',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='generationjob',
+            name='cancel_requested',
+            field=models.BooleanField(default=False),
+        ),
+    ]
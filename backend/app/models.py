@@ -1,6 +1,13 @@
+import uuid
+
 from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
+from pgvector.django import VectorField, HnswIndex
+
+# Dimensions of the vectors returned by models/embedding-001; the fake embeddings and
+# migration 0003 use this too
+EMBEDDING_DIMENSIONS = 768
 
 #  Stores company information with a constraint that either email or website must exist
 class Company(models.Model):
@@ -62,6 +69,13 @@ class Template(models.Model):
     type = models.CharField(max_length=10, choices=TEMPLATE_TYPES)
     created_at = models.DateTimeField(default=timezone.now)
     
+    # Parsed structure and LLM analysis, reused until the body changes
+    title = models.TextField(blank=True, null=True)
+    body_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    parsed = models.JSONField(blank=True, null=True)
+    analysis = models.TextField(blank=True, null=True)
+    analyzed_at = models.DateTimeField(blank=True, null=True)
+    
     def __str__(self):
         return f"{self.subject[:30]} ({self.type})"
 
@@ -101,4 +115,87 @@ class Prompt(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     
     def __str__(self):
-        return f"{self.text[:50]} ({self.type})"
\ No newline at end of file
+        return f"{self.text[:50]} ({self.type})"
+
+# Stores embedded chunks of club documents so every worker can share one similarity index
+class DocumentChunk(models.Model):
+    corpus = models.CharField(max_length=64)  # e.g. "club" or "email_templates"
+    index_key = models.CharField(max_length=64)  # hash of source documents + embedding settings
+    position = models.IntegerField()
+    content = models.TextField()
+    metadata = models.JSONField(default=dict, blank=True)
+    embedding = VectorField(dimensions=EMBEDDING_DIMENSIONS)
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.corpus} chunk {self.position} ({self.index_key[:8]})"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['corpus', 'index_key'], name='documentchunk_corpus_key_idx'),
+            HnswIndex(
+                name='documentchunk_embedding_hnsw',
+                fields=['embedding'],
+                m=16,
+                ef_construction=64,
+                opclasses=['vector_cosine_ops']
+            ),
+        ]
+
+
+# Background email generation requests, claimed and run by the generation worker
+class GenerationJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    company_name = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    current_step = models.CharField(max_length=64, blank=True, null=True)
+    progress = models.JSONField(default=list, blank=True)  # workflow step events in order
+    result = models.TextField(blank=True, null=True)
+    partial_result = models.TextField(blank=True, null=True)  # the email streamed so far
+    error = models.TextField(blank=True, null=True)
+    cancel_requested = models.BooleanField(default=False)
+    worker = models.CharField(max_length=128, blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    heartbeat_at = models.DateTimeField(blank=True, null=True)  # lease kept by the running worker
+    attempts = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.company_name} ({self.status})"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='generationjob_status_idx'),
+        ]
+
+
+# Shared cache entries for the "postgres" cache backend (see services/cacheStore.py)
+class CacheEntry(models.Model):
+    namespace = models.CharField(max_length=128)
+    key = models.CharField(max_length=128)
+    codec = models.CharField(max_length=8, default='json')  # "json" rows keep an uncompressed value
+    payload = models.BinaryField(blank=True, null=True)  # compressed JSON, see services/cacheStore.py
+    value = models.JSONField(blank=True, null=True)
+    stored_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(blank=True, null=True)
+    
+    def __str__(self):
+        return f"{self.namespace}/{self.key[:12]}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['namespace', 'key'], name='cacheentry_namespace_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['namespace', 'stored_at'], name='cacheentry_stored_idx'),
+            models.Index(fields=['expires_at'], name='cacheentry_expires_idx'),
+        ]
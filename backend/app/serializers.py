@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Company, Template, Email, Prompt
+from .models import Company, Template, Email, Prompt, GenerationJob
 
 # Basic Serializers
 
@@ -56,6 +56,20 @@ class PromptSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class GenerationJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for background email generation jobs.
+    Everything except company_name is set by the worker.
+    """
+    class Meta:
+        model = GenerationJob
+        fields = "__all__"
+        read_only_fields = [
+            'id', 'status', 'current_step', 'progress', 'result', 'partial_result', 'error',
+            'cancel_requested', 'worker', 'created_at', 'started_at', 'heartbeat_at', 'attempts', 'finished_at'
+        ]
+
+
 # Detailed Serializers with Nested Relationships
 
 class EmailDetailSerializer(serializers.ModelSerializer):
@@ -0,0 +1,549 @@
+import os
+import re
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .fileCache import JsonFileCache, atomic_write, cache_dir, env_setting, file_lock
+
+try:
+    import zstandard
+except ImportError:
+    # gzip is always available; install zstandard for faster, smaller entries
+    zstandard = None
+
+DAY = 24 * 3600
+
+# Entries older than this (seconds) are treated as missing; None keeps them until evicted
+# The per-company research namespaces (company, contacts, ...) take theirs from
+# freshness.FRESHNESS_POLICIES, which also decides when they are refreshed
+CACHE_TTL_POLICIES = {
+    'inflight': 3600,
+    # Content addressed, so an entry can never go stale
+    'embeddings': None,
+    'club_info': None,
+}
+
+# Most entries a namespace keeps; the least recently written are evicted beyond this
+CACHE_MAX_ENTRIES = {
+    'embeddings': 200000,
+    'blobs': 200000,
+    'llm': 50000,
+    'search': 50000,
+    'inflight': 1000,
+}
+CACHE_DEFAULT_MAX_ENTRIES = int(os.environ.get("CACHE_DEFAULT_MAX_ENTRIES", "20000"))
+
+# A namespace is checked for expired and excess entries once every this many writes per worker
+CACHE_EVICT_EVERY = int(os.environ.get("CACHE_EVICT_EVERY", "200"))
+
+CACHE_BACKENDS = ["file", "sqlite", "postgres"]
+
+# Marks values written by CacheStore, as opposed to bare values left by the old JsonFileCache users
+ENTRY_FORMAT = 1
+
+# Strings at least this long are stored once in the blob namespace and referenced by hash
+CACHE_BLOB_MIN_CHARS = int(os.environ.get("CACHE_BLOB_MIN_CHARS", "512"))
+CACHE_ZSTD_LEVEL = int(os.environ.get("CACHE_ZSTD_LEVEL", "6"))
+
+BLOB_NAMESPACE = "blobs"
+BLOB_REF = "$blob"
+
+# "json" marks an uncompressed entry written before compression was added
+CODECS = ["zstd", "gzip", "none", "json"]
+
+
+def cache_backend_name() -> str:
+    return env_setting("CACHE_BACKEND", "file").lower()
+
+
+def compression_codec() -> str:
+    codec = env_setting("CACHE_COMPRESSION", "zstd").lower()
+    return "gzip" if codec == "zstd" and zstandard is None else codec
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=CACHE_ZSTD_LEVEL).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if codec == "none":
+        return data
+    raise ValueError(f"Unknown cache compression '{codec}', expected one of {CODECS[:3]}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    return data
+
+
+class MissingBlobError(KeyError):
+    """An entry references a text blob that has since been evicted."""
+
+
+def _extract_blobs(value: Any, blobs: Dict[str, str]) -> Any:
+    """Replace long strings in value with {BLOB_REF: sha256} references, collecting them in blobs."""
+    if isinstance(value, str) and len(value) >= CACHE_BLOB_MIN_CHARS:
+        digest = hashlib.sha256(value.encode()).hexdigest()
+        blobs[digest] = value
+        return {BLOB_REF: digest}
+    if isinstance(value, dict):
+        return {k: _extract_blobs(v, blobs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_extract_blobs(v, blobs) for v in value]
+    return value
+
+
+def _resolve_blobs(value: Any, load: Callable[[str], str]) -> Any:
+    if isinstance(value, dict):
+        if len(value) == 1 and BLOB_REF in value:
+            return load(value[BLOB_REF])
+        return {k: _resolve_blobs(v, load) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve_blobs(v, load) for v in value]
+    return value
+
+
+def normalize_company_name(company_name: str) -> str:
+    """Collapse case and whitespace so 'Acme  Corp' and 'acme corp' coalesce."""
+    return re.sub(r"\s+", " ", company_name).strip().lower()
+
+
+def cache_key(*parts: Any) -> str:
+    """Filesystem- and SQL-safe key for the given parts."""
+    return hashlib.sha256("\n".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def company_key(company_name: str) -> str:
+    # Punctuation is kept, so "Acme, Inc." and "Acme Inc" stay separate entries
+    return cache_key(normalize_company_name(company_name))
+
+
+def _policy(policies: Dict[str, Any], namespace: str, default: Any) -> Any:
+    # "inflight/generate_email" falls back to the "inflight" policy
+    if namespace in policies:
+        return policies[namespace]
+    return policies.get(namespace.split("/")[0], default)
+
+
+class FileBackend:
+    """
+    One file per entry under <root>/<namespace>/: <key>.cache holds a JSON header line
+    (codec, stored_at, expires_at) followed by the compressed payload, written atomically.
+    <key>.json files left by the old caches are still read, as uncompressed entries.
+    """
+
+    name = "file"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _paths(self, namespace: str, key: str) -> Tuple[str, str]:
+        directory = cache_dir(namespace, root=self.root)
+        return os.path.join(directory, f"{key}.cache"), os.path.join(directory, f"{key}.json")
+
+    def _read_header(self, path: str) -> Tuple[dict, bytes]:
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            return header, f.read()
+
+    def _legacy(self, namespace: str, key: str, path: str) -> Optional[dict]:
+        entry = JsonFileCache(namespace, root=self.root).get(key)
+        if entry is None:
+            return None
+        if isinstance(entry, dict) and entry.get('format') == ENTRY_FORMAT:
+            return {'codec': 'json', 'value': entry['value'], 'payload': None,
+                    'stored_at': entry['stored_at'], 'expires_at': entry['expires_at']}
+        # Written before the unified store: no expiry, aged from the file's mtime
+        try:
+            stored_at = os.path.getmtime(path)
+        except OSError:
+            stored_at = time.time()
+        return {'codec': 'json', 'value': entry, 'payload': None, 'stored_at': stored_at, 'expires_at': None}
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        path, legacy_path = self._paths(namespace, key)
+        try:
+            header, payload = self._read_header(path)
+            return {**header, 'payload': payload}
+        except FileNotFoundError:
+            pass
+        # A missing legacy file reads as None (it may be removed by another worker meanwhile)
+        return self._legacy(namespace, key, legacy_path)
+
+    def set(self, namespace: str, key: str, entry: dict) -> None:
+        path, legacy_path = self._paths(namespace, key)
+        header = {k: entry[k] for k in ('codec', 'stored_at', 'expires_at')}
+        atomic_write(path, json.dumps(header).encode() + b"\n" + entry['payload'])
+        # Eviction goes by mtime too (see touch), so it starts out as stored_at
+        os.utime(path, (entry['stored_at'], entry['stored_at']))
+        try:
+            # Superseded by the entry just written; another worker may have removed it already
+            os.remove(legacy_path)
+        except FileNotFoundError:
+            pass
+
+    def touch(self, namespace: str, key: str, stored_at: float) -> bool:
+        # The header keeps the original stored_at; eviction also goes by the file's mtime
+        path = self._paths(namespace, key)[0]
+        try:
+            with open(path, 'rb') as f:
+                expires_at = json.loads(f.readline())['expires_at']
+            if expires_at is not None and expires_at <= time.time():
+                return False
+            os.utime(path, (stored_at, stored_at))
+            return True
+        except (FileNotFoundError, ValueError):
+            return False
+
+    def delete(self, namespace: str, key: str) -> None:
+        for path in self._paths(namespace, key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self, namespace: str, max_entries: int) -> int:
+        directory = cache_dir(namespace, root=self.root)
+        lock_path = os.path.join(cache_dir("locks", root=self.root), f"evict_{namespace.replace('/', '_')}.lock")
+        removed = 0
+        with file_lock(lock_path):
+            now = time.time()
+            files = []
+            for name in os.listdir(directory):
+                key, ext = os.path.splitext(name)
+                if ext not in (".cache", ".json"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    entry = self._read_header(path)[0] if ext == ".cache" else self._legacy(namespace, key, path)
+                    written_at = max(entry['stored_at'], os.path.getmtime(path)) if entry else None
+                except (OSError, ValueError):
+                    entry = None
+                if entry is None or (entry['expires_at'] is not None and entry['expires_at'] <= now):
+                    self.delete(namespace, key)
+                    removed += 1
+                    continue
+                files.append((written_at, path))
+
+            files.sort()
+            for _, path in files[:max(0, len(files) - max_entries)]:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class SQLiteBackend:
+    """A single SQLite database (WAL mode) shared by every worker on the host."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(cache_entries)")}
+            if columns and 'payload' not in columns:
+                # Created before entries were compressed; it only holds cached data, so start over
+                connection.execute("DROP TABLE cache_entries")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, codec TEXT NOT NULL, payload BLOB NOT NULL,"
+                " stored_at REAL NOT NULL, expires_at REAL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_stored_idx ON cache_entries (namespace, stored_at)"
+            )
+            self._local.connection = connection
+        return connection
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        row = self._connection().execute(
+            "SELECT codec, payload, stored_at, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'codec': row[0], 'payload': bytes(row[1]), 'stored_at': row[2], 'expires_at': row[3]}
+
+    def set(self, namespace: str, key: str, entry: dict) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, codec, payload, stored_at, expires_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (namespace, key, entry['codec'], entry['payload'], entry['stored_at'], entry['expires_at'])
+        )
+
+    def touch(self, namespace: str, key: str, stored_at: float) -> bool:
+        return self._connection().execute(
+            "UPDATE cache_entries SET stored_at = MAX(stored_at, ?)"
+            " WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (stored_at, namespace, key, time.time())
+        ).rowcount > 0
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def evict(self, namespace: str, max_entries: int) -> int:
+        connection = self._connection()
+        removed = connection.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (namespace, time.time())
+        ).rowcount
+        removed += connection.execute(
+            "DELETE FROM cache_entries WHERE rowid IN ("
+            " SELECT rowid FROM cache_entries WHERE namespace = ? ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (namespace, max_entries)
+        ).rowcount
+        return removed
+
+
+class PostgresBackend:
+    """The CacheEntry table in the app database, so every node shares one cache."""
+
+    name = "postgres"
+
+    def _model(self):
+        # Deferred so the store can be imported before Django's app registry is ready
+        from app.models import CacheEntry
+        return CacheEntry
+
+    def get(self, namespace: str, key: str) -> Optional[dict]:
+        row = self._model().objects.filter(namespace=namespace, key=key).first()
+        if row is None:
+            return None
+        return {
+            'codec': row.codec,
+            'value': row.value,
+            'payload': bytes(row.payload) if row.payload is not None else None,
+            'stored_at': row.stored_at.timestamp(),
+            'expires_at': row.expires_at.timestamp() if row.expires_at else None
+        }
+
+    def set(self, namespace: str, key: str, entry: dict) -> None:
+        from datetime import datetime, timezone
+        from django.db import IntegrityError
+
+        defaults = {
+            'codec': entry['codec'],
+            'payload': entry['payload'],
+            'value': None,
+            'stored_at': datetime.fromtimestamp(entry['stored_at'], tz=timezone.utc),
+            'expires_at': datetime.fromtimestamp(entry['expires_at'], tz=timezone.utc) if entry['expires_at'] else None
+        }
+        try:
+            self._model().objects.update_or_create(namespace=namespace, key=key, defaults=defaults)
+        except IntegrityError:
+            # Another worker inserted the same key first; last write wins
+            self._model().objects.filter(namespace=namespace, key=key).update(**defaults)
+
+    def touch(self, namespace: str, key: str, stored_at: float) -> bool:
+        from datetime import datetime, timezone
+        from django.db.models import Q
+
+        live = Q(expires_at__isnull=True) | Q(expires_at__gt=datetime.now(tz=timezone.utc))
+        return self._model().objects.filter(live, namespace=namespace, key=key).update(
+            stored_at=datetime.fromtimestamp(stored_at, tz=timezone.utc)
+        ) > 0
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._model().objects.filter(namespace=namespace, key=key).delete()
+
+    def evict(self, namespace: str, max_entries: int) -> int:
+        from django.utils import timezone
+
+        entries = self._model().objects.filter(namespace=namespace)
+        removed, _ = entries.filter(expires_at__lte=timezone.now()).delete()
+        excess = entries.count() - max_entries
+        if excess > 0:
+            oldest = list(entries.order_by('stored_at').values_list('pk', flat=True)[:excess])
+            removed += self._model().objects.filter(pk__in=oldest).delete()[0]
+        return removed
+
+
+_backends: Dict[tuple, Any] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: Optional[str] = None, root: Optional[str] = None):
+    """
+    The named backend (default CACHE_BACKEND) for the cache root (default the shared one),
+    one instance per backend and root.
+    """
+    name = (name or cache_backend_name()).lower()
+    if name not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown cache backend '{name}', expected one of {CACHE_BACKENDS}")
+    explicit_root = root is not None
+    root = cache_dir(root=root)
+    with _backends_lock:
+        backend = _backends.get((name, root))
+        if backend is None:
+            if name == "sqlite":
+                sqlite_path = os.path.join(root, "cache.sqlite3")
+                backend = SQLiteBackend(sqlite_path if explicit_root else env_setting("CACHE_SQLITE_PATH", sqlite_path))
+            elif name == "postgres":
+                backend = PostgresBackend()
+            else:
+                backend = FileBackend(root)
+            _backends[(name, root)] = backend
+        return backend
+
+
+@dataclass(frozen=True)
+class CacheLocation:
+    """
+    Where a CacheStore keeps its entries: a backend name and cache root, each falling back
+    to CACHE_BACKEND and the shared cache root when None. Offline provider modes pass their
+    own so their entries never mix with the live caches.
+    """
+
+    backend: Optional[str] = None
+    root: Optional[str] = None
+
+    def get_backend(self):
+        return get_backend(self.backend, self.root)
+
+
+class CacheStore:
+    """
+    A namespace in the shared cache. Values are JSON-serializable; keys should come from
+    cache_key() or company_key(). Entries expire after the namespace's TTL (or the ttl
+    given to set()) and the oldest are evicted once the namespace outgrows its size limit.
+
+    Entries are compressed (CACHE_COMPRESSION: zstd, gzip or none) and every string of at
+    least CACHE_BLOB_MIN_CHARS is stored once in the "blobs" namespace under its hash, so
+    text repeated across entries (e.g. generic role profiles shared by many companies)
+    takes space only once. Reads decompress and reassemble transparently; an entry whose
+    blob was evicted reads as missing.
+
+    The backend (file, sqlite or postgres) is chosen with CACHE_BACKEND unless location
+    names one. Every backend replaces entries atomically, so concurrent workers never read
+    a partial write.
+    """
+
+    def __init__(self, namespace: str, ttl: Optional[int] = None, max_entries: Optional[int] = None,
+                 location: Optional[CacheLocation] = None):
+        self.namespace = namespace
+        self.location = location or CacheLocation()
+        self.ttl = ttl if ttl is not None else _policy(CACHE_TTL_POLICIES, namespace, None)
+        self.max_entries = max_entries or _policy(CACHE_MAX_ENTRIES, namespace, CACHE_DEFAULT_MAX_ENTRIES)
+        self.dedupe = namespace != BLOB_NAMESPACE
+        # Shared text blobs; each write of an entry refreshes the age of the blobs it references,
+        # so blobs still in use survive eviction
+        self.blobs = CacheStore(BLOB_NAMESPACE, location=self.location) if self.dedupe else None
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def _encode(self, value: Any) -> Tuple[str, bytes]:
+        raw_size = len(json.dumps(value).encode())
+        if self.dedupe:
+            blobs = {}
+            value = _extract_blobs(value, blobs)
+            for digest, text in blobs.items():
+                # Blobs are written before the entry that references them; one already
+                # stored only has its age refreshed rather than its text written again
+                if not self.blobs.touch(digest):
+                    self.blobs.set(digest, text)
+        codec = compression_codec()
+        payload = compress(json.dumps(value).encode(), codec)
+        with self._lock:
+            self.raw_bytes += raw_size
+            self.stored_bytes += len(payload)
+        return codec, payload
+
+    def _decode(self, entry: dict) -> Any:
+        if entry['codec'] == 'json':
+            value = entry['value']
+        else:
+            value = json.loads(decompress(entry['payload'], entry['codec']))
+        return _resolve_blobs(value, self._load_blob) if self.dedupe else value
+
+    def _load_blob(self, digest: str) -> str:
+        text = self.blobs.get(digest)
+        if text is None:
+            raise MissingBlobError(digest)
+        return text
+
+    def get_entry(self, key: str) -> Optional[dict]:
+        """Return the live entry ({'value', 'stored_at', 'expires_at'}) for key, or None."""
+        try:
+            entry = self.location.get_backend().get(self.namespace, key)
+            if entry is None or (entry['expires_at'] is not None and entry['expires_at'] <= time.time()):
+                return None
+            return {'value': self._decode(entry), 'stored_at': entry['stored_at'], 'expires_at': entry['expires_at']}
+        except MissingBlobError:
+            print(f"  {self.namespace} cache entry references an evicted blob, treating it as missing")
+            return None
+        except Exception as e:
+            print(f"  ❌ Error reading {self.namespace} cache entry: {str(e)}")
+            return None
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        """Return the stored value for key, or default if missing, expired or unreadable."""
+        entry = self.get_entry(key)
+        return default if entry is None else entry['value']
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, stored_at: Optional[float] = None) -> None:
+        """Store value under key, replacing any previous entry. ttl overrides the namespace TTL (0 = none)."""
+        ttl = self.ttl if ttl is None else ttl
+        stored_at = stored_at or time.time()
+        codec, payload = self._encode(value)
+        self.location.get_backend().set(self.namespace, key, {
+            'codec': codec,
+            'payload': payload,
+            'stored_at': stored_at,
+            'expires_at': stored_at + ttl if ttl else None
+        })
+        with self._lock:
+            self._writes += 1
+            due = self._writes % CACHE_EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def touch(self, key: str) -> bool:
+        """Mark key's entry as just written, without rewriting it. Returns False if there is none."""
+        return self.location.get_backend().touch(self.namespace, key, time.time())
+
+    def delete(self, key: str) -> None:
+        self.location.get_backend().delete(self.namespace, key)
+
+    def evict(self) -> int:
+        """Drop expired entries and, beyond max_entries, the least recently written ones."""
+        try:
+            removed = self.location.get_backend().evict(self.namespace, self.max_entries)
+        except Exception as e:
+            print(f"  ❌ Error evicting {self.namespace} cache entries: {str(e)}")
+            return 0
+        if removed:
+            print(f"  Evicted {removed} {self.namespace} cache entries")
+        return removed
+
+    def stats(self) -> dict:
+        """Bytes written by this process before and after blob extraction and compression."""
+        with self._lock:
+            return {
+                'namespace': self.namespace,
+                'raw_bytes': self.raw_bytes,
+                'stored_bytes': self.stored_bytes,
+                'ratio': round(self.stored_bytes / self.raw_bytes, 3) if self.raw_bytes else 0.0
+            }
@@ -0,0 +1,74 @@
+import os
+import re
+from typing import Dict, List, Optional
+
+from .llmCache import estimate_tokens
+from .templateSelector import MAX_EMBEDDING_CHARS, cosine_similarity
+
+# Approximate token budget for the club facts pasted into a single prompt
+CLUB_CONTEXT_TOKEN_BUDGET = int(os.environ.get("CLUB_CONTEXT_TOKEN_BUDGET", "900"))
+
+# Upper bound on how many club facts a prompt receives, whatever the budget
+CLUB_CONTEXT_TOP_K = int(os.environ.get("CLUB_CONTEXT_TOP_K", "8"))
+
+QA_FORMAT = "QUESTION: {question}\nANSWER: {answer}"
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class ClubContextAssembler:
+    """
+    Keeps the extracted club question/answer pairs as individual snippets and, for each
+    prompt, selects only the most relevant ones within a token budget instead of pasting
+    all of them. Snippets are ranked by embedding similarity to a short description of
+    what the prompt is about, falling back to word overlap if embedding fails.
+    """
+
+    def __init__(self, embeddings, token_budget: int = CLUB_CONTEXT_TOKEN_BUDGET, top_k: int = CLUB_CONTEXT_TOP_K):
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.top_k = top_k
+
+    def snippets(self, club_info: Dict[str, str], fmt: str = QA_FORMAT) -> List[str]:
+        # Answers that failed to extract carry no facts, so they never make the cut
+        return [
+            fmt.format(question=q, answer=a)
+            for q, a in club_info.items()
+            if not a.startswith("Information unavailable")
+        ]
+
+    def _rank(self, snippets: List[str], query: str) -> List[int]:
+        try:
+            vectors = self.embeddings.embed_documents([s[:MAX_EMBEDDING_CHARS] for s in snippets])
+            query_vector = self.embeddings.embed_query(query[:MAX_EMBEDDING_CHARS])
+            scores = [cosine_similarity(query_vector, vector) for vector in vectors]
+        except Exception as e:
+            print(f"  ❌ Error embedding club context, ranking by word overlap: {str(e)}")
+            query_words = _words(query)
+            scores = [len(query_words & _words(s)) for s in snippets]
+        return sorted(range(len(snippets)), key=lambda i: scores[i], reverse=True)
+
+    def select(self, club_info: Dict[str, str], query: str, label: str, fmt: str = QA_FORMAT,
+               token_budget: Optional[int] = None, top_k: Optional[int] = None) -> str:
+        """Return the formatted club facts most relevant to query, within the token budget."""
+        token_budget = token_budget or self.token_budget
+        top_k = top_k or self.top_k
+        snippets = self.snippets(club_info, fmt)
+        if not snippets:
+            return ""
+
+        selected, used = [], 0
+        for i in self._rank(snippets, query):
+            cost = estimate_tokens(snippets[i])
+            if len(selected) >= top_k or (selected and used + cost > token_budget):
+                break
+            selected.append(i)
+            used += cost
+
+        # Keep the documents' question order so related facts stay together
+        context = "\n\n".join(snippets[i] for i in sorted(selected))
+        before = estimate_tokens("\n\n".join(snippets))
+        print(f"  Club context for {label}: {len(selected)}/{len(snippets)} facts, ~{before} -> ~{estimate_tokens(context)} tokens")
+        return context
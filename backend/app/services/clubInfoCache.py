@@ -0,0 +1,64 @@
+import hashlib
+import time
+from typing import Dict, List, Optional
+
+from .cacheStore import CacheLocation, CacheStore
+
+# Bump when the answer format or the extraction prompt changes so old answers are ignored
+CLUB_INFO_CACHE_VERSION = "1"
+
+
+def hash_documents(paths: List[str]) -> str:
+    """Return a sha256 digest over the contents of the given files, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        file_digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                file_digest.update(block)
+        digest.update(file_digest.hexdigest().encode())
+    return digest.hexdigest()
+
+
+class ClubInfoCache:
+    """
+    Content-addressed store for answers produced by EmailGenerator.extract_club_info.
+    Each answer is keyed by a hash of the source documents plus the question text, so
+    editing the sponsorship packet or FDP (or a question) only invalidates what changed.
+    """
+
+    def __init__(self, source_paths: List[str], location: Optional[CacheLocation] = None):
+        self.source_paths = list(source_paths)
+        self.documents_hash = hash_documents(self.source_paths)
+        self.store = CacheStore("club_info", location=location)
+
+    def key_for(self, question: str) -> str:
+        raw = f"{CLUB_INFO_CACHE_VERSION}\n{self.documents_hash}\n{question}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, question: str) -> Optional[str]:
+        entry = self.store.get(self.key_for(question))
+        if entry and entry.get('question') == question:
+            return entry.get('answer')
+        return None
+
+    def set(self, question: str, answer: str) -> None:
+        self.store.set(self.key_for(question), {
+            'question': question,
+            'answer': answer,
+            'documents_hash': self.documents_hash,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+
+    def lookup(self, questions: List[str]) -> Dict[str, str]:
+        """Return the cached answers for whichever questions have one."""
+        found = {}
+        for question in questions:
+            answer = self.get(question)
+            if answer is not None:
+                found[question] = answer
+        return found
+
+    def missing(self, questions: List[str]) -> List[str]:
+        """Return the questions that still need to be answered."""
+        return [q for q in questions if self.get(q) is None]
@@ -0,0 +1,108 @@
+import re
+import hashlib
+from typing import Dict, List
+from urllib.parse import urlsplit
+
+# Character caps for the compact form of each relationship-intelligence field
+COMPACT_LIMITS = {
+    'profile': 500,
+    'communication_style': 700,
+    'connections': 300,
+    'language_analysis': 500,
+    'decision_style': 500,
+    'cultural_values': 600,
+    'recommendations': 1200,
+    'partnership_analysis': 1200,
+    'value_propositions': 1200,
+}
+
+
+def normalize_url(url: str) -> str:
+    """Ignore scheme, www., fragments and trailing slashes when comparing result URLs."""
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def content_hash(*texts: str) -> str:
+    normalized = " ".join(" ".join(texts).lower().split())
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def dedupe_search_results(results: List[Dict]) -> List[Dict]:
+    """
+    Drop search results whose URL or title+snippet was already seen, keeping the first
+    occurrence, so the same page returned by several queries reaches the prompt once.
+    """
+    seen_urls, seen_content, unique = set(), set(), []
+    for result in results:
+        url = normalize_url(result.get('link', '')) if result.get('link') else None
+        digest = content_hash(result.get('title', ''), result.get('snippet', ''))
+        if (url and url in seen_urls) or digest in seen_content:
+            continue
+        if url:
+            seen_urls.add(url)
+        seen_content.add(digest)
+        unique.append(result)
+    if len(unique) < len(results):
+        print(f"  Removed {len(results) - len(unique)} duplicate search results")
+    return unique
+
+
+def compact_text(text, max_chars: int) -> str:
+    """
+    Deterministically shrink LLM output: strip markdown emphasis, drop blank and repeated
+    lines, then cut at the last whole line (or word) that fits within max_chars.
+    """
+    if not isinstance(text, str):
+        text = str(text or "")
+    lines, seen = [], set()
+    for line in text.splitlines():
+        line = re.sub(r"[*_#`]+", "", line).strip()
+        key = line.lower()
+        if not line or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    compact = "\n".join(lines)
+    if len(compact) <= max_chars:
+        return compact
+
+    cut = compact[:max_chars]
+    boundary = cut.rfind("\n")
+    if boundary < max_chars // 2:
+        boundary = cut.rfind(" ")
+    return cut[:boundary if boundary > 0 else max_chars].rstrip() + " …"
+
+
+def _compact_fields(data: Dict, fields: List[str]) -> Dict:
+    compact = {k: v for k, v in data.items() if k not in fields}
+    for field in fields:
+        if field in data:
+            compact[field] = compact_text(data[field], COMPACT_LIMITS[field])
+    return compact
+
+
+def compact_profiles(profiles: Dict[str, Dict]) -> Dict[str, Dict]:
+    return {
+        name: _compact_fields(profile, ['profile', 'communication_style', 'connections'])
+        for name, profile in profiles.items()
+    }
+
+
+def compact_cultural_assessment(assessment: Dict) -> Dict:
+    return _compact_fields(assessment, ['language_analysis', 'decision_style', 'cultural_values', 'recommendations'])
+
+
+def compact_partnership(partnership: Dict) -> Dict:
+    return _compact_fields(partnership, ['partnership_analysis', 'value_propositions'])
+
+
+def compact_relationship_intelligence(relationship_intelligence: Dict) -> Dict:
+    """Size-capped form of the relationship intelligence consumed by template selection and generation."""
+    return {
+        'decision_makers': compact_profiles(relationship_intelligence.get('decision_makers', {})),
+        'partnership_potential': compact_partnership(relationship_intelligence.get('partnership_potential', {})),
+        'cultural_assessment': compact_cultural_assessment(relationship_intelligence.get('cultural_assessment', {})),
+    }
@@ -0,0 +1,158 @@
+import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from .resilience import Dependency
+
+# Maximum number of Gemini calls in flight per worker
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "4"))
+
+# Gemini quota: sustained requests per minute plus how many may be sent back to back
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", "15"))
+GEMINI_BURST = int(os.environ.get("GEMINI_BURST", "4"))
+
+# Google Custom Search: searches in flight per worker and the per-minute quota
+SEARCH_MAX_CONCURRENCY = int(os.environ.get("SEARCH_MAX_CONCURRENCY", "6"))
+SEARCH_RPM = float(os.environ.get("SEARCH_RPM", "100"))
+SEARCH_BURST = int(os.environ.get("SEARCH_BURST", "6"))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens refill continuously at `rate` per second up to
+    `capacity`; acquire() blocks until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Take tokens from the bucket, sleeping as needed. Returns the time spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+llm_limiter = TokenBucket(rate=GEMINI_RPM / 60.0, capacity=GEMINI_BURST)
+
+# Retries, circuit breaker and concurrency cap shared by every Gemini call in the worker
+gemini = Dependency("gemini", max_concurrency=LLM_MAX_CONCURRENCY, limiter=llm_limiter)
+
+# Shared by every request in the worker. Only leaf LLM calls run here (tasks never wait
+# on other tasks in this pool), so nested use from orchestrating threads cannot deadlock.
+llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+
+
+def llm_call(fn: Callable, *args, **kwargs) -> Any:
+    """
+    Run a single Gemini call in the current thread once the rate limiter allows it,
+    retrying transient failures (raises CircuitOpenError while Gemini is failing).
+    """
+    return gemini.call(fn, *args, **kwargs)
+
+
+def llm_stream(fn: Callable, *args, **kwargs) -> Iterator:
+    """Iterate a streaming Gemini call (e.g. llm.stream) with the same limits and retries as llm_call."""
+    return gemini.stream(fn, *args, **kwargs)
+
+
+def submit_llm(fn: Callable, *args, **kwargs) -> Future:
+    """Schedule a rate-limited Gemini call on the shared LLM executor."""
+    return llm_executor.submit(llm_call, fn, *args, **kwargs)
+
+
+def submit_cached(fn: Callable, *args, **kwargs) -> Future:
+    """
+    Schedule a call that applies the rate limiter itself, only when it actually reaches
+    Gemini (e.g. CachedChat.invoke), so cache hits don't spend rate limit tokens.
+    """
+    return llm_executor.submit(fn, *args, **kwargs)
+
+
+def _collect(futures: List[Future]) -> List[Tuple[Any, Optional[Exception]]]:
+    """Wait for futures in order, returning (result, error) pairs."""
+    outcomes = []
+    for future in futures:
+        try:
+            outcomes.append((future.result(), None))
+        except Exception as e:
+            outcomes.append((None, e))
+    return outcomes
+
+
+def map_llm(fn: Callable, items: Iterable, cached: bool = False) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Apply fn to every item through the shared LLM executor.
+    Returns (result, error) pairs in the original item order; exactly one of them is None.
+    Pass cached=True when fn goes through CachedChat and so rate limits its own misses.
+    """
+    submit = submit_cached if cached else submit_llm
+    return _collect([submit(fn, item) for item in items])
+
+
+def map_parallel(fn: Callable, items: Iterable, max_workers: int = LLM_MAX_CONCURRENCY) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Like map_llm, but for tasks that themselves wait on LLM futures. These run on a short-lived
+    pool of their own so they never occupy the shared LLM executor they depend on.
+    """
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix="orchestrate") as executor:
+        return _collect([executor.submit(fn, item) for item in items])
+
+
+search_limiter = TokenBucket(rate=SEARCH_RPM / 60.0, capacity=SEARCH_BURST)
+google_search = Dependency("google_search", max_concurrency=SEARCH_MAX_CONCURRENCY, limiter=search_limiter)
+
+# Like the LLM executor, only leaf search calls run here
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_CONCURRENCY, thread_name_prefix="search")
+
+
+class RateLimitedSearch:
+    """
+    Wraps a search client so every real query waits on the worker's global search limiter
+    and goes through the Google Search retry and circuit breaker policy.
+    """
+
+    def __init__(self, search):
+        self.search = search
+
+    def results(self, query: str, num_results: int, **kwargs):
+        return google_search.call(self.search.results, query, num_results, **kwargs)
+
+
+def fan_out_search(search, queries: List[str], num_results: int = 3,
+                   fresh: bool = False) -> List[Tuple[Any, Optional[Exception]]]:
+    """
+    Issue all queries concurrently on the shared search executor.
+    Returns ((results, elapsed_seconds), error) pairs in the original query order, so
+    total time is bounded by the slowest query rather than the sum of all of them.
+    fresh=True asks a CachedSearch to skip its cache (used when refreshing stale research).
+    """
+    options = {'fresh': True} if fresh else {}
+
+    def run(query):
+        start_time = time.time()
+        results = search.results(query, num_results=num_results, **options)
+        return results, time.time() - start_time
+
+    return _collect([search_executor.submit(run, query) for query in queries])
@@ -0,0 +1,83 @@
+import hashlib
+import threading
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from .cacheStore import CacheLocation, CacheStore
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Persistent embedding cache keyed by (model name, text hash) that wraps another
+    Embeddings implementation such as GoogleGenerativeAIEmbeddings.
+
+    Hits are served from the "embeddings" cache namespace and all misses in a call are sent to the
+    wrapped model as a single batch. Counters are kept per process so we can see how
+    many embedding calls were saved.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, location: Optional[CacheLocation] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.store = CacheStore("embeddings", location=location)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.calls = 0
+
+    def key_for(self, text: str, kind: str) -> str:
+        # Queries and documents can be embedded with different task types, so keep them apart
+        raw = f"{self.model_name}\n{kind}\n{text}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _lookup(self, text: str, kind: str):
+        entry = self.store.get(self.key_for(text, kind))
+        return entry.get('vector') if entry else None
+
+    def _save(self, text: str, kind: str, vector: List[float]) -> None:
+        self.store.set(self.key_for(text, kind), {'model': self.model_name, 'vector': vector})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = [self._lookup(text, "document") for text in texts]
+
+        # Batch every distinct miss into one call to the wrapped model
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            fresh = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            for text, vector in fresh.items():
+                self._save(text, "document", vector)
+            vectors = [vector if vector is not None else fresh[text] for text, vector in zip(texts, vectors)]
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+            self.calls += 1 if missing else 0
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self._lookup(text, "query")
+        hit = vector is not None
+        if not hit:
+            vector = self.embeddings.embed_query(text)
+            self._save(text, "query", vector)
+
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.calls += 1
+        return vector
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'model': self.model_name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'embedding_calls': self.calls,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
@@ -0,0 +1,88 @@
+import os
+import json
+import fcntl
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Optional
+
+
+def env_setting(name: str, default: str) -> str:
+    """
+    Read a setting from the environment when it is needed rather than at import time,
+    so values loaded from .env after the importing module was loaded still apply.
+    """
+    return os.environ.get(name, default)
+
+
+def cache_dir(*parts: str, root: Optional[str] = None) -> str:
+    """
+    Return (and create) a directory under the given cache root, by default the shared one:
+    ./cache, which can be moved with HYPERMAIL_CACHE_DIR.
+    """
+    root = root or env_setting("HYPERMAIL_CACHE_DIR", os.path.join(os.getcwd(), "cache"))
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def file_lock(path: str):
+    """Hold an exclusive lock on path, shared across every worker process on the host."""
+    with open(path, 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Replace path with data via a temp file and rename, so readers never see a partial write."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class JsonFileCache:
+    """
+    Persistent key/value store with one JSON file per key under cache/<namespace>/.
+    Writes go through a temp file and an atomic rename so concurrent workers never
+    read a half-written entry. Keys must be filesystem safe (e.g. hex digests).
+    Pass root to keep the entries somewhere other than the cache (e.g. test fixtures).
+    """
+
+    def __init__(self, namespace: str, root: Optional[str] = None):
+        self.namespace = namespace
+        self.root = root
+
+    def path_for(self, key: str) -> str:
+        if self.root is None:
+            return os.path.join(cache_dir(self.namespace), f"{key}.json")
+        directory = os.path.join(self.root, self.namespace)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{key}.json")
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        """Return the stored value for key, or default if missing or unreadable."""
+        path = self.path_for(key)
+        if not os.path.exists(path):
+            return default
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # Removed by another worker since the check above
+            return default
+        except (OSError, ValueError) as e:
+            print(f"  ❌ Error reading cache entry {path}: {str(e)}")
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key, replacing any previous entry atomically."""
+        atomic_write(self.path_for(key), json.dumps(value).encode())
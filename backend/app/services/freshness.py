@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .cacheStore import CacheLocation, CacheStore, company_key
+from .compaction import normalize_url
+from .concurrency import submit_cached
+
+DAY = 24 * 3600
+
+# How long each per-company artifact is served as is ('fresh'), and for how long after
+# that it is still served while a background refresh runs ('stale'). Older entries are
+# gone and the next request researches the company from scratch.
+FRESHNESS_POLICIES = {
+    'company': {'fresh': 7 * DAY, 'stale': 30 * DAY},
+    'contacts': {'fresh': 14 * DAY, 'stale': 60 * DAY},
+    'partnership': {'fresh': 7 * DAY, 'stale': 30 * DAY},
+    'culture': {'fresh': 14 * DAY, 'stale': 60 * DAY},
+}
+
+# A refresh that kept the previous value because some searches failed is retried after this
+# long (seconds) rather than on every request, so an outage doesn't become a refresh storm
+REFRESH_RETRY_SECONDS = int(os.environ.get("REFRESH_RETRY_SECONDS", "3600"))
+
+# Background refreshes running at once per worker
+REFRESH_MAX_WORKERS = int(os.environ.get("REFRESH_MAX_WORKERS", "2"))
+
+# Refreshes only orchestrate; their searches and LLM calls still go through the shared executors
+refresh_executor = ThreadPoolExecutor(max_workers=REFRESH_MAX_WORKERS, thread_name_prefix="refresh")
+
+
+def max_age(namespace: str) -> int:
+    policy = FRESHNESS_POLICIES[namespace]
+    return policy['fresh'] + policy['stale']
+
+
+def input_hash(inputs: Any) -> str:
+    raw = inputs if isinstance(inputs, str) else json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def result_set_hash(results: List[Dict]) -> str:
+    """Hash a query's results by URL and snippet, ignoring their order and title wording."""
+    return input_hash(sorted(
+        [normalize_url(result.get('link', '')), " ".join(result.get('snippet', '').split())]
+        for result in results
+    ))
+
+
+class IncrementalRun:
+    """
+    Records a hash of each step's inputs next to its output. Given the previous run's
+    record, a step whose inputs hash the same reuses the stored output instead of calling
+    the LLM again, so refreshing an artifact only pays for what actually changed.
+    """
+
+    def __init__(self, previous: Optional[dict] = None):
+        self.previous = (previous or {}).get('steps', {})
+        self.steps: Dict[str, dict] = {}
+        self.reused: List[str] = []
+        self.recomputed: List[str] = []
+        self._lock = threading.Lock()
+
+    def _prior(self, name: str, digest: str) -> Optional[dict]:
+        prior = self.previous.get(name)
+        return prior if prior is not None and prior.get('input_hash') == digest else None
+
+    def _record(self, name: str, digest: str, output: Any, reused: bool) -> None:
+        with self._lock:
+            self.steps[name] = {'input_hash': digest, 'output': output}
+            (self.reused if reused else self.recomputed).append(name)
+
+    def step(self, name: str, inputs: Any, compute: Callable[[], Any]) -> Any:
+        digest = input_hash(inputs)
+        prior = self._prior(name, digest)
+        output = prior['output'] if prior is not None else compute()
+        self._record(name, digest, output, reused=prior is not None)
+        return output
+
+    def submit_llm(self, name: str, prompt: str, chat, site: str) -> Future:
+        """Like submit_cached(chat.invoke, ...) but resolving to the response text, reused if the prompt is unchanged."""
+        digest = input_hash(prompt)
+        prior = self._prior(name, digest)
+        if prior is not None:
+            future = Future()
+            future.set_result(prior['output'])
+            self._record(name, digest, prior['output'], reused=True)
+            return future
+
+        def call():
+            # Recorded before the future resolves, so the caller always sees the step
+            output = chat.invoke(prompt, site=site).content
+            self._record(name, digest, output, reused=False)
+            return output
+
+        return submit_cached(call)
+
+    def invoke_llm(self, name: str, prompt: str, chat, site: str) -> str:
+        return self.submit_llm(name, prompt, chat, site).result()
+
+    def summary(self) -> str:
+        return f"{len(self.recomputed)} steps recomputed, {len(self.reused)} reused"
+
+
+class ResearchCache:
+    """
+    Stale-while-revalidate cache for one kind of per-company research artifact.
+
+    get() returns a fresh entry as is. A stale entry is returned immediately too, and a
+    refresh is scheduled in the background (at most one per company per worker). Each
+    stored value carries the hash of every search query's result set and the per-step
+    input hashes of the run that produced it, so a refresh can skip the LLM entirely
+    when the searches come back unchanged and otherwise redo only the affected steps.
+    """
+
+    def __init__(self, namespace: str, location: Optional[CacheLocation] = None):
+        self.namespace = namespace
+        self.fresh_for = FRESHNESS_POLICIES[namespace]['fresh']
+        self.store = CacheStore(namespace, ttl=max_age(namespace), location=location)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, company_name: str, refresh: Callable[[dict], Any]) -> Optional[dict]:
+        """Return the cached value for company_name, scheduling refresh(previous value) if it is stale."""
+        entry = self.store.get_entry(company_key(company_name))
+        if entry is None:
+            return None
+        age = time.time() - entry['stored_at']
+        if age >= self.fresh_for:
+            print(f"  {self.namespace} research for {company_name} is {age / DAY:.0f} days old, refreshing in the background")
+            self._schedule(company_name, lambda: refresh(entry['value']))
+        return entry['value']
+
+    def _schedule(self, company_name: str, refresh: Callable[[], Any]) -> None:
+        key = company_key(company_name)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                refresh()
+            except Exception as e:
+                print(f"  ❌ Error refreshing {self.namespace} research for {company_name}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        refresh_executor.submit(run)
+
+    def set(self, company_name: str, value: dict, run: IncrementalRun, search_hashes: Dict[str, str]) -> None:
+        self.store.set(company_key(company_name), {
+            **value,
+            'company_name': company_name,
+            'search_hashes': search_hashes,
+            'steps': run.steps,
+            'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+        })
+        if run.previous:
+            print(f"  ✓ Refreshed {self.namespace} research for {company_name} ({run.summary()})")
+
+    def keep_previous(self, company_name: str, previous: Optional[dict], search_hashes: Dict[str, str],
+                      queries: List[str]) -> bool:
+        """
+        During a refresh, decide whether the previous value stands: if every query's result
+        set hashes the same it is re-stamped as fresh without any LLM calls, and if some
+        queries failed it is kept rather than replaced by a result built from partial data,
+        stamped so that it turns stale (and is refreshed) again in REFRESH_RETRY_SECONDS.
+        """
+        if previous is None:
+            return False
+        if any(query not in search_hashes for query in queries):
+            print(f"  Some {self.namespace} searches for {company_name} failed, keeping the cached research "
+                  f"and retrying in {REFRESH_RETRY_SECONDS}s")
+            self.store.set(company_key(company_name), previous,
+                           stored_at=time.time() - self.fresh_for + REFRESH_RETRY_SECONDS)
+            return True
+
+        old_hashes = previous.get('search_hashes', {})
+        changed = [query for query in queries if old_hashes.get(query) != search_hashes[query]]
+        if changed:
+            print(f"  {len(changed)}/{len(queries)} {self.namespace} result sets changed for {company_name}")
+            return False
+
+        self.store.set(company_key(company_name), {**previous, 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')})
+        print(f"  ✓ {self.namespace} searches for {company_name} unchanged, cached research kept without LLM calls")
+        return True
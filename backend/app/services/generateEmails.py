@@ -3,21 +3,19 @@ import json
 import random
 import time
 from typing import Dict, List, Any
-import google.generativeai as genai
 from app.models import Company
 from django.db.utils import ProgrammingError, OperationalError
 
+from .concurrency import gemini
+from .providers import build_generative_model
+
 class GenerateEmails:
-    def __init__(self):
+    def __init__(self, model=None):
         """Initialize the email generator with API keys from environment variables."""
-        self.gemini_api_key = os.environ.get('GEMINI_API_KEY')
         self.gemini_model_name = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash-001')
         
-        # Configure the API
-        genai.configure(api_key=self.gemini_api_key)
-        
-        # Initialize Google's Gemini model
-        self.model = genai.GenerativeModel(self.gemini_model_name)
+        # Live Gemini by default; HYPERMAIL_PROVIDER_MODE switches to recorded or fake responses
+        self.model = model or build_generative_model(model_name=self.gemini_model_name)
     
     def get_existing_companies(self):
         """
@@ -96,17 +94,20 @@ class GenerateEmails:
         Return the results as a JSON array of company objects.
         """
         
+        # API failures propagate once retries are exhausted (or the circuit is open)
+        # so callers can tell an outage apart from "no companies found"
+        response = gemini.call(
+            self.model.generate_content,
+            prompt,
+            generation_config={
+                "temperature": 0.9,  # Higher temperature for more randomness
+                "top_p": 0.95,       # More diverse sampling
+                "top_k": 40,         # Consider more tokens
+                "max_output_tokens": 2048,
+            }
+        )
+        
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config={
-                    "temperature": 0.9,  # Higher temperature for more randomness
-                    "top_p": 0.95,       # More diverse sampling
-                    "top_k": 40,         # Consider more tokens
-                    "max_output_tokens": 2048,
-                }
-            )
-            
             # Extract JSON from the response
             raw_text = response.text
             # Find JSON content - look for array structure
@@ -122,7 +123,7 @@ class GenerateEmails:
                 return self._parse_text_response(raw_text)
                 
         except Exception as e:
-            print(f"Error finding companies: {e}")
+            print(f"Error parsing companies: {e}")
             return []
     
     def _parse_text_response(self, text: str) -> List[Dict[str, str]]:
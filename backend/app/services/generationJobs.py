@@ -0,0 +1,240 @@
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from app.models import GenerationJob
+
+from .cacheStore import normalize_company_name
+from .singleFlight import SingleFlight, flight_key
+from .warmState import get_email_generator
+
+# A running job's worker refreshes heartbeat_at this often (seconds)...
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", "15"))
+# ...and one whose heartbeat is older than this is presumed abandoned and claimed again
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "120"))
+# Claims per job, so a job that keeps taking its worker down eventually fails instead
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+# Least time between writes of a streaming email's text so far to the job row (seconds)
+JOB_PARTIAL_FLUSH_SECONDS = float(os.environ.get("JOB_PARTIAL_FLUSH_SECONDS", "0.5"))
+
+# Concurrent generations for the same company share one workflow run
+email_generation_flights = SingleFlight("generate_email")
+
+
+def generate_relationship_email(company_name: str, on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                should_stop: Optional[Callable[[], bool]] = None) -> str:
+    """
+    Run the relationship intelligence workflow for company_name with the configured documents,
+    coalescing with any run for the same company already in flight.
+
+    on_event receives the workflow's step events plus {'event': 'token', 'text': ...} for each
+    chunk of the final email as Gemini streams it. A shared run stops starting new steps
+    once should_stop returns True for every caller waiting on it.
+    """
+    key = flight_key(
+        "relationship_intelligence",
+        normalize_company_name(company_name),
+        settings.SPONSORSHIP_PACKET_PATH,
+        settings.FDP_PATH,
+        settings.EMAIL_TEMPLATE_PATH
+    )
+    return email_generation_flights.do(
+        key,
+        lambda publish, stop: get_email_generator().relationship_intelligence_workflow(
+            company_name=company_name,
+            sponsorship_packet_path=settings.SPONSORSHIP_PACKET_PATH,
+            fdp_path=settings.FDP_PATH,
+            email_template_path=settings.EMAIL_TEMPLATE_PATH,
+            on_event=publish,
+            on_token=lambda text: publish({'event': 'token', 'text': text}),
+            should_stop=stop
+        ),
+        listener=on_event,
+        should_stop=should_stop
+    )
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_job(company_name: str) -> GenerationJob:
+    return GenerationJob.objects.create(company_name=company_name)
+
+
+def cancel_job(job_id) -> None:
+    """Cancel a queued job outright, or ask the worker running it to stop."""
+    cancelled = GenerationJob.objects.filter(pk=job_id, status='queued').update(
+        status='cancelled',
+        finished_at=timezone.now()
+    )
+    if not cancelled:
+        GenerationJob.objects.filter(pk=job_id, status='running').update(cancel_requested=True)
+
+
+def _cancel_requested(job: GenerationJob) -> bool:
+    return GenerationJob.objects.filter(pk=job.pk, cancel_requested=True).exists()
+
+
+def _abandoned() -> Q:
+    """Running jobs whose lease has expired (jobs claimed before heartbeats have none)."""
+    expired = timezone.now() - timedelta(seconds=JOB_LEASE_SECONDS)
+    return Q(status='running') & (
+        Q(heartbeat_at__lt=expired) | Q(heartbeat_at__isnull=True, started_at__lt=expired)
+    )
+
+
+def fail_exhausted_jobs() -> int:
+    """Fail abandoned jobs that have already been claimed JOB_MAX_ATTEMPTS times."""
+    return GenerationJob.objects.filter(_abandoned(), attempts__gte=JOB_MAX_ATTEMPTS).update(
+        status='failed',
+        error=f"Worker stopped responding ({JOB_MAX_ATTEMPTS} attempts)",
+        finished_at=timezone.now()
+    )
+
+
+def claim_next_job(worker: str) -> Optional[GenerationJob]:
+    """
+    Atomically take the oldest queued job, or a running one whose worker stopped
+    heartbeating (crashed or redeployed). SKIP LOCKED lets several worker processes
+    poll the same table without ever claiming the same row.
+    """
+    with transaction.atomic():
+        job = (
+            GenerationJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | (_abandoned() & Q(attempts__lt=JOB_MAX_ATTEMPTS)))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            fail_exhausted_jobs()
+            return None
+        if job.status == 'running':
+            print(f"Reclaiming generation job {job.id} abandoned by {job.worker}")
+        job.status = 'running'
+        job.worker = worker
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.attempts += 1
+        job.save(update_fields=['status', 'worker', 'started_at', 'heartbeat_at', 'attempts'])
+        return job
+
+
+class _Heartbeat:
+    """Refreshes a running job's heartbeat_at until stopped, keeping its lease."""
+
+    def __init__(self, job: GenerationJob):
+        self.job = job
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job.id}", daemon=True)
+
+    def _run(self) -> None:
+        try:
+            while not self._stopped.wait(JOB_HEARTBEAT_INTERVAL):
+                try:
+                    GenerationJob.objects.filter(pk=self.job.pk, worker=self.job.worker).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except Exception as e:
+                    print(f"  ❌ Error updating heartbeat for job {self.job.id}: {str(e)}")
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+class _ProgressRecorder:
+    """
+    Appends workflow events to the job row as steps start and finish, and keeps the
+    email streamed so far in partial_result for clients following the job live.
+    """
+
+    def __init__(self, job: GenerationJob):
+        self.job = job
+        self.failed_step = None
+        self.partial = []
+        self._flushed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _record_token(self, text: str) -> None:
+        with self._lock:
+            self.partial.append(text)
+            if time.monotonic() - self._flushed_at < JOB_PARTIAL_FLUSH_SECONDS:
+                return
+            self._flushed_at = time.monotonic()
+            GenerationJob.objects.filter(pk=self.job.pk).update(partial_result="".join(self.partial))
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        if event['event'] == 'token':
+            self._record_token(event['text'])
+            return
+        with self._lock:
+            event = {**event, 'at': timezone.now().isoformat()}
+            self.job.progress.append(event)
+            if event['event'] == 'started':
+                self.job.current_step = event['step']
+            elif event['event'] == 'failed':
+                self.failed_step = event['step']
+            GenerationJob.objects.filter(pk=self.job.pk).update(
+                progress=self.job.progress,
+                current_step=self.job.current_step
+            )
+
+
+def run_job(job: GenerationJob) -> None:
+    """Run a claimed job to completion and store its result or error."""
+    from app.test2 import WORKFLOW_ERROR_PREFIX
+
+    recorder = _ProgressRecorder(job)
+    try:
+        print(f"Running generation job {job.id} for {job.company_name}")
+        with _Heartbeat(job):
+            job.result = generate_relationship_email(
+                job.company_name,
+                on_event=recorder,
+                should_stop=lambda: _cancel_requested(job)
+            )
+        # The workflow reports failures in its returned message rather than raising. A run
+        # reused from another worker replays no step events, so the message is checked too.
+        errored = job.result and job.result.startswith(WORKFLOW_ERROR_PREFIX)
+        if (errored or recorder.failed_step) and _cancel_requested(job):
+            job.status = 'cancelled'
+            job.error = "Cancelled before the email was generated"
+        elif recorder.failed_step:
+            job.status = 'failed'
+            job.error = f"Step '{recorder.failed_step}' failed"
+        elif errored:
+            job.status = 'failed'
+            job.error = job.result
+        else:
+            job.status = 'succeeded'
+    except Exception as e:
+        traceback.print_exc()
+        job.status = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        # If the lease lapsed and another worker reclaimed the job, its outcome wins
+        GenerationJob.objects.filter(pk=job.pk, worker=job.worker).update(
+            status=job.status,
+            result=job.result,
+            error=job.error,
+            finished_at=job.finished_at
+        )
+        # Each worker thread holds its own DB connection; don't leak it between jobs
+        connection.close()
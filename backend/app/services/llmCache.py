@@ -0,0 +1,149 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from langchain_core.messages import AIMessage
+
+from .concurrency import llm_call
+from .cacheStore import CacheLocation, CacheStore
+
+# Default lifetime of a cached response (seconds) for call sites without a policy below
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Responses kept in memory per worker; older entries are still read back from disk
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "256"))
+
+DAY = 24 * 3600
+
+# Per call site TTLs. 0 disables caching for calls that should sample fresh every time.
+LLM_CACHE_TTL_POLICIES = {
+    'identify_contacts': 7 * DAY,
+    'contact_profile': 30 * DAY,
+    'contact_connections': 30 * DAY,
+    'contact_communication': 30 * DAY,
+    'partnership_analysis': 7 * DAY,
+    'value_propositions': 7 * DAY,
+    'culture_language': 14 * DAY,
+    'culture_decision_style': 14 * DAY,
+    'culture_values': 14 * DAY,
+    'culture_recommendations': 14 * DAY,
+    'club_question_group': 30 * DAY,
+    'company_research': 7 * DAY,
+    'template_analysis': 90 * DAY,
+    'template_selection': 1 * DAY,
+    'basic_email': 0,
+    'final_email': 0,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Same rough 4-characters-per-token estimate the usage tracker falls back to
+    return max(1, len(text) // 4)
+
+
+class CachedChat:
+    """
+    Response cache around a chat model's invoke(), keyed by (model, temperature, prompt hash).
+
+    Entries live in a size-bounded in-memory LRU backed by the "llm" cache namespace, so identical
+    prompts (e.g. generic role profiles or template analyses) are paid for once per TTL window
+    across requests and workers. Misses go through the worker's Gemini rate limiter.
+    """
+
+    def __init__(self, llm, model_name: str, temperature: float,
+                 ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 location: Optional[CacheLocation] = None):
+        self.llm = llm
+        self.model_name = model_name
+        self.temperature = temperature
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = True  # benchmarks switch this off to measure uncached cost
+        self.store = CacheStore("llm", location=location)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.tokens_saved = 0
+
+    def key_for(self, prompt: str) -> str:
+        raw = f"{self.model_name}\n{self.temperature}\n{hashlib.sha256(prompt.encode()).hexdigest()}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def ttl_for(self, site: Optional[str]) -> int:
+        return LLM_CACHE_TTL_POLICIES.get(site, self.ttl)
+
+    def _remember(self, key: str, entry: dict) -> None:
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str, ttl: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            entry = self.store.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+        if entry is None or time.time() - entry.get('cached_at', 0) >= ttl:
+            return None
+        return entry
+
+    def invoke(self, prompt: str, site: Optional[str] = None, fresh: bool = False) -> AIMessage:
+        """
+        Return the model's response to prompt, from cache when a live entry exists.
+        site selects the TTL policy; fresh=True (or a 0 TTL) always calls the model.
+        """
+        ttl = self.ttl_for(site)
+        if fresh or ttl <= 0 or not self.enabled:
+            with self._lock:
+                self.bypassed += 1
+            return llm_call(self.llm.invoke, prompt)
+
+        key = self.key_for(prompt)
+        entry = self._lookup(key, ttl)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+                self.tokens_saved += entry['prompt_tokens'] + entry['completion_tokens']
+            return AIMessage(content=entry['content'])
+
+        response = llm_call(self.llm.invoke, prompt)
+        usage = getattr(response, 'usage_metadata', None) or {}
+        entry = {
+            'site': site,
+            'model': self.model_name,
+            'content': response.content,
+            'prompt_tokens': usage.get('input_tokens') or estimate_tokens(prompt),
+            'completion_tokens': usage.get('output_tokens') or estimate_tokens(response.content),
+            'cached_at': time.time()
+        }
+        self._remember(key, entry)
+        try:
+            self.store.set(key, entry, ttl=ttl)
+        except Exception as e:
+            print(f"  ❌ Error caching LLM response: {str(e)}")
+        with self._lock:
+            self.misses += 1
+        return response
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and estimated tokens saved for this process."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'model': self.model_name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+                'tokens_saved': self.tokens_saved
+            }
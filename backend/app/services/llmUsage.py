@@ -0,0 +1,74 @@
+import time
+import threading
+from typing import Any, Dict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+
+class LLMUsageTracker(BaseCallbackHandler):
+    """
+    LangChain callback that counts LLM calls, tokens and time spent in the model.
+    Attach it with `llm.callbacks = [tracker]` so calls made inside chains are counted too.
+    Token counts come from the model's usage metadata, falling back to ~4 chars per token.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[Any, float] = {}
+        self._prompt_chars: Dict[Any, int] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.llm_seconds = 0.0
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        with self._lock:
+            self._started[run_id] = time.time()
+            self._prompt_chars[run_id] = sum(len(p) for p in prompts)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        with self._lock:
+            self._started[run_id] = time.time()
+            self._prompt_chars[run_id] = sum(len(str(m.content)) for batch in messages for m in batch)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs) -> None:
+        prompt_tokens, completion_tokens = None, 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, 'message', None)
+                usage = getattr(message, 'usage_metadata', None) if message else None
+                if usage:
+                    prompt_tokens = (prompt_tokens or 0) + usage.get('input_tokens', 0)
+                    completion_tokens += usage.get('output_tokens', 0)
+                else:
+                    completion_tokens += len(generation.text) // 4
+
+        with self._lock:
+            started = self._started.pop(run_id, time.time())
+            prompt_chars = self._prompt_chars.pop(run_id, 0)
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens if prompt_tokens is not None else prompt_chars // 4
+            self.completion_tokens += completion_tokens
+            self.llm_seconds += time.time() - started
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        with self._lock:
+            self._started.pop(run_id, None)
+            self._prompt_chars.pop(run_id, None)
+            self.errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'llm_calls': self.calls,
+                'llm_errors': self.errors,
+                'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens,
+                'llm_seconds': round(self.llm_seconds, 2)
+            }
@@ -0,0 +1,104 @@
+import os
+from datetime import timedelta
+from typing import Any, Callable, List
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pgvector.django import CosineDistance
+
+from app.models import DocumentChunk
+from .vectorIndex import STALE_INDEX_GRACE_SECONDS, index_key
+
+# Candidates the HNSW scan collects per query (pgvector's default is 40, its maximum 1000).
+# The corpus/index_key filter is applied to those candidates afterwards, so with many
+# corpora in the table a small one could otherwise come back with fewer than k chunks.
+PGVECTOR_EF_SEARCH = min(int(os.environ.get("PGVECTOR_EF_SEARCH", "200")), 1000)
+
+
+class PgVectorRetriever(BaseRetriever):
+    """
+    Retriever backed by the DocumentChunk table and its HNSW index.
+    Drop-in replacement for the Chroma retrievers returned by load_club_context: if the
+    approximate scan finds fewer than k chunks of this index after filtering, the index's
+    chunks are searched exactly, so like Chroma it returns k whenever there are k.
+    """
+    corpus: str
+    index_key: str
+    embeddings: Any
+    k: int = 5
+
+    def _nearest(self, query_vector: List[float], exact: bool) -> List[DocumentChunk]:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # SET LOCAL lasts until the end of this transaction only
+            if exact:
+                cursor.execute("SET LOCAL enable_indexscan = off")
+            else:
+                cursor.execute(f"SET LOCAL hnsw.ef_search = {max(PGVECTOR_EF_SEARCH, self.k)}")
+            return list(
+                DocumentChunk.objects
+                .filter(corpus=self.corpus, index_key=self.index_key)
+                .order_by(CosineDistance('embedding', query_vector))[:self.k]
+            )
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        query_vector = self.embeddings.embed_query(query)
+        chunks = self._nearest(query_vector, exact=False)
+        if len(chunks) < self.k:
+            # Corpora are a few hundred chunks at most, so an exact scan of one is cheap
+            chunks = self._nearest(query_vector, exact=True)
+        return [Document(page_content=chunk.content, metadata=chunk.metadata) for chunk in chunks]
+
+
+def _index_lock_id(key: str) -> int:
+    """Map an index key onto a signed 64-bit id for pg_advisory_xact_lock."""
+    return int(key[:15], 16)
+
+
+def get_pgvector_retriever(name: str, source_paths: List[str], embeddings,
+                           build_documents: Callable[[], list], fingerprint: str = "",
+                           k: int = 5) -> PgVectorRetriever:
+    """
+    Return a retriever over the pgvector index for the given documents, building it
+    first if no worker has indexed this version of the documents yet.
+
+    Chunks from older versions of the documents are kept for STALE_INDEX_GRACE_SECONDS
+    after the current version was indexed, as with the Chroma indexes, since retrievers in
+    other workers may still be searching them.
+    """
+    key = index_key(name, source_paths, fingerprint)
+    built_at = DocumentChunk.objects.filter(corpus=name, index_key=key).aggregate(built_at=Max('created_at'))['built_at']
+
+    if built_at is None:
+        with transaction.atomic():
+            # Serialize builds across workers and nodes; the loser finds the rows already there
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_xact_lock(%s)", [_index_lock_id(key)])
+
+            if not DocumentChunk.objects.filter(corpus=name, index_key=key).exists():
+                print(f"  Building pgvector index {name} ({key[:8]})...")
+                documents = build_documents()
+                vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+                DocumentChunk.objects.bulk_create([
+                    DocumentChunk(
+                        corpus=name,
+                        index_key=key,
+                        position=i,
+                        content=doc.page_content,
+                        metadata=doc.metadata,
+                        embedding=vector
+                    )
+                    for i, (doc, vector) in enumerate(zip(documents, vectors))
+                ], batch_size=100)
+                print(f"  ✓ Indexed {len(documents)} chunks into pgvector")
+    elif timezone.now() - built_at >= timedelta(seconds=STALE_INDEX_GRACE_SECONDS):
+        # Drop chunks from older versions of the same documents
+        stale = DocumentChunk.objects.filter(corpus=name).exclude(index_key=key).delete()[0]
+        if stale:
+            print(f"  Removed {stale} stale pgvector chunks from {name}")
+
+    print(f"  ✓ Using pgvector index {name} ({key[:8]})")
+    return PgVectorRetriever(corpus=name, index_key=key, embeddings=embeddings, k=k)
@@ -0,0 +1,481 @@
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.models import EMBEDDING_DIMENSIONS
+
+from .cacheStore import CacheLocation, cache_backend_name
+from .fileCache import JsonFileCache, cache_dir, env_setting
+from .llmCache import estimate_tokens
+
+# live: real APIs; record: real APIs, responses saved as fixtures; replay: fixtures only;
+# fake: synthetic responses with configurable latency and failures
+PROVIDER_MODES = ["live", "record", "replay", "fake"]
+
+
+class FixtureMissingError(KeyError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+# Named like the Google API exceptions so the resilience layer treats injected failures the same way
+class ServiceUnavailable(Exception):
+    pass
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def fixture_key(kind: str, payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True) if not isinstance(payload, str) else payload
+    return hashlib.sha256(f"{kind}\n{raw}".encode()).hexdigest()
+
+
+def provider_mode() -> str:
+    return env_setting("HYPERMAIL_PROVIDER_MODE", "live").lower()
+
+
+def fixture_dir() -> str:
+    """Where record mode writes fixtures and replay mode reads them."""
+    return env_setting("HYPERMAIL_FIXTURE_DIR", os.path.join(os.getcwd(), "fixtures"))
+
+
+def messages_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(m.content) for m in messages)
+
+
+class FixtureStore:
+    """Recorded responses, one JSON file per request under <fixture dir>/<kind>/."""
+
+    def __init__(self, kind: str, root: Optional[str] = None):
+        self.kind = kind
+        self.files = JsonFileCache(kind, root=root or fixture_dir())
+
+    def load(self, payload: Any) -> Any:
+        entry = self.files.get(fixture_key(self.kind, payload))
+        if entry is None:
+            raise FixtureMissingError(
+                f"No recorded {self.kind} fixture for this request; run once with HYPERMAIL_PROVIDER_MODE=record"
+            )
+        return entry['response']
+
+    def save(self, payload: Any, response: Any) -> None:
+        self.files.set(fixture_key(self.kind, payload), {'request': payload, 'response': response})
+
+
+class FakeBehaviour:
+    """
+    Latency and failure injection for the fake providers. Latency is lognormal around
+    latency_ms (sigma 0 gives a fixed delay); error_rate and rate_limit_rate are the
+    chances a call raises ServiceUnavailable or ResourceExhausted.
+    """
+
+    def __init__(self, latency_ms: float = 0, latency_sigma: float = 0, error_rate: float = 0,
+                 rate_limit_rate: float = 0, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls, prefix: str, latency_ms: float = 0) -> "FakeBehaviour":
+        """Read e.g. FAKE_LLM_LATENCY_MS, FAKE_LLM_LATENCY_SIGMA, FAKE_LLM_ERROR_RATE, FAKE_LLM_RATE_LIMIT_RATE."""
+        seed = os.environ.get("FAKE_SEED")
+        return cls(
+            latency_ms=float(os.environ.get(f"{prefix}_LATENCY_MS", latency_ms)),
+            latency_sigma=float(os.environ.get(f"{prefix}_LATENCY_SIGMA", "0")),
+            error_rate=float(os.environ.get(f"{prefix}_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.environ.get(f"{prefix}_RATE_LIMIT_RATE", "0")),
+            seed=int(seed) if seed else None
+        )
+
+    def simulate(self) -> None:
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            delay = self.latency_ms * math.exp(self._random.gauss(0, self.latency_sigma)) if self.latency_sigma else self.latency_ms
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if roll < self.error_rate:
+            raise ServiceUnavailable("503 injected service failure")
+        if roll < self.error_rate + self.rate_limit_rate:
+            raise ResourceExhausted("429 injected quota exhaustion, retry in 2s")
+
+
+def synthetic_response(prompt: str) -> str:
+    """
+    Deterministic stand-in for a Gemini answer, shaped like what each prompt asks for
+    (JSON answers, template selections, contact lists, emails) so parsing code paths run.
+    """
+    digest = hashlib.sha256(prompt.encode()).hexdigest()
+    rng = random.Random(digest)
+    tag = digest[:8]
+
+    if "JSON object whose keys are the question numbers" in prompt:
+        questions = re.findall(r"^\s*(\d+)\.\s+(.+)$", prompt.split("QUESTIONS:")[-1], re.MULTILINE)
+        return json.dumps({n: f"Synthetic answer {tag} to: {q.strip()}" for n, q in questions})
+
+    if "JSON array of company objects" in prompt:
+        return json.dumps([
+            {
+                'name': f"Synthetic Company {tag}-{i}",
+                'website': f"https://synthetic-{tag}-{i}.example.com",
+                'email': f"partnerships@synthetic-{tag}-{i}.example.com",
+                'description': "A synthetic company used for offline runs.",
+                'contact_person': "Jordan Avery",
+                'key_values': "Innovation, engineering education",
+                'industry': "Engineering",
+                'location': "Colorado",
+                'size': rng.choice(["Small", "Medium", "Large"])
+            }
+            for i in range(10)
+        ])
+
+    if "decision-makers who would likely handle sponsorship requests" in prompt:
+        return (
+            "1. Jordan Avery - Sponsorship Manager\n"
+            "2. Casey Morgan - Marketing Director\n"
+            "3. Riley Chen - Engineering Director"
+        )
+
+    if "FINAL SELECTION: TEMPLATE" in prompt:
+        count = max(1, len(re.findall(r"^\s*TEMPLATE \d+:", prompt, re.MULTILINE)))
+        return f"Synthetic ranking {tag}.\nFINAL SELECTION: TEMPLATE {rng.randint(1, count)}"
+
+    if "SUBJECT:" in prompt:
+        return (
+            f"SUBJECT: Partnership with CU Hyperloop ({tag})\n\n"
+            "Hello [company name],\n\n"
+            "My name is Matis, and I am the Business Development Lead for CU Hyperloop. "
+            "This is a synthetic email generated offline.\n\nThank you,\nMatis"
+        )
+
+    words = re.findall(r"[A-Za-z]{4,}", prompt)
+    sample = " ".join(rng.sample(words, min(len(words), 60))) if words else ""
+    return f"Synthetic response {tag}.\n{sample}"
+
+
+class FakeChatModel(BaseChatModel):
+    """Synthetic chat model; drop-in for ChatGoogleGenerativeAI, including inside RetrievalQA."""
+
+    behaviour: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.behaviour is not None:
+            self.behaviour.simulate()
+        prompt = messages_text(messages)
+        content = synthetic_response(prompt)
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                'input_tokens': estimate_tokens(prompt),
+                'output_tokens': estimate_tokens(content),
+                'total_tokens': estimate_tokens(prompt) + estimate_tokens(content)
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class RecordingChatModel(BaseChatModel):
+    """Calls the wrapped chat model and saves every response as a fixture."""
+
+    inner: Any
+    store: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        response = self.inner.invoke(messages)
+        (self.store or FixtureStore("llm")).save(messages_text(messages), {
+            'content': response.content,
+            'usage_metadata': dict(getattr(response, 'usage_metadata', None) or {})
+        })
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+
+class ReplayChatModel(BaseChatModel):
+    """Serves recorded chat responses; unrecorded prompts raise FixtureMissingError."""
+
+    store: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        recorded = (self.store or FixtureStore("llm")).load(messages_text(messages))
+        message = AIMessage(content=recorded['content'], usage_metadata=recorded.get('usage_metadata') or None)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic unit vectors derived from a hash of the text."""
+
+    def __init__(self, behaviour: Optional[FakeBehaviour] = None, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.behaviour = behaviour
+        self.dimensions = dimensions
+
+    def _vector(self, text: str) -> List[float]:
+        rng = random.Random(hashlib.sha256(text.encode()).hexdigest())
+        vector = [rng.gauss(0, 1) for _ in range(self.dimensions)]
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.behaviour is not None:
+            self.behaviour.simulate()
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.behaviour is not None:
+            self.behaviour.simulate()
+        return self._vector(text)
+
+
+class RecordingEmbeddings(Embeddings):
+    def __init__(self, embeddings: Embeddings, store: Optional[FixtureStore] = None):
+        self.embeddings = embeddings
+        self.store = store or FixtureStore("embeddings")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.embeddings.embed_documents(texts)
+        self.store.save({'documents': texts}, vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.embeddings.embed_query(text)
+        self.store.save({'query': text}, vector)
+        return vector
+
+
+class ReplayEmbeddings(Embeddings):
+    def __init__(self, store: Optional[FixtureStore] = None):
+        self.store = store or FixtureStore("embeddings")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.store.load({'documents': texts})
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.store.load({'query': text})
+
+
+class FakeSearch:
+    """Synthetic Google Search results with the same keys as GoogleSearchAPIWrapper.results."""
+
+    def __init__(self, behaviour: Optional[FakeBehaviour] = None):
+        self.behaviour = behaviour
+
+    def results(self, query: str, num_results: int, **kwargs) -> List[Dict]:
+        if self.behaviour is not None:
+            self.behaviour.simulate()
+        digest = hashlib.sha256(query.encode()).hexdigest()
+        return [
+            {
+                'title': f"{query.title()} - Result {i + 1}",
+                'link': f"https://example.com/{digest[:12]}/{i + 1}",
+                'snippet': f"Synthetic snippet {digest[i * 4:i * 4 + 8]} about {query}."
+            }
+            for i in range(num_results)
+        ]
+
+
+class RecordingSearch:
+    def __init__(self, search, store: Optional[FixtureStore] = None):
+        self.search = search
+        self.store = store or FixtureStore("search")
+
+    def results(self, query: str, num_results: int, **kwargs) -> List[Dict]:
+        results = self.search.results(query, num_results, **kwargs)
+        self.store.save({'query': query, 'num_results': num_results, **kwargs}, results)
+        return results
+
+
+class ReplaySearch:
+    def __init__(self, store: Optional[FixtureStore] = None):
+        self.store = store or FixtureStore("search")
+
+    def results(self, query: str, num_results: int, **kwargs) -> List[Dict]:
+        return self.store.load({'query': query, 'num_results': num_results, **kwargs})
+
+
+class _GeneratedContent:
+    """The slice of google.generativeai's response that GenerateEmails reads."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """Stand-in for genai.GenerativeModel used by GenerateEmails."""
+
+    def __init__(self, behaviour: Optional[FakeBehaviour] = None):
+        self.behaviour = behaviour
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict] = None) -> _GeneratedContent:
+        if self.behaviour is not None:
+            self.behaviour.simulate()
+        # Company suggestions are sampled fresh on purpose, so vary them like the real model would
+        return _GeneratedContent(synthetic_response(f"{prompt}\n{time.time()}"))
+
+
+class RecordingGenerativeModel:
+    def __init__(self, model, store: Optional[FixtureStore] = None):
+        self.model = model
+        self.store = store or FixtureStore("generative")
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict] = None) -> _GeneratedContent:
+        response = self.model.generate_content(prompt, generation_config=generation_config)
+        self.store.save(prompt, response.text)
+        return response
+
+
+class ReplayGenerativeModel:
+    def __init__(self, store: Optional[FixtureStore] = None):
+        self.store = store or FixtureStore("generative")
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict] = None) -> _GeneratedContent:
+        return _GeneratedContent(self.store.load(prompt))
+
+
+@dataclass
+class Providers:
+    """
+    The backends EmailGenerator and GenerateEmails talk to, the names caches key them by,
+    and where those caches (and vector indexes) keep their entries.
+    """
+
+    mode: str
+    llm: Any
+    embeddings: Embeddings
+    search: Any
+    llm_name: str
+    embedding_name: str
+    cache: CacheLocation = field(default_factory=CacheLocation)
+
+    @property
+    def persistent(self) -> bool:
+        # Only real responses may be written to the database or shared caches
+        return self.mode in ["live", "record"]
+
+
+def _cache_location(mode: str, cache_root: Optional[str]) -> CacheLocation:
+    if mode == "live":
+        return CacheLocation(root=cache_root)
+    # Keep offline and recording runs away from the live caches: synthetic answers must never
+    # be served to real requests, and a recording run has to miss every cache to capture it all
+    backend = None
+    if cache_backend_name() == "postgres":
+        # The shared database cache is live data too; keep this run on disk under its own root
+        print(f"  Provider mode '{mode}': using the sqlite cache backend instead of postgres")
+        backend = "sqlite"
+    return CacheLocation(backend=backend, root=cache_root or cache_dir(mode))
+
+
+def build_providers(mode: Optional[str] = None, llm_model: Optional[str] = None,
+                    embedding_model: str = "models/embedding-001", temperature: float = 0.2,
+                    cache_root: Optional[str] = None) -> Providers:
+    """
+    Build the LLM, embedding and search backends for mode (default HYPERMAIL_PROVIDER_MODE).
+    Caches use cache_root if given; otherwise live mode uses the shared cache root and the
+    other modes a <cache root>/<mode>/ directory of their own.
+    """
+    mode = (mode or provider_mode()).lower()
+    if mode not in PROVIDER_MODES:
+        raise ValueError(f"Unknown provider mode '{mode}', expected one of {PROVIDER_MODES}")
+    llm_model = llm_model or os.environ.get("GEMINI_MODEL")
+    cache = _cache_location(mode, cache_root)
+
+    if mode == "fake":
+        return Providers(
+            mode=mode,
+            llm=FakeChatModel(behaviour=FakeBehaviour.from_env("FAKE_LLM")),
+            embeddings=FakeEmbeddings(FakeBehaviour.from_env("FAKE_EMBEDDING")),
+            search=FakeSearch(FakeBehaviour.from_env("FAKE_SEARCH")),
+            llm_name=f"fake/{llm_model}",
+            embedding_name=f"fake/{embedding_model}",
+            cache=cache
+        )
+    if mode == "replay":
+        return Providers(
+            mode=mode,
+            llm=ReplayChatModel(),
+            embeddings=ReplayEmbeddings(),
+            search=ReplaySearch(),
+            llm_name=f"replay/{llm_model}",
+            embedding_name=f"replay/{embedding_model}",
+            cache=cache
+        )
+
+    from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+    try:
+        from langchain_google_community import GoogleSearchAPIWrapper
+    except ImportError:
+        from langchain_community.utilities import GoogleSearchAPIWrapper
+
+    llm = ChatGoogleGenerativeAI(
+        model=llm_model,
+        google_api_key=os.environ.get("GEMINI_API_KEY"),
+        temperature=temperature
+    )
+    embeddings = GoogleGenerativeAIEmbeddings(
+        model=embedding_model,
+        google_api_key=os.environ.get("GEMINI_API_KEY")
+    )
+    search = GoogleSearchAPIWrapper(
+        google_api_key=os.environ.get("GOOGLE_API_KEY"),
+        google_cse_id=os.environ.get("GOOGLE_CSE_ID")
+    )
+    if mode == "record":
+        return Providers(
+            mode=mode,
+            llm=RecordingChatModel(inner=llm),
+            embeddings=RecordingEmbeddings(embeddings),
+            search=RecordingSearch(search),
+            llm_name=llm_model,
+            embedding_name=embedding_model,
+            cache=cache
+        )
+    return Providers(
+        mode=mode,
+        llm=llm,
+        embeddings=embeddings,
+        search=search,
+        llm_name=llm_model,
+        embedding_name=embedding_model,
+        cache=cache
+    )
+
+
+def build_generative_model(mode: Optional[str] = None, model_name: Optional[str] = None):
+    """The google.generativeai model GenerateEmails uses, for the given provider mode."""
+    mode = (mode or provider_mode()).lower()
+    if mode == "fake":
+        return FakeGenerativeModel(FakeBehaviour.from_env("FAKE_LLM"))
+    if mode == "replay":
+        return ReplayGenerativeModel()
+
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
+    model = genai.GenerativeModel(model_name or os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash-001'))
+    return RecordingGenerativeModel(model) if mode == "record" else model
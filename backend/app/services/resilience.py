@@ -0,0 +1,225 @@
+import os
+import re
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Callable, Iterator, Optional
+
+# Attempts per call (first try included) and the exponential backoff bounds, in seconds
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", "1.0"))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", "20"))
+
+# A dependency's circuit opens when at least this share of its recent calls failed...
+CIRCUIT_FAILURE_RATE = float(os.environ.get("CIRCUIT_FAILURE_RATE", "0.5"))
+# ...over a window of this many calls, once at least CIRCUIT_MIN_CALLS were made
+CIRCUIT_WINDOW = int(os.environ.get("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.environ.get("CIRCUIT_MIN_CALLS", "5"))
+# Seconds an open circuit rejects calls before letting a probe through
+CIRCUIT_COOLDOWN = float(os.environ.get("CIRCUIT_COOLDOWN", "30"))
+
+_RATE_LIMIT_NAMES = {"ResourceExhausted", "TooManyRequests", "RateLimitError"}
+_TRANSIENT_NAMES = {
+    "ServiceUnavailable", "DeadlineExceeded", "InternalServerError", "GatewayTimeout",
+    "TimeoutError", "ConnectionError", "ConnectTimeout", "ReadTimeout", "RemoteDisconnected",
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    for attr in ("code", "status_code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "resp", None) or getattr(error, "response", None)
+    status = getattr(response, "status", None) or getattr(response, "status_code", None)
+    return int(status) if isinstance(status, (int, str)) and str(status).isdigit() else None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    if type(error).__name__ in _RATE_LIMIT_NAMES or _status_code(error) == 429:
+        return True
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits and transient server/network failures are retried; anything else is not."""
+    if is_rate_limited(error) or type(error).__name__ in _TRANSIENT_NAMES:
+        return True
+    status = _status_code(error)
+    return status is not None and status >= 500
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Server-suggested wait, from a Retry-After header or Gemini's retry_delay hint."""
+    response = getattr(error, "resp", None) or getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or (response if isinstance(response, dict) else {})
+    try:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        if value is not None:
+            return float(value)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    match = re.search(r"retry(?:_delay| in)\D{0,20}?(\d+(?:\.\d+)?)\s*s", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of a dependency's recent calls. When the failure rate over the
+    window crosses the threshold the circuit opens and calls fail fast for the cooldown;
+    then a single probe call is let through, and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, name: str, failure_rate: float = CIRCUIT_FAILURE_RATE, window: int = CIRCUIT_WINDOW,
+                 min_calls: int = CIRCUIT_MIN_CALLS, cooldown: float = CIRCUIT_COOLDOWN):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self.outcomes = deque(maxlen=window)
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def retry_in(self) -> float:
+        """Seconds until an open circuit lets a probe through (0 when closed)."""
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self.probing:
+                raise CircuitOpenError(self.name, max(remaining, 1.0))
+            self.probing = True
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.probing:
+                self.probing = False
+                if success:
+                    print(f"  ✓ Circuit for {self.name} closed")
+                    self.opened_at = None
+                    self.outcomes.clear()
+                else:
+                    self.opened_at = time.monotonic()
+                return
+
+            self.outcomes.append(success)
+            failures = self.outcomes.count(False)
+            if (self.opened_at is None and len(self.outcomes) >= self.min_calls
+                    and failures / len(self.outcomes) >= self.failure_rate):
+                print(f"  ❌ Circuit for {self.name} opened ({failures}/{len(self.outcomes)} recent calls failed)")
+                self.opened_at = time.monotonic()
+
+    def state(self) -> dict:
+        with self._lock:
+            return {
+                'open': self.opened_at is not None,
+                'recent_calls': len(self.outcomes),
+                'recent_failures': self.outcomes.count(False),
+            }
+
+
+class Dependency:
+    """
+    A remote dependency (Gemini, Google Search) behind a concurrency cap, optional rate
+    limiter, retries with exponential backoff and jitter, and a circuit breaker.
+
+    Rate limit responses are retried after the server's suggested delay when one is given.
+    If that delay is longer than RETRY_MAX_DELAY the error is raised immediately instead,
+    so callers shed load rather than sleeping through a quota window.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, limiter=None, max_attempts: int = RETRY_MAX_ATTEMPTS):
+        self.name = name
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.breaker = CircuitBreaker(name)
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+
+    def ensure_available(self) -> None:
+        """Fail fast before starting long work that needs this dependency while its circuit is open."""
+        remaining = self.breaker.retry_in()
+        if remaining > 0:
+            raise CircuitOpenError(self.name, remaining)
+
+    def _after_failure(self, error: Exception, attempt: int) -> None:
+        """Record a failed attempt and sleep before the next one, or re-raise if there is none."""
+        if not is_retryable(error):
+            # Bad requests say nothing about the dependency's health
+            self.breaker.record(True)
+            raise error
+        self.breaker.record(False)
+
+        delay = retry_after(error) if is_rate_limited(error) else None
+        if attempt + 1 >= self.max_attempts or (delay is not None and delay > RETRY_MAX_DELAY):
+            raise error
+        delay = delay if delay is not None else backoff_delay(attempt)
+        print(f"  ⚠️ {self.name} call failed ({type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+        time.sleep(delay)
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        for attempt in range(self.max_attempts):
+            self.breaker.before_call()
+            try:
+                with self._slots:
+                    if self.limiter is not None:
+                        self.limiter.acquire()
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                self._after_failure(e, attempt)
+                continue
+
+            self.breaker.record(True)
+            return result
+
+    def stream(self, fn: Callable, *args, **kwargs) -> Iterator:
+        """
+        Like call() for a fn returning an iterator (e.g. chat.stream): the concurrency slot
+        is held and the outcome recorded only once the stream is exhausted, since that is
+        when the request actually runs. A stream that fails before its first item is retried;
+        one that fails midway is not, as its items have already been handed to the caller.
+        """
+        for attempt in range(self.max_attempts):
+            self.breaker.before_call()
+            started = False
+            try:
+                with self._slots:
+                    if self.limiter is not None:
+                        self.limiter.acquire()
+                    for item in fn(*args, **kwargs):
+                        started = True
+                        yield item
+            except Exception as e:
+                if started:
+                    self.breaker.record(not is_retryable(e))
+                    raise
+                self._after_failure(e, attempt)
+                continue
+
+            self.breaker.record(True)
+            return
+
+    def state(self) -> dict:
+        return {'name': self.name, **self.breaker.state(), 'retry_in': round(self.breaker.retry_in(), 1)}
@@ -0,0 +1,67 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from .cacheStore import CacheLocation, CacheStore
+
+# How long a search result set is reused before Google is queried again (seconds)
+SEARCH_CACHE_TTL = int(os.environ.get("SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share an entry."""
+    return " ".join(query.lower().split())
+
+
+class CachedSearch:
+    """
+    Read-through cache around GoogleSearchAPIWrapper.results, shared by every research
+    function. Entries are keyed by normalized query and num_results and stored in the
+    "search" cache namespace, so a query is paid for once per TTL window across requests and workers.
+    """
+
+    def __init__(self, search, ttl: int = SEARCH_CACHE_TTL, location: Optional[CacheLocation] = None):
+        self.search = search
+        self.ttl = ttl
+        self.store = CacheStore("search", ttl=ttl, location=location)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, query: str, num_results: int) -> str:
+        raw = f"{normalize_query(query)}\n{num_results}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def results(self, query: str, num_results: int, fresh: bool = False, **kwargs) -> List[Dict]:
+        """Return cached results for query; fresh=True queries Google and replaces the cached set."""
+        key = self.key_for(query, num_results)
+        # Extra search parameters change the result set, so those calls bypass the cache
+        entry = None if kwargs or fresh else self.store.get(key)
+        if entry and time.time() - entry.get('fetched_at', 0) < self.ttl:
+            with self._lock:
+                self.hits += 1
+            return entry['results']
+
+        results = self.search.results(query, num_results, **kwargs)
+        with self._lock:
+            self.misses += 1
+        if not kwargs:
+            self.store.set(key, {
+                'query': normalize_query(query),
+                'num_results': num_results,
+                'results': results,
+                'fetched_at': time.time()
+            })
+        return results
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0
+            }
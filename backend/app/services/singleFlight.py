@@ -0,0 +1,110 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .cacheStore import CacheStore
+from .fileCache import cache_dir, file_lock
+
+
+def flight_key(*parts: Any) -> str:
+    """Key an in-flight run by everything that determines its result."""
+    return hashlib.sha256("\n".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.listeners: List[Callable[[Any], None]] = []
+        self.stop_checks: List[Callable[[], bool]] = []
+        self.lock = threading.Lock()
+
+    def should_stop(self) -> bool:
+        """True once every caller waiting on this run has given up on it."""
+        with self.lock:
+            checks = list(self.stop_checks)
+        return bool(checks) and all(check() for check in checks)
+
+    def publish(self, event: Any) -> None:
+        with self.lock:
+            listeners = list(self.listeners)
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"  ❌ Error delivering in-flight event: {str(e)}")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent runs of the same work. The first caller for a key runs fn;
+    anyone asking for that key while it is in flight waits and receives the same result.
+
+    Threads in one worker wait on an in-process event. Other gunicorn workers block on a
+    file lock under cache/locks/ and then pick up the result the leader left in the
+    "inflight" cache namespace, provided that run finished after they asked for it.
+
+    fn is called with a publish(event) function; every caller in this worker that passed a
+    listener receives the events published from the moment it joined. It also gets a
+    should_stop() function, true once every caller's own should_stop says it no longer
+    wants the result (callers that passed none always do), so the run can end early.
+    """
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.results = CacheStore(f"inflight/{namespace}")
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[Callable[[Any], None], Callable[[], bool]], Any],
+           listener: Optional[Callable[[Any], None]] = None,
+           should_stop: Optional[Callable[[], bool]] = None) -> Any:
+        """Return fn(publish, should_stop)'s result, sharing one run between all concurrent callers for key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            with call.lock:
+                if listener is not None:
+                    call.listeners.append(listener)
+                call.stop_checks.append(should_stop or (lambda: False))
+
+        if not leader:
+            print(f"  Joining in-flight {self.namespace} run {key[:12]}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._run_across_workers(key, fn, call)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _run_across_workers(self, key: str, fn: Callable[[Callable[[Any], None], Callable[[], bool]], Any],
+                            call: _Call) -> Any:
+        requested_at = time.time()
+        lock_path = os.path.join(cache_dir("locks"), f"{self.namespace}_{key}.lock")
+        with file_lock(lock_path):
+            # Another worker may have finished this run while we waited on the lock
+            shared = self.results.get(key)
+            if shared and shared.get('finished_at', 0) >= requested_at:
+                print(f"  Reusing {self.namespace} result from another worker ({key[:12]})")
+                return shared['result']
+
+            result = fn(call.publish, call.should_stop)
+            try:
+                self.results.set(key, {'result': result, 'finished_at': time.time()})
+            except Exception as e:
+                print(f"  ❌ Error sharing {self.namespace} result: {str(e)}")
+            return result
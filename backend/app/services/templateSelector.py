@@ -0,0 +1,47 @@
+import math
+from typing import Dict, List
+
+# Embedding inputs are truncated to stay well inside the embedding model's token limit
+MAX_EMBEDDING_CHARS = 6000
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class TemplateSelector:
+    """
+    Ranks email templates by vector similarity between each template (title, subject and
+    stored analysis) and a summary of the target company. Template vectors come from the
+    persistent embedding cache, so after the first run only the company summary is embedded.
+    """
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def template_text(self, entry: Dict) -> str:
+        template = entry['template']
+        return "\n".join([
+            template.get('title', ''),
+            template.get('subject', ''),
+            entry.get('analysis', ''),
+        ])[:MAX_EMBEDDING_CHARS]
+
+    def rank(self, templates_analysis: List[Dict], summary: str) -> List[Dict]:
+        """Return [{'index', 'title', 'score'}] for every template, best match first."""
+        template_vectors = self.embeddings.embed_documents(
+            [self.template_text(entry) for entry in templates_analysis]
+        )
+        query_vector = self.embeddings.embed_query(summary[:MAX_EMBEDDING_CHARS])
+
+        ranking = [
+            {
+                'index': i,
+                'title': entry['template'].get('title', 'Unnamed'),
+                'score': round(cosine_similarity(query_vector, vector), 4)
+            }
+            for i, (entry, vector) in enumerate(zip(templates_analysis, template_vectors))
+        ]
+        return sorted(ranking, key=lambda r: r['score'], reverse=True)
@@ -0,0 +1,97 @@
+import hashlib
+from typing import Callable, Dict, List
+
+from django.db.utils import ProgrammingError, OperationalError
+from django.utils import timezone
+
+from app.models import Template
+
+
+def template_body_hash(template: Dict) -> str:
+    """Hash a parsed template's body; any edit to the body produces a new analysis."""
+    return hashlib.sha256(template.get('body', '').encode()).hexdigest()
+
+
+def _template_type(template: Dict) -> str:
+    return 'parts' if 'parts' in template.get('title', '').lower() else 'monetary'
+
+
+def _store_analysis(template: Dict, body_hash: str, analysis: str) -> None:
+    """
+    Save a template's analysis on its Template row. Rows created from the templates file
+    (the ones with a body_hash) are matched by title and type, so editing a template's body
+    updates its row rather than adding another; older duplicates of it are removed.
+    """
+    title = template.get('title', '')
+    template_type = _template_type(template)
+    fields = {
+        'title': title,
+        'subject': template.get('subject', ''),
+        'body': template['body'],
+        'type': template_type,
+        'body_hash': body_hash,
+        'parsed': {k: v for k, v in template.items() if k != 'analysis'},
+        'analysis': analysis,
+        'analyzed_at': timezone.now(),
+    }
+
+    rows = Template.objects.filter(body_hash__isnull=False)
+    rows = rows.filter(title=title, type=template_type) if title else rows.filter(body_hash=body_hash)
+    existing = list(rows.order_by('created_at'))
+    if not existing:
+        Template.objects.create(**fields)
+        return
+
+    row = existing[0]
+    for name, value in fields.items():
+        setattr(row, name, value)
+    row.save(update_fields=list(fields))
+    stale = [other.pk for other in existing[1:]]
+    if stale:
+        Template.objects.filter(pk__in=stale).delete()
+        print(f"  Removed {len(stale)} outdated copies of template: {title or 'Unnamed'}")
+
+
+def load_template_analyses(templates: List[Dict], analyze_templates: Callable[[List[Dict]], List[Dict]]) -> List[Dict]:
+    """
+    Return analyses for the parsed templates in the shape produced by analyze_templates,
+    reading stored analyses from the Template model and only running analyze_templates
+    for templates that are new or whose body changed.
+    """
+    hashes = [template_body_hash(t) for t in templates]
+    try:
+        stored = {
+            t.body_hash: t
+            for t in Template.objects.filter(body_hash__in=hashes).exclude(analysis__isnull=True).order_by('created_at')
+        }
+    except (ProgrammingError, OperationalError) as e:
+        # Handle case where the table/columns don't exist yet (migrations not applied)
+        print(f"Database error reading stored template analyses: {e}")
+        return analyze_templates(templates)
+
+    pending = [t for t, h in zip(templates, hashes) if h not in stored]
+    print(f"  ✓ Reusing {len(templates) - len(pending)}/{len(templates)} stored template analyses")
+
+    fresh = {}
+    if pending:
+        for entry in analyze_templates(pending):
+            template = entry['template']
+            body_hash = template_body_hash(template)
+            fresh[body_hash] = entry
+
+            if not template.get('body') or entry['analysis'].startswith("Analysis failed"):
+                continue
+            try:
+                _store_analysis(template, body_hash, entry['analysis'])
+                print(f"  ✓ Stored analysis for template: {template.get('title', 'Unnamed')}")
+            except Exception as e:
+                print(f"  ❌ Error storing template analysis: {str(e)}")
+
+    analyses = []
+    for template, body_hash in zip(templates, hashes):
+        if body_hash in fresh:
+            analyses.append(fresh[body_hash])
+        else:
+            template['analysis'] = stored[body_hash].analysis
+            analyses.append({'template': template, 'analysis': stored[body_hash].analysis})
+    return analyses
@@ -0,0 +1,163 @@
+import os
+import time
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from langchain_community.vectorstores import Chroma
+
+from .clubInfoCache import hash_documents
+from .fileCache import cache_dir, file_lock
+
+# How many vector stores a single worker keeps open at once (least recently used are closed)
+MAX_LOADED_INDEXES = int(os.environ.get("VECTOR_INDEX_MAX_LOADED", "4"))
+
+# Written into an index directory once it is fully built
+COMPLETE_MARKER = ".complete"
+
+# Seconds an index built from older documents is kept after its replacement was built,
+# for worker processes that may still have it open
+STALE_INDEX_GRACE_SECONDS = int(os.environ.get("VECTOR_INDEX_STALE_GRACE", "3600"))
+
+# Loaded stores by persist directory, so indexes under different cache roots never mix
+_loaded_indexes = OrderedDict()
+_build_locks = {}
+_registry_lock = threading.Lock()
+
+
+def index_key(name: str, source_paths: List[str], fingerprint: str = "") -> str:
+    """
+    Key an index by its source document contents plus anything else that changes
+    the stored vectors (embedding model, chunking parameters).
+    """
+    raw = f"{name}\n{hash_documents(source_paths)}\n{fingerprint}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _prune_stale_indexes(root: str, name: str, keep: str) -> None:
+    """
+    Remove persisted indexes for name that were built from older documents. Other worker
+    processes may still be answering a request from one, so they are only removed once the
+    index replacing them is STALE_INDEX_GRACE_SECONDS old, each under its own build lock.
+    Called on every lookup: until then it is only a stat of keep's marker.
+    """
+    marker = os.path.join(root, keep, COMPLETE_MARKER)
+    try:
+        if time.time() - os.path.getmtime(marker) < STALE_INDEX_GRACE_SECONDS:
+            return
+    except FileNotFoundError:
+        return
+    for entry in os.listdir(root):
+        path = os.path.join(root, entry)
+        if entry.startswith(f"{name}_") and entry != keep and os.path.isdir(path):
+            with _registry_lock:
+                store = _loaded_indexes.pop(path, None)
+            if store is not None:
+                _close(store)
+            with file_lock(os.path.join(root, f"{entry}.lock")):
+                print(f"  Removing stale vector index: {entry}")
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _close(store: Chroma) -> None:
+    """
+    Release a store's memory. chromadb keeps one system per persist directory for the
+    life of the process, shared by every client opened on it, so dropping the store alone
+    frees nothing; closing its client stops the system once no other client uses it.
+    """
+    client = getattr(store, "_client", None)
+    if client is None:
+        return
+    try:
+        client.close()
+    except Exception as e:
+        print(f"  ❌ Error closing vector index: {str(e)}")
+
+
+def _build_lock(persist_directory: str) -> threading.Lock:
+    with _registry_lock:
+        return _build_locks.setdefault(persist_directory, threading.Lock())
+
+
+def _loaded(persist_directory: str):
+    with _registry_lock:
+        store = _loaded_indexes.get(persist_directory)
+        if store is not None:
+            _loaded_indexes.move_to_end(persist_directory)
+        return store
+
+
+def get_vectorstore(name: str, source_paths: List[str], embeddings,
+                    build_documents: Callable[[], list], fingerprint: str = "",
+                    cache_root: Optional[str] = None) -> Chroma:
+    """
+    Return a persistent Chroma store for the given documents.
+
+    The store lives under <cache root>/vector_index/<name>_<key>/ and is built at most once
+    per document version: build_documents is only called (under a cross-process lock)
+    when no complete index exists yet. Loaded stores are shared read-only by all
+    requests in the worker and bounded to MAX_LOADED_INDEXES. Building or loading one
+    index only holds that index's lock, so lookups of other indexes are never blocked.
+    """
+    key = index_key(name, source_paths, fingerprint)
+    root = cache_dir("vector_index", root=cache_root)
+    dirname = f"{name}_{key}"
+    persist_directory = os.path.join(root, dirname)
+    _prune_stale_indexes(root, name, keep=dirname)
+
+    store = _loaded(persist_directory)
+    if store is not None:
+        print(f"  ✓ Using loaded vector index {name} ({key[:8]})")
+        return store
+
+    with _build_lock(persist_directory):
+        # Another thread may have loaded it while we waited
+        store = _loaded(persist_directory)
+        if store is not None:
+            return store
+
+        with file_lock(os.path.join(root, f"{dirname}.lock")):
+            if not os.path.exists(os.path.join(persist_directory, COMPLETE_MARKER)):
+                # Either never built or a previous build was interrupted
+                shutil.rmtree(persist_directory, ignore_errors=True)
+                print(f"  Building vector index {name} ({key[:8]})...")
+                documents = build_documents()
+                built = Chroma.from_documents(
+                    documents=documents,
+                    embedding=embeddings,
+                    collection_name=name,
+                    persist_directory=persist_directory
+                )
+                # The store is opened again below; this client would keep the system alive
+                _close(built)
+                open(os.path.join(persist_directory, COMPLETE_MARKER), 'w').close()
+                print(f"  ✓ Indexed {len(documents)} chunks into {persist_directory}")
+
+        store = Chroma(
+            collection_name=name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory
+        )
+        print(f"  ✓ Loaded vector index {name} ({key[:8]})")
+
+        evicted = []
+        with _registry_lock:
+            _loaded_indexes[persist_directory] = store
+            while len(_loaded_indexes) > MAX_LOADED_INDEXES:
+                evicted.append(_loaded_indexes.popitem(last=False))
+
+    for path, evicted_store in evicted:
+        print(f"  Unloading vector index {os.path.basename(path)}")
+        _close(evicted_store)
+    return store
+
+
+def unload_indexes() -> None:
+    """Close every loaded store, e.g. before the cache root they live under is removed."""
+    with _registry_lock:
+        stores = list(_loaded_indexes.values())
+        _loaded_indexes.clear()
+    for store in stores:
+        _close(store)
@@ -0,0 +1,131 @@
+import os
+import time
+import threading
+import traceback
+
+from django.conf import settings
+
+from .concurrency import gemini, google_search
+
+# Preload attempts before the worker gives up and reports itself ready but degraded...
+PRELOAD_MAX_ATTEMPTS = int(os.environ.get("PRELOAD_MAX_ATTEMPTS", "5"))
+# ...waiting this many seconds after the first failure, doubling after each one
+PRELOAD_RETRY_DELAY = float(os.environ.get("PRELOAD_RETRY_DELAY", "5"))
+
+# Process-wide clients and preloaded context, built once per gunicorn worker
+_lock = threading.Lock()
+_email_generator = None
+_company_finder = None
+
+_state = {
+    'email_generator_ready': False,
+    'company_finder_ready': False,
+    'context_ready': False,
+    'templates_ready': False,
+    'preload_started': False,
+    'preload_attempts': 0,
+    'preload_seconds': None,
+    'degraded': False,
+    'error': None,
+}
+
+
+def preload_enabled() -> bool:
+    return os.environ.get('HYPERMAIL_PRELOAD', '0').lower() in ['true', '1', 'yes']
+
+
+def get_email_generator():
+    """Return the worker's shared EmailGenerator, building its clients on first use."""
+    global _email_generator
+    if _email_generator is None:
+        with _lock:
+            if _email_generator is None:
+                from app.test2 import EmailGenerator
+                _email_generator = EmailGenerator()
+                _state['email_generator_ready'] = True
+    return _email_generator
+
+
+def get_company_finder():
+    """Return the worker's shared GenerateEmails instance (configured Gemini model)."""
+    global _company_finder
+    if _company_finder is None:
+        with _lock:
+            if _company_finder is None:
+                from .generateEmails import GenerateEmails
+                _company_finder = GenerateEmails()
+                _state['company_finder_ready'] = True
+    return _company_finder
+
+
+def _preload_once():
+    generator = get_email_generator()
+    get_company_finder()
+
+    generator.load_club_info(
+        settings.SPONSORSHIP_PACKET_PATH,
+        settings.FDP_PATH,
+        settings.EMAIL_TEMPLATE_PATH
+    )
+    _state['context_ready'] = True
+
+    templates = generator.parse_email_templates(settings.EMAIL_TEMPLATE_PATH)
+    generator.load_template_analyses(templates)
+    _state['templates_ready'] = True
+
+
+def preload():
+    """
+    Build all clients and warm the club context, club answers and template analyses
+    so the first request in this worker doesn't pay for them. Failures are retried with
+    backoff; after PRELOAD_MAX_ATTEMPTS the worker reports ready but degraded, and
+    requests build whatever is missing lazily.
+    """
+    start_time = time.time()
+    try:
+        for attempt in range(PRELOAD_MAX_ATTEMPTS):
+            _state['preload_attempts'] = attempt + 1
+            try:
+                _preload_once()
+                _state['error'] = None
+                return
+            except Exception as e:
+                traceback.print_exc()
+                _state['error'] = str(e)
+            if attempt + 1 < PRELOAD_MAX_ATTEMPTS:
+                delay = PRELOAD_RETRY_DELAY * (2 ** attempt)
+                print(f"  ⚠️ Preload failed, retry {attempt + 1} in {delay:.0f}s")
+                time.sleep(delay)
+
+        print(f"  ❌ Preload failed {PRELOAD_MAX_ATTEMPTS} times, serving without warm state")
+        _state['degraded'] = True
+    finally:
+        _state['preload_seconds'] = round(time.time() - start_time, 2)
+
+
+def start_preload():
+    """Run preload() in a background thread so worker startup isn't blocked."""
+    with _lock:
+        if _state['preload_started']:
+            return
+        _state['preload_started'] = True
+    threading.Thread(target=preload, name="hypermail-preload", daemon=True).start()
+
+
+def readiness():
+    """
+    Return the warm-state flags. Without preloading the worker builds everything lazily
+    and is always ready; with preloading it is ready once the warm state has loaded, or
+    once preloading has given up (degraded, building lazily as if it never preloaded).
+    """
+    state = dict(_state)
+    state['ready'] = not state['preload_started'] or state['degraded'] or (
+        state['email_generator_ready'] and state['company_finder_ready']
+        and state['context_ready'] and state['templates_ready']
+    )
+    state['dependencies'] = [gemini.state(), google_search.state()]
+    if _email_generator is not None:
+        state['embedding_cache'] = _email_generator.embeddings.stats()
+        state['search_cache'] = _email_generator.search.stats()
+        state['llm_cache'] = _email_generator.chat.stats()
+    return state
@@ -0,0 +1,137 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Steps of a single workflow run that may execute at the same time
+WORKFLOW_MAX_WORKERS = int(os.environ.get("WORKFLOW_MAX_WORKERS", "6"))
+
+
+class WorkflowStepError(Exception):
+    """Raised when a workflow step fails; remaining steps are not started."""
+
+    def __init__(self, step, error):
+        super().__init__(f"Step '{step}' failed: {error}")
+        self.step = step
+        self.error = error
+
+
+class WorkflowCancelled(Exception):
+    """Raised when a workflow is stopped before all of its steps have run."""
+
+
+class WorkflowGraph:
+    """
+    Runs workflow steps as a dependency graph. Each step is called with the results of
+    the steps it depends on as keyword arguments, and starts as soon as those are done,
+    so independent steps run in parallel and total latency follows the critical path.
+
+    Steps run on a per-run thread pool, separate from the shared LLM and search executors,
+    so a step may freely wait on work it submits there.
+
+    If given, on_event is called with a JSON-serializable dict whenever a step starts,
+    finishes or fails, e.g. {'event': 'finished', 'step': 'company_info', 'seconds': 3.2}.
+    should_stop is checked before each step is started; once it returns True no further
+    steps start and run() raises WorkflowCancelled when the running ones are done.
+    """
+
+    def __init__(self, name: str, max_workers: int = WORKFLOW_MAX_WORKERS,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 should_stop: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.on_event = on_event
+        self.should_stop = should_stop
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add_step(self, name: str, fn: Callable, depends_on: Iterable[str] = ()) -> None:
+        if name in self.steps:
+            raise ValueError(f"Duplicate workflow step: {name}")
+        self.steps[name] = {'fn': fn, 'depends_on': list(depends_on)}
+
+    def _validate(self) -> None:
+        for name, step in self.steps.items():
+            for dep in step['depends_on']:
+                if dep not in self.steps:
+                    raise ValueError(f"Step '{name}' depends on unknown step '{dep}'")
+
+        # Depth-first search for cycles
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Workflow has a dependency cycle through '{name}'")
+            visiting.add(name)
+            for dep in self.steps[name]['depends_on']:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.steps:
+            visit(name)
+
+    def _emit(self, event: str, step: str, **details) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event({'event': event, 'step': step, 'workflow': self.name, **details})
+        except Exception as e:
+            # Progress reporting must never break the workflow itself
+            print(f"  ❌ Error reporting workflow event: {str(e)}")
+
+    def _run_step(self, name: str, kwargs: Dict[str, Any]) -> Any:
+        start_time = time.time()
+        self.timings[name] = {'start': start_time}
+        print(f"\n▶ Starting step: {name}")
+        self._emit('started', name)
+        try:
+            result = self.steps[name]['fn'](**kwargs)
+        except Exception as e:
+            self._emit('failed', name, error=str(e))
+            raise
+        end_time = time.time()
+        self.timings[name]['end'] = end_time
+        print(f"\n✓ Finished step: {name} ({end_time - start_time:.2f}s)")
+        self._emit('finished', name, seconds=round(end_time - start_time, 2))
+        return result
+
+    def run(self) -> Dict[str, Any]:
+        """Execute every step and return {step name: result}."""
+        self._validate()
+        results: Dict[str, Any] = {}
+        pending = dict(self.steps)
+        running = {}
+        run_start = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name) as executor:
+            while pending or running:
+                if pending and self.should_stop is not None and self.should_stop():
+                    print(f"\n■ Stopping workflow '{self.name}' ({len(pending)} steps not started)")
+                    wait(running)
+                    raise WorkflowCancelled(f"Workflow '{self.name}' was cancelled")
+
+                for name, step in list(pending.items()):
+                    if all(dep in results for dep in step['depends_on']):
+                        kwargs = {dep: results[dep] for dep in step['depends_on']}
+                        running[executor.submit(self._run_step, name, kwargs)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        # Let in-flight steps finish but start nothing new
+                        for other in running:
+                            other.cancel()
+                        raise WorkflowStepError(name, e) from e
+
+        total = time.time() - run_start
+        print(f"\nWorkflow '{self.name}' finished in {total:.2f}s:")
+        for name, timing in sorted(self.timings.items(), key=lambda item: item[1]['start']):
+            print(f"  {name:<24} +{timing['start'] - run_start:6.2f}s  {timing['end'] - timing['start']:6.2f}s")
+        return results
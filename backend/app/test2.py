@@ -1,31 +1,90 @@
 import os
+import copy
 import time
 import re
 import json
 import logging
-from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain.prompts import PromptTemplate
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
 from langchain.chains import RetrievalQA
-# Update to the non-deprecated import (install with: pip install -U langchain-google-community)
-try:
-    from langchain_google_community import GoogleSearchAPIWrapper
-except ImportError:
-    # Fall back to the deprecated version if the new one isn't installed
-    from langchain_community.utilities import GoogleSearchAPIWrapper
-    print("Warning: Using deprecated GoogleSearchAPIWrapper. Please install langchain-google-community.")
 from dotenv import load_dotenv, find_dotenv
 
+from .services.clubContext import ClubContextAssembler
+from .services.clubInfoCache import ClubInfoCache
+from .services.compaction import (
+    compact_relationship_intelligence, dedupe_search_results
+)
+from .services.concurrency import (
+    LLM_MAX_CONCURRENCY, RateLimitedSearch, fan_out_search, llm_stream, map_llm, map_parallel, submit_cached
+)
+from .services.embeddingCache import CachedEmbeddings
+from .services.freshness import IncrementalRun, ResearchCache, result_set_hash
+from .services.llmCache import CachedChat
+from .services.providers import build_providers
+from .services.searchCache import CachedSearch
+from .services.templateSelector import TemplateSelector
+from .services.templateStore import load_template_analyses
+from .services.workflowGraph import WorkflowGraph
+from .services.vectorIndex import get_vectorstore
+
 # Load environment variables
 load_dotenv(find_dotenv())
 
 GEMINI_MODEL = os.environ.get("GEMINI_MODEL")
-GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 
-GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
-GOOGLE_CSE_ID = os.environ.get("GOOGLE_CSE_ID")
+EMBEDDING_MODEL = "models/embedding-001"
+
+# relationship_intelligence_workflow returns its error as a message starting with this
+WORKFLOW_ERROR_PREFIX = "An error occurred during the relationship-enhanced email generation process"
+
+# "chroma" keeps per-worker indexes on disk, "pgvector" shares one index in the db service
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma").lower()
+
+# Questions asked of the club documents by EmailGenerator.extract_club_info, grouped by topic
+# so the batched extraction mode can answer each group with a single LLM call
+CLUB_QUESTION_GROUPS = {
+    "fundamentals": [
+        "What does CU Hyperloop do every single year and what do they compete in?",
+        "How did CU Hyperloop evolve from focusing on Hyperloop transportation concepts to developing tunnel boring machines, and how has this shift affected their team identity?",
+        "What is the mission and key goals of CU Hyperloop?",
+        "What are the main achievements and history of the club?",
+        "How are the roughly 50 team members organized into functional groups, and what is the workflow from initial concept to competition ready machine?",
+    ],
+    "culture": [
+        "What is the typical student experience like from joining CU Hyperloop as a new member to becoming a seasoned team contributor?",
+        "How does the team recruit new members each year, and what qualities or skills do they look for in potential team members?",
+        "What is the atmosphere like during the annual test dig events, and how does the team handle setbacks or technical failures?",
+        "What traditions or team-building activities has CU Hyperloop developed that contribute to their team cohesion and culture?",
+    ],
+    "sponsorship": [
+        "What sponsorship tiers does the club offer?",
+        "What kind of recognition do sponsors receive?",
+        "What specific real-world applications could this technology have beyond the competition, and how might it transform urban transportation?",
+        "If there are 4 main things that the club can provide value with to a sponsor what are they and how do they provide value?",
+        "What are the key benefits for sponsors to support CU Hyperloop, and how have past sponsors benefited from their involvement or been recognized?",
+    ],
+    "competition": [
+        "What metrics are used to judge success in the Not-a-Boring Competition, and how has CU Hyperloop optimized their machine to excel in these areas?",
+        "How does The Boring Company organize the Not-a-Boring Competition, and what is the complete competition experience like from arrival to the final event?",
+    ],
+    "technical": [
+        "How (in detail) does the hexapod propulsion system work and why it did it earn an Innovation Award in 2024?",
+        "How does the team's tunnel boring machine simultaneously handle excavation, propulsion, and tunnel reinforcement in a single integrated process?"
+        "How does the 3D printing tunnel support system work in real-time, and what materials are used to ensure structural integrity?",
+        "What is the complete autonomous control architecture that enabled their Accuracy Award in 2023, from sensors to decision-making algorithms?",
+    ],
+}
+
+CLUB_QUESTIONS = [question for group in CLUB_QUESTION_GROUPS.values() for question in group]
+
+# "embedding" ranks templates locally and only asks the LLM to break near-ties, "llm" always asks the LLM
+TEMPLATE_SELECTION_STRATEGY = os.environ.get("TEMPLATE_SELECTION_STRATEGY", "embedding")
+# Templates scoring within this cosine similarity of the best one are treated as a tie
+TEMPLATE_TIE_MARGIN = float(os.environ.get("TEMPLATE_TIE_MARGIN", "0.01"))
+
+# "per_question" asks each club question separately, "batched" answers a whole group per call
+CLUB_INFO_MODE = os.environ.get("CLUB_INFO_MODE", "per_question")
 
 # Set up detailed logging
 def log_section(section_name):
@@ -40,35 +99,36 @@ class RelationshipIntelligenceEngine:
     by analyzing decision-makers, strategic partnership opportunities, and cultural compatibility.
     """
     
-    def __init__(self, llm, search):
+    def __init__(self, llm, search, chat, club_context, cache_location=None):
         """Initialize the relationship intelligence engine with necessary components"""
         self.llm = llm
         self.search = search
-        self.contact_profiles = {}  # Store profiles of contacts
+        self.chat = chat  # cached wrapper around llm.invoke
+        self.club_context = club_context
+        # Per-company research artifacts, served stale while they refresh (see FRESHNESS_POLICIES)
+        self.contacts_research = ResearchCache("contacts", location=cache_location)
+        self.partnership_research = ResearchCache("partnership", location=cache_location)
+        self.culture_research = ResearchCache("culture", location=cache_location)
         # Configure logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger("RelationshipIntelligence")
     
-    def profile_decision_makers(self, company_name):
-        """Research and profile likely sponsorship decision-makers at the company."""
+    def profile_decision_makers(self, company_name, previous=None):
+        """
+        Research and profile likely sponsorship decision-makers at the company.
+        previous is the stale cached value when this runs as a background refresh.
+        """
         log_section("PROFILING DECISION MAKERS")
         
-        # Check for cached profiles
-        cache_dir = os.path.join(os.getcwd(), "cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        cache_file = os.path.join(cache_dir, f"contacts_{company_name.replace(' ', '_').lower()}.json")
-        
-        if os.path.exists(cache_file):
-            try:
+        # Check for cached profiles (stale ones are served and refreshed in the background)
+        if previous is None:
+            cached_data = self.contacts_research.get(
+                company_name, refresh=lambda stale: self.profile_decision_makers(company_name, previous=stale)
+            )
+            if cached_data:
                 print(f"Loading cached contact profiles for {company_name}")
-                with open(cache_file, 'r') as f:
-                    cached_data = json.load(f)
-                    print(f"  ✓ Found cached profiles from {cached_data.get('timestamp', 'unknown date')}")
-                    self.contact_profiles = cached_data.get('profiles', {})
-                    return self.contact_profiles
-            except Exception as e:
-                print(f"  ❌ Error loading cache: {str(e)}")
-                print("  Proceeding with fresh research...")
+                print(f"  ✓ Found cached profiles from {cached_data.get('timestamp', 'unknown date')}")
+                return cached_data.get('profiles', {})
         
         # Create search queries to find relevant contacts
         search_queries = [
@@ -79,18 +139,19 @@ class RelationshipIntelligenceEngine:
             f"{company_name} engineering director"
         ]
         
-        # Collect search results for potential contacts
+        # Collect search results for potential contacts (queries run concurrently)
         contact_search_results = []
-        for i, query in enumerate(search_queries):
+        search_hashes = {}
+        outcomes = fan_out_search(self.search, search_queries, num_results=3, fresh=previous is not None)
+        for i, (query, (outcome, error)) in enumerate(zip(search_queries, outcomes)):
+            print(f"\nContact search query {i+1}/{len(search_queries)}:")
+            print(f"  {query}")
             try:
-                print(f"\nContact search query {i+1}/{len(search_queries)}:")
-                print(f"  {query}")
-                
-                start_time = time.time()
-                results = self.search.results(query, num_results=3)
-                end_time = time.time()
-                
-                print(f"  ✓ Got {len(results)} results ({end_time - start_time:.2f}s)")
+                if error is not None:
+                    raise error
+                results, elapsed = outcome
+                search_hashes[query] = result_set_hash(results)
+                print(f"  ✓ Got {len(results)} results ({elapsed:.2f}s)")
                 
                 for j, result in enumerate(results):
                     # Store the result with query context
@@ -101,18 +162,14 @@ class RelationshipIntelligenceEngine:
                         "snippet": result['snippet']
                     })
                     print(f"    Result {j+1}: {result['title'][:50]}...")
-                
-                # Add delay between searches
-                delay = 2
-                print(f"  Waiting {delay}s before next query...")
-                time.sleep(delay)
-                
             except Exception as e:
                 print(f"  ❌ Error searching for '{query}': {str(e)}")
-                # Wait longer after error
-                recovery_delay = 5
-                print(f"  Waiting {recovery_delay}s to recover from error...")
-                time.sleep(recovery_delay)
+        
+        if self.contacts_research.keep_previous(company_name, previous, search_hashes, search_queries):
+            return previous.get('profiles', {})
+        run = IncrementalRun(previous)
+        
+        contact_search_results = dedupe_search_results(contact_search_results)
         
         # Process the search results to identify relevant contacts
         identify_contacts_prompt = PromptTemplate(
@@ -152,7 +209,7 @@ class RelationshipIntelligenceEngine:
             )
             
             start_time = time.time()
-            contacts_result = self.llm.invoke(prompt).content
+            contacts_result = run.invoke_llm("identify_contacts", prompt, self.chat, site="identify_contacts")
             end_time = time.time()
             
             print(f"  ✓ Contacts identified ({end_time - start_time:.2f}s)")
@@ -168,32 +225,45 @@ class RelationshipIntelligenceEngine:
                 # Use the roles as placeholder names
                 contact_names = role_matches if role_matches else ["Sponsorship Manager", "Marketing Director", "CSR Lead"]
             
+            # Profiles are only returned (as the step's result), never kept on this shared engine,
+            # so concurrent requests and background refreshes can't mix them
+            profiles = {}
             print(f"  Building profiles for {len(contact_names)} contacts/roles:")
-            for i, name in enumerate(contact_names[:3]):  # Limit to top 3
+            contact_names = contact_names[:3]  # Limit to top 3
+            for i, name in enumerate(contact_names):
                 print(f"    {i+1}. {name}")
-                self.build_contact_profile(name, company_name)
-                # Add delay between profile builds
-                time.sleep(2)
+            
+            # Profiles are built concurrently; the shared LLM rate limiter paces the calls. On a
+            # refresh, contacts that were already profiled keep their profile.
+            outcomes = map_parallel(
+                lambda name: run.step(
+                    f"profile:{name}", [name, company_name], lambda: self.build_contact_profile(name, company_name)
+                ),
+                contact_names
+            )
+            for name, (profile, error) in zip(contact_names, outcomes):
+                if error is not None:
+                    raise error
+                profiles[name] = profile
             
             # Cache the results
             try:
-                with open(cache_file, 'w') as f:
-                    json.dump({
-                        'profiles': self.contact_profiles,
-                        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-                    }, f)
-                print(f"  ✓ Contact profiles cached to {cache_file}")
+                self.contacts_research.set(company_name, {
+                    'profiles': profiles
+                }, run, search_hashes)
+                print(f"  ✓ Contact profiles cached for {company_name}")
             except Exception as e:
                 print(f"  ❌ Error caching profiles: {str(e)}")
             
-            return self.contact_profiles
+            return profiles
             
         except Exception as e:
             print(f"  ❌ Error identifying contacts: {str(e)}")
             # Create fallback generic profiles
             fallback_titles = ["Marketing Director", "Sponsorship Manager", "Corporate Social Responsibility Lead"]
+            profiles = {}
             for title in fallback_titles:
-                self.contact_profiles[title] = {
+                profiles[title] = {
                     'name': title,
                     'role': title,
                     'background': f"Generic profile for {title} position",
@@ -201,7 +271,7 @@ class RelationshipIntelligenceEngine:
                     'communication_style': "Professional",
                     'connections': []
                 }
-            return self.contact_profiles
+            return profiles
     
     def build_contact_profile(self, contact_name, company_name):
         """Build a detailed profile for a specific contact."""
@@ -233,7 +303,8 @@ class RelationshipIntelligenceEngine:
                 company_name=company_name
             )
             
-            profile_result = self.llm.invoke(prompt).content
+            # The profile and connection lookups are independent, so they run concurrently
+            profile_future = submit_cached(self.chat.invoke, prompt, site="contact_profile")
             
             # Look for potential university connections
             connection_prompt = PromptTemplate(
@@ -252,12 +323,14 @@ class RelationshipIntelligenceEngine:
                 """
             )
             
-            connection_result = self.llm.invoke(
+            connection_future = submit_cached(
+                self.chat.invoke,
                 connection_prompt.format(
                     contact_name=contact_name,
                     company_name=company_name
-                )
-            ).content
+                ),
+                site="contact_connections"
+            )
             
             # Analyze their communication style
             communication_prompt = PromptTemplate(
@@ -278,16 +351,20 @@ class RelationshipIntelligenceEngine:
                 """
             )
             
-            communication_result = self.llm.invoke(
+            # Communication style depends on the profile, so only it waits
+            profile_result = profile_future.result().content
+            communication_result = self.chat.invoke(
                 communication_prompt.format(
                     contact_name=contact_name,
                     company_name=company_name,
                     profile=profile_result
-                )
+                ),
+                site="contact_communication"
             ).content
+            connection_result = connection_future.result().content
             
-            # Store the complete profile
-            self.contact_profiles[contact_name] = {
+            # Return the complete profile
+            profile = {
                 'name': contact_name,
                 'role': re.search(r'(?:Director|Manager|Lead|Officer|Head)', contact_name) and contact_name or "Decision Maker",
                 'profile': profile_result,
@@ -296,74 +373,44 @@ class RelationshipIntelligenceEngine:
             }
             
             print(f"  ✓ Profile built for {contact_name}")
-            return self.contact_profiles[contact_name]
+            return profile
             
         except Exception as e:
             print(f"  ❌ Error building profile: {str(e)}")
-            # Create a minimal fallback profile
-            self.contact_profiles[contact_name] = {
+            # Return a minimal fallback profile
+            return {
                 'name': contact_name,
                 'role': "Decision Maker",
                 'profile': "Professional at " + company_name,
                 'communication_style': "Professional, concise communication",
                 'connections': "Potential interest in engineering innovation"
             }
-            return self.contact_profiles[contact_name]
     
-    def analyze_strategic_partnership_potential(self, company_name, club_info):
-        """Identify strategic partnership opportunities specific to this company."""
+    def analyze_strategic_partnership_potential(self, company_name, club_info, previous=None):
+        """
+        Identify strategic partnership opportunities specific to this company.
+        previous is the stale cached value when this runs as a background refresh.
+        """
         log_section("ANALYZING STRATEGIC PARTNERSHIP POTENTIAL")
         
-        # Check for cached analysis
-        cache_dir = os.path.join(os.getcwd(), "cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        cache_file = os.path.join(cache_dir, f"partnership_{company_name.replace(' ', '_').lower()}.json")
-        
-        if os.path.exists(cache_file):
-            try:
+        # Check for cached analysis (stale ones are served and refreshed in the background)
+        if previous is None:
+            cached_data = self.partnership_research.get(
+                company_name,
+                refresh=lambda stale: self.analyze_strategic_partnership_potential(company_name, club_info, previous=stale)
+            )
+            if cached_data:
                 print(f"Loading cached partnership analysis for {company_name}")
-                with open(cache_file, 'r') as f:
-                    cached_data = json.load(f)
-                    print(f"  ✓ Found cached analysis from {cached_data.get('timestamp', 'unknown date')}")
-                    return cached_data.get('analysis', {})
-            except Exception as e:
-                print(f"  ❌ Error loading cache: {str(e)}")
-                print("  Proceeding with fresh analysis...")
+                print(f"  ✓ Found cached analysis from {cached_data.get('timestamp', 'unknown date')}")
+                return cached_data.get('analysis', {})
         
-        # Research previous sponsorships
-        print("\nResearching previous sponsorships...")
+        # Research previous sponsorships and strategic initiatives (all queries run concurrently)
         sponsorship_queries = [
             f"{company_name} sponsors university",
             f"{company_name} sponsors engineering competition",
             f"{company_name} university partnership",
             f"{company_name} education sponsorship"
         ]
-        
-        sponsorship_results = []
-        for i, query in enumerate(sponsorship_queries):
-            try:
-                print(f"\nSponsorship search query {i+1}/{len(sponsorship_queries)}:")
-                print(f"  {query}")
-                
-                results = self.search.results(query, num_results=3)
-                
-                for result in results:
-                    sponsorship_results.append({
-                        "query": query,
-                        "title": result['title'],
-                        "link": result['link'],
-                        "snippet": result['snippet']
-                    })
-                
-                # Add delay between searches
-                time.sleep(2)
-                
-            except Exception as e:
-                print(f"  ❌ Error searching for '{query}': {str(e)}")
-                time.sleep(5)  # Longer delay after error
-        
-        # Analyze strategic initiatives
-        print("\nAnalyzing strategic initiatives...")
         initiative_queries = [
             f"{company_name} strategic priorities",
             f"{company_name} innovation focus",
@@ -371,31 +418,58 @@ class RelationshipIntelligenceEngine:
             f"{company_name} future goals"
         ]
         
+        print("\nResearching previous sponsorships and strategic initiatives...")
+        outcomes = fan_out_search(
+            self.search, sponsorship_queries + initiative_queries, num_results=3, fresh=previous is not None
+        )
+        
+        sponsorship_results = []
         initiative_results = []
-        for i, query in enumerate(initiative_queries):
+        search_hashes = {}
+        for i, (query, (outcome, error)) in enumerate(zip(sponsorship_queries + initiative_queries, outcomes)):
+            is_sponsorship = i < len(sponsorship_queries)
+            if is_sponsorship:
+                print(f"\nSponsorship search query {i+1}/{len(sponsorship_queries)}:")
+            else:
+                print(f"\nInitiative search query {i+1-len(sponsorship_queries)}/{len(initiative_queries)}:")
+            print(f"  {query}")
             try:
-                print(f"\nInitiative search query {i+1}/{len(initiative_queries)}:")
-                print(f"  {query}")
-                
-                results = self.search.results(query, num_results=3)
-                
+                if error is not None:
+                    raise error
+                results, elapsed = outcome
+                search_hashes[query] = result_set_hash(results)
+                target = sponsorship_results if is_sponsorship else initiative_results
                 for result in results:
-                    initiative_results.append({
+                    target.append({
                         "query": query,
                         "title": result['title'],
                         "link": result['link'],
                         "snippet": result['snippet']
                     })
-                
-                # Add delay between searches
-                time.sleep(2)
-                
             except Exception as e:
                 print(f"  ❌ Error searching for '{query}': {str(e)}")
-                time.sleep(5)  # Longer delay after error
         
-        # Format club info for the analysis
-        formatted_club_info = "\n\n".join([f"Q: {q}\nA: {a}" for q, a in club_info.items()])
+        if self.partnership_research.keep_previous(
+            company_name, previous, search_hashes, sponsorship_queries + initiative_queries
+        ):
+            return previous.get('analysis', {})
+        run = IncrementalRun(previous)
+        
+        # The same page often answers both a sponsorship and an initiative query
+        unique_results = {id(res) for res in dedupe_search_results(sponsorship_results + initiative_results)}
+        sponsorship_results = [res for res in sponsorship_results if id(res) in unique_results]
+        initiative_results = [res for res in initiative_results if id(res) in unique_results]
+        
+        # Select the club facts relevant to this company's sponsorships and initiatives
+        formatted_club_info = self.club_context.select(
+            club_info,
+            query="\n".join(
+                [f"{company_name} sponsorship partnership with a student engineering team"]
+                + [f"{res['title']}: {res['snippet']}" for res in sponsorship_results + initiative_results]
+            ),
+            label="partnership analysis",
+            fmt="Q: {question}\nA: {answer}"
+        )
         
         # Analyze partnership potential with combined search results
         partnership_prompt = PromptTemplate(
@@ -456,7 +530,7 @@ class RelationshipIntelligenceEngine:
             )
             
             print("\nAnalyzing strategic partnership potential...")
-            partnership_analysis = self.llm.invoke(prompt).content
+            partnership_analysis = run.invoke_llm("partnership_analysis", prompt, self.chat, site="partnership_analysis")
             
             # Extract specific value propositions
             value_prop_prompt = PromptTemplate(
@@ -476,12 +550,15 @@ class RelationshipIntelligenceEngine:
                 """
             )
             
-            value_propositions = self.llm.invoke(
+            value_propositions = run.invoke_llm(
+                "value_propositions",
                 value_prop_prompt.format(
                     company_name=company_name,
                     partnership_analysis=partnership_analysis
-                )
-            ).content
+                ),
+                self.chat,
+                site="value_propositions"
+            )
             
             # Compile the complete analysis
             partnership_data = {
@@ -491,12 +568,10 @@ class RelationshipIntelligenceEngine:
             
             # Cache the results
             try:
-                with open(cache_file, 'w') as f:
-                    json.dump({
-                        'analysis': partnership_data,
-                        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-                    }, f)
-                print(f"  ✓ Partnership analysis cached to {cache_file}")
+                self.partnership_research.set(company_name, {
+                    'analysis': partnership_data
+                }, run, search_hashes)
+                print(f"  ✓ Partnership analysis cached for {company_name}")
             except Exception as e:
                 print(f"  ❌ Error caching analysis: {str(e)}")
             
@@ -511,25 +586,22 @@ class RelationshipIntelligenceEngine:
             }
             return fallback_analysis
     
-    def assess_cultural_compatibility(self, company_name):
-        """Analyze corporate culture for better communication matching."""
+    def assess_cultural_compatibility(self, company_name, previous=None):
+        """
+        Analyze corporate culture for better communication matching.
+        previous is the stale cached value when this runs as a background refresh.
+        """
         log_section("ASSESSING CULTURAL COMPATIBILITY")
         
-        # Check for cached assessment
-        cache_dir = os.path.join(os.getcwd(), "cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        cache_file = os.path.join(cache_dir, f"culture_{company_name.replace(' ', '_').lower()}.json")
-        
-        if os.path.exists(cache_file):
-            try:
+        # Check for cached assessment (stale ones are served and refreshed in the background)
+        if previous is None:
+            cached_data = self.culture_research.get(
+                company_name, refresh=lambda stale: self.assess_cultural_compatibility(company_name, previous=stale)
+            )
+            if cached_data:
                 print(f"Loading cached cultural assessment for {company_name}")
-                with open(cache_file, 'r') as f:
-                    cached_data = json.load(f)
-                    print(f"  ✓ Found cached assessment from {cached_data.get('timestamp', 'unknown date')}")
-                    return cached_data.get('assessment', {})
-            except Exception as e:
-                print(f"  ❌ Error loading cache: {str(e)}")
-                print("  Proceeding with fresh assessment...")
+                print(f"  ✓ Found cached assessment from {cached_data.get('timestamp', 'unknown date')}")
+                return cached_data.get('assessment', {})
         
         # Collect communication samples
         print("\nCollecting communication samples...")
@@ -542,26 +614,31 @@ class RelationshipIntelligenceEngine:
         ]
         
         communication_samples = []
-        for i, query in enumerate(communication_queries):
+        search_hashes = {}
+        outcomes = fan_out_search(self.search, communication_queries, num_results=3, fresh=previous is not None)
+        for i, (query, (outcome, error)) in enumerate(zip(communication_queries, outcomes)):
+            print(f"\nCommunication sample query {i+1}/{len(communication_queries)}:")
+            print(f"  {query}")
             try:
-                print(f"\nCommunication sample query {i+1}/{len(communication_queries)}:")
-                print(f"  {query}")
-                
-                results = self.search.results(query, num_results=3)
-                
+                if error is not None:
+                    raise error
+                results, elapsed = outcome
+                search_hashes[query] = result_set_hash(results)
                 for result in results:
                     communication_samples.append({
                         "context": query,
                         "title": result['title'],
+                        "link": result.get('link', ''),
                         "snippet": result['snippet']
                     })
-                
-                # Add delay between searches
-                time.sleep(2)
-                
             except Exception as e:
                 print(f"  ❌ Error searching for '{query}': {str(e)}")
-                time.sleep(5)  # Longer delay after error
+        
+        if self.culture_research.keep_previous(company_name, previous, search_hashes, communication_queries):
+            return previous.get('assessment', {})
+        run = IncrementalRun(previous)
+        
+        communication_samples = dedupe_search_results(communication_samples)
         
         # Analyze language patterns
         language_prompt = PromptTemplate(
@@ -609,8 +686,9 @@ class RelationshipIntelligenceEngine:
                 communication_samples=formatted_samples
             )
             
+            # Language, decision-style and values analyses only read the samples, so run them concurrently
             print("\nAnalyzing language patterns...")
-            language_analysis = self.llm.invoke(prompt).content
+            language_future = run.submit_llm("language_analysis", prompt, self.chat, site="culture_language")
             
             # Determine decision-making style
             decision_prompt = PromptTemplate(
@@ -633,12 +711,15 @@ class RelationshipIntelligenceEngine:
             )
             
             print("\nAnalyzing decision-making style...")
-            decision_style = self.llm.invoke(
+            decision_future = run.submit_llm(
+                "decision_style",
                 decision_prompt.format(
                     company_name=company_name,
                     communication_samples=formatted_samples
-                )
-            ).content
+                ),
+                self.chat,
+                site="culture_decision_style"
+            )
             
             # Extract cultural values
             values_prompt = PromptTemplate(
@@ -661,12 +742,19 @@ class RelationshipIntelligenceEngine:
             )
             
             print("\nExtracting cultural values...")
-            cultural_values = self.llm.invoke(
+            values_future = run.submit_llm(
+                "cultural_values",
                 values_prompt.format(
                     company_name=company_name,
                     communication_samples=formatted_samples
-                )
-            ).content
+                ),
+                self.chat,
+                site="culture_values"
+            )
+            
+            language_analysis = language_future.result()
+            decision_style = decision_future.result()
+            cultural_values = values_future.result()
             
             # Generate final recommendations
             recommendations_prompt = PromptTemplate(
@@ -696,14 +784,17 @@ class RelationshipIntelligenceEngine:
             )
             
             print("\nGenerating communication recommendations...")
-            recommendations = self.llm.invoke(
+            recommendations = run.invoke_llm(
+                "recommendations",
                 recommendations_prompt.format(
                     company_name=company_name,
                     language_analysis=language_analysis,
                     decision_style=decision_style,
                     cultural_values=cultural_values
-                )
-            ).content
+                ),
+                self.chat,
+                site="culture_recommendations"
+            )
             
             # Compile the complete assessment
             cultural_assessment = {
@@ -715,12 +806,10 @@ class RelationshipIntelligenceEngine:
             
             # Cache the results
             try:
-                with open(cache_file, 'w') as f:
-                    json.dump({
-                        'assessment': cultural_assessment,
-                        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-                    }, f)
-                print(f"  ✓ Cultural assessment cached to {cache_file}")
+                self.culture_research.set(company_name, {
+                    'assessment': cultural_assessment
+                }, run, search_hashes)
+                print(f"  ✓ Cultural assessment cached for {company_name}")
             except Exception as e:
                 print(f"  ❌ Error caching assessment: {str(e)}")
             
@@ -739,38 +828,64 @@ class RelationshipIntelligenceEngine:
 
 
 class EmailGenerator:
-    def __init__(self):
-        # Initialize the language model
-        self.llm = ChatGoogleGenerativeAI(
-            model=GEMINI_MODEL,
-            google_api_key=GEMINI_API_KEY,
+    def __init__(self, providers=None):
+        # LLM, embedding and search backends: live Gemini/Google by default, or record/replay/fake
+        # ones chosen with HYPERMAIL_PROVIDER_MODE (or passed in) so the pipeline can run offline
+        self.providers = providers or build_providers(
+            llm_model=GEMINI_MODEL,
+            embedding_model=EMBEDDING_MODEL,
             temperature=0.2
         )
-
-        # Initialize embeddings
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
-            google_api_key=GEMINI_API_KEY
+        
+        # Initialize the language model
+        self.llm = self.providers.llm
+        
+        # Prompt-level response cache; misses go through the worker's Gemini rate limiter
+        self.chat = CachedChat(
+            self.llm,
+            model_name=self.providers.llm_name,
+            temperature=0.2,
+            location=self.providers.cache
         )
 
-        # Initialize Google Search
-        self.search = GoogleSearchAPIWrapper(
-            google_api_key=GOOGLE_API_KEY,
-            google_cse_id=GOOGLE_CSE_ID
+        # Initialize embeddings behind a persistent cache so repeated chunks and queries are free
+        self.embeddings = CachedEmbeddings(
+            self.providers.embeddings,
+            model_name=self.providers.embedding_name,
+            location=self.providers.cache
         )
+
+        # Initialize Google Search behind a shared result cache used by every research function;
+        # only cache misses wait on the worker's global search rate limiter
+        self.search = CachedSearch(RateLimitedSearch(self.providers.search), location=self.providers.cache)
+        
+        # Picks the club facts relevant to each prompt instead of pasting all of them
+        self.club_context = ClubContextAssembler(self.embeddings)
         
         # Initialize the relationship intelligence engine
         self.relationship_engine = RelationshipIntelligenceEngine(
             llm=self.llm,
-            search=self.search
+            search=self.search,
+            chat=self.chat,
+            club_context=self.club_context,
+            cache_location=self.providers.cache
         )
+        
+        # Company research, served stale while it refreshes (see FRESHNESS_POLICIES)
+        self.company_research = ResearchCache("company", location=self.providers.cache)
+        
+        # Local template ranking over cached template embeddings
+        self.template_selector = TemplateSelector(self.embeddings)
+        
+        # Parsed email templates keyed by (path, mtime)
+        self._parsed_templates = {}
 
     # Function to load and process documents for context
-    def load_club_context(self, sponsorship_packet_path, fdp_path, email_template_path):
-        """Load and process club-related documents for context."""
-        log_section("LOADING CLUB CONTEXT")
-        
-        # First, verify all files exist with exact case sensitivity
+    def resolve_document_paths(self, sponsorship_packet_path, fdp_path, email_template_path):
+        """
+        Return the three document paths with each filename's case corrected to the matching
+        file in the working directory, raising FileNotFoundError if one doesn't exist.
+        """
         file_paths = {
             "Sponsorship Packet": sponsorship_packet_path,
             "Final Design Package": fdp_path,
@@ -799,167 +914,172 @@ class EmailGenerator:
             else:
                 print(f"  ✓ File exists: {file_paths[name]}")
         
-        # Updated file paths
-        sponsorship_packet_path = file_paths["Sponsorship Packet"]
-        fdp_path = file_paths["Final Design Package"]
-        email_template_path = file_paths["Email Template"]
-        
-        # Load documents
-        log_section("LOADING DOCUMENTS")
-        club_documents = []
-        email_documents = []
-        
-        # Load sponsorship packet
-        print(f"Loading sponsorship packet from: {sponsorship_packet_path}")
-        if sponsorship_packet_path.endswith('.pdf'):
-            loader = PyPDFLoader(sponsorship_packet_path)
-            club_documents.extend(loader.load())
-        else:
-            loader = TextLoader(sponsorship_packet_path)
-            club_documents.extend(loader.load())
-        print(f"  ✓ Loaded {len(club_documents)} documents from sponsorship packet")
-        
-        # Load design package
-        print(f"Loading design package from: {fdp_path}")
-        if fdp_path.endswith('.pdf'):
-            loader = PyPDFLoader(fdp_path)
-            club_documents.extend(loader.load())
-        else:
-            loader = TextLoader(fdp_path)
-            club_documents.extend(loader.load())
-        print(f"  ✓ Loaded total of {len(club_documents)} documents from club materials")
-        
-        # Load email template - now expected to be a .txt file
-        print(f"Loading email template from: {email_template_path}")
-        # Since we expect a .txt file, we'll use TextLoader directly
-        loader = TextLoader(email_template_path)
-        email_documents.extend(loader.load())
-        print(f"  ✓ Loaded {len(email_documents)} documents from email template")
-        
-        # Split documents into smaller chunks
-        print("\nSplitting documents into chunks...")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100
-        )
-        
-        # Add chunk size management based on available memory
-        max_chunks = 100  # Adjust based on system capabilities
-        
-        club_splits = text_splitter.split_documents(club_documents)
-        if len(club_splits) > max_chunks:
-            print(f"Warning: Large document detected, limiting to {max_chunks} chunks")
-            club_splits = club_splits[:max_chunks]
-        
-        email_splits = text_splitter.split_documents(email_documents)
-        
-        print(f"  ✓ Split club documents into {len(club_splits)} chunks")
-        print(f"  ✓ Split email documents into {len(email_splits)} chunks")
+        return file_paths["Sponsorship Packet"], file_paths["Final Design Package"], file_paths["Email Template"]
+
+    def load_club_context(self, sponsorship_packet_path, fdp_path, email_template_path):
+        """Load and process club-related documents for context."""
+        log_section("LOADING CLUB CONTEXT")
         
-        # Create vector store
-        print("\nCreating vector stores...")
-        club_vectorstore = Chroma.from_documents(
-            documents=club_splits,
-            embedding=self.embeddings
-        )
-        email_vectorstore = Chroma.from_documents(
-            documents=email_splits,
-            embedding=self.embeddings
+        # First, verify all files exist with exact case sensitivity
+        sponsorship_packet_path, fdp_path, email_template_path = self.resolve_document_paths(
+            sponsorship_packet_path, fdp_path, email_template_path
         )
-        print("  ✓ Vector stores created successfully")
         
-        # Create retriever
-        club_retriever = club_vectorstore.as_retriever(
-            search_kwargs={"k": 5}
+        # Chunking parameters are part of each index key, so changing them triggers a rebuild
+        chunk_size, chunk_overlap, max_chunks = 1000, 100, 100
+        fingerprint = f"{self.embeddings.model_name}:{chunk_size}:{chunk_overlap}:{max_chunks}"
+        
+        def build_club_documents():
+            log_section("LOADING CLUB DOCUMENTS")
+            club_documents = []
+            
+            # Load sponsorship packet
+            print(f"Loading sponsorship packet from: {sponsorship_packet_path}")
+            club_documents.extend(self._load_document(sponsorship_packet_path))
+            print(f"  ✓ Loaded {len(club_documents)} documents from sponsorship packet")
+            
+            # Load design package
+            print(f"Loading design package from: {fdp_path}")
+            club_documents.extend(self._load_document(fdp_path))
+            print(f"  ✓ Loaded total of {len(club_documents)} documents from club materials")
+            
+            club_splits = self._split_documents(club_documents, chunk_size, chunk_overlap)
+            # Add chunk size management based on available memory
+            if len(club_splits) > max_chunks:
+                print(f"Warning: Large document detected, limiting to {max_chunks} chunks")
+                club_splits = club_splits[:max_chunks]
+            print(f"  ✓ Split club documents into {len(club_splits)} chunks")
+            return club_splits
+        
+        def build_email_documents():
+            log_section("LOADING EMAIL TEMPLATE DOCUMENTS")
+            # Load email template - now expected to be a .txt file
+            print(f"Loading email template from: {email_template_path}")
+            email_documents = TextLoader(email_template_path).load()
+            print(f"  ✓ Loaded {len(email_documents)} documents from email template")
+            
+            email_splits = self._split_documents(email_documents, chunk_size, chunk_overlap)
+            print(f"  ✓ Split email documents into {len(email_splits)} chunks")
+            return email_splits
+        
+        # Load (or build once) the persistent vector indexes
+        print(f"\nLoading vector indexes ({VECTOR_BACKEND})...")
+        club_retriever = self._get_retriever(
+            "club",
+            [sponsorship_packet_path, fdp_path],
+            build_club_documents,
+            fingerprint
         )
-        email_retriever = email_vectorstore.as_retriever(
-            search_kwargs={"k": 5}
+        email_retriever = self._get_retriever(
+            "email_templates",
+            [email_template_path],
+            build_email_documents,
+            fingerprint
         )
+        print("  ✓ Retrievers ready")
         
         return club_retriever, email_retriever
 
-    # Function to extract key information about the club
-    def extract_club_info(self, club_retriever):
-        """Extract key information about the club from documents."""
-        log_section("EXTRACTING CLUB INFORMATION")
+    def _get_retriever(self, name, source_paths, build_documents, fingerprint):
+        """Return a retriever over the shared index for name, using the configured backend."""
+        if VECTOR_BACKEND == "pgvector":
+            # Imported lazily so the Chroma backend works without the database models
+            from .services.pgvectorRetriever import get_pgvector_retriever
+            return get_pgvector_retriever(
+                name, source_paths, self.embeddings, build_documents,
+                fingerprint=fingerprint, k=5
+            )
         
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=club_retriever
+        vectorstore = get_vectorstore(
+            name, source_paths, self.embeddings, build_documents,
+            fingerprint=fingerprint,
+            cache_root=self.providers.cache.root
         )
-        
-        # Questions to ask about the club
-        questions = [
-            # fundamentals
-            "What does CU Hyperloop do every single year and what do they compete in?",
-            "How did CU Hyperloop evolve from focusing on Hyperloop transportation concepts to developing tunnel boring machines, and how has this shift affected their team identity?",
-            "What is the mission and key goals of CU Hyperloop?",
-            "What are the main achievements and history of the club?",
-            "How are the roughly 50 team members organized into functional groups, and what is the workflow from initial concept to competition ready machine?",
-
-            #culture?
-            "What is the typical student experience like from joining CU Hyperloop as a new member to becoming a seasoned team contributor?",
-            "How does the team recruit new members each year, and what qualities or skills do they look for in potential team members?",
-            "What is the atmosphere like during the annual test dig events, and how does the team handle setbacks or technical failures?",
-            "What traditions or team-building activities has CU Hyperloop developed that contribute to their team cohesion and culture?",
-
-            #sponsorship
-            "What sponsorship tiers does the club offer?",
-            "What kind of recognition do sponsors receive?",
-            "What specific real-world applications could this technology have beyond the competition, and how might it transform urban transportation?",
-            "If there are 4 main things that the club can provide value with to a sponsor what are they and how do they provide value?",
-            "What are the key benefits for sponsors to support CU Hyperloop, and how have past sponsors benefited from their involvement or been recognized?",
+        return vectorstore.as_retriever(search_kwargs={"k": 5})
 
-            #comp
-            "What metrics are used to judge success in the Not-a-Boring Competition, and how has CU Hyperloop optimized their machine to excel in these areas?",
-            "How does The Boring Company organize the Not-a-Boring Competition, and what is the complete competition experience like from arrival to the final event?",
+    def _load_document(self, path):
+        """Load a PDF or plain text document into LangChain documents."""
+        if path.endswith('.pdf'):
+            return PyPDFLoader(path).load()
+        return TextLoader(path).load()
 
+    def _split_documents(self, documents, chunk_size, chunk_overlap):
+        """Split documents into smaller chunks for embedding."""
+        print("\nSplitting documents into chunks...")
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap
+        )
+        return text_splitter.split_documents(documents)
 
-            #technical
-            "How (in detail) does the hexapod propulsion system work and why it did it earn an Innovation Award in 2024?",
-            "How does the team's tunnel boring machine simultaneously handle excavation, propulsion, and tunnel reinforcement in a single integrated process?"
-            "How does the 3D printing tunnel support system work in real-time, and what materials are used to ensure structural integrity?",
-            "What is the complete autonomous control architecture that enabled their Accuracy Award in 2023, from sensors to decision-making algorithms?",
-
-        ]
+    # Function to extract key information about the club
+    def extract_club_info(self, club_retriever, club_info_cache=None, mode=None):
+        """
+        Extract key information about the club from documents.
+        When a ClubInfoCache is given, cached answers are reused and only the
+        questions missing from the cache are sent to the LLM.
+        mode is "per_question" (one retrieval and LLM call per question) or
+        "batched" (one retrieval union and LLM call per question group).
+        """
+        log_section("EXTRACTING CLUB INFORMATION")
         
-        club_info = {}
-        for i, question in enumerate(questions):
-            try:
-                print(f"\nProcessing question {i+1}/{len(questions)}:")
-                print(f"  {question}")
-                
-                # Start timing
+        mode = mode or CLUB_INFO_MODE
+        questions = CLUB_QUESTIONS
+        cached_answers = club_info_cache.lookup(questions) if club_info_cache else {}
+        if cached_answers:
+            print(f"  ✓ Reusing {len(cached_answers)}/{len(questions)} cached answers")
+        
+        pending = [q for q in questions if q not in cached_answers]
+        if pending:
+            print(f"\nAnswering {len(pending)} questions in {mode} mode (up to {LLM_MAX_CONCURRENCY} calls at a time)...")
+        
+        # Pending questions run concurrently through the shared, rate-limited LLM executor
+        if not pending:
+            answers = {}
+        elif mode == "batched":
+            answers = self._answer_question_groups(club_retriever, pending)
+        elif mode == "per_question":
+            qa_chain = RetrievalQA.from_chain_type(
+                llm=self.llm,
+                chain_type="stuff",
+                retriever=club_retriever
+            )
+            
+            def answer_question(question):
                 start_time = time.time()
                 result = qa_chain.invoke({"query": question})
-                end_time = time.time()
-                
-                # Get the answer
-                answer = result["result"]
-                
-                # Print a preview of the answer
-                preview = answer[:200] + "..." if len(answer) > 200 else answer
-                print(f"  ✓ Answer received ({len(answer)} chars, {end_time - start_time:.2f}s):")
-                print(f"  Preview: {preview}\n")
-                
-                # Store the result
-                club_info[question] = answer
-                
-                # Add delay between API calls to avoid hitting rate limits
-                delay = 3  # 3 seconds between calls
-                print(f"  Waiting {delay}s before next question...")
-                time.sleep(delay)
-                
-            except Exception as e:
+                return result["result"], time.time() - start_time
+            
+            answers = dict(zip(pending, map_llm(answer_question, pending)))
+        else:
+            raise ValueError(f"Unknown club info extraction mode: {mode}")
+        
+        club_info = {}
+        for i, question in enumerate(questions):
+            if question in cached_answers:
+                club_info[question] = cached_answers[question]
+                continue
+            
+            outcome, error = answers[question]
+            print(f"\nQuestion {i+1}/{len(questions)}:")
+            print(f"  {question}")
+            if error is not None:
                 print(f"  ❌ Error processing question: {question}")
-                print(f"  Error details: {str(e)}")
-                club_info[question] = f"Information unavailable due to API error: {str(e)}"
-                
-                # Wait longer after encountering an error
-                recovery_delay = 10
-                print(f"  Waiting {recovery_delay}s to recover from error...")
-                time.sleep(recovery_delay)
+                print(f"  Error details: {str(error)}")
+                club_info[question] = f"Information unavailable due to API error: {str(error)}"
+                continue
+            
+            answer, elapsed = outcome
+            
+            # Print a preview of the answer
+            preview = answer[:200] + "..." if len(answer) > 200 else answer
+            print(f"  ✓ Answer received ({len(answer)} chars, {elapsed:.2f}s):")
+            print(f"  Preview: {preview}\n")
+            
+            # Store the result
+            club_info[question] = answer
+            if club_info_cache:
+                club_info_cache.set(question, answer)
         
         # Summary of information collected
         print("\nInformation collected:")
@@ -968,26 +1088,87 @@ class EmailGenerator:
             
         return club_info
 
+    def _answer_question_groups(self, club_retriever, pending):
+        """
+        Answer pending club questions one topic group at a time: retrieve the union of
+        chunks relevant to the group once, then ask for every answer in a single JSON
+        response. Returns {question: ((answer, elapsed), error)} like the per-question path.
+        """
+        groups = []
+        for group in CLUB_QUESTION_GROUPS.values():
+            group_pending = [q for q in group if q in pending]
+            if group_pending:
+                groups.append(group_pending)
+        
+        group_prompt = PromptTemplate(
+            input_variables=["context", "questions"],
+            template="""
+            Use the following excerpts from CU Hyperloop's sponsorship packet and final design package
+            to answer every question below. If the excerpts do not contain the answer, say so instead
+            of making something up.
+            
+            EXCERPTS:
+            {context}
+            
+            QUESTIONS:
+            {questions}
+            
+            Return ONLY a JSON object whose keys are the question numbers as strings ("1", "2", ...)
+            and whose values are the full answers, e.g. {{"1": "answer to question 1", "2": "answer to question 2"}}
+            """
+        )
+        
+        def answer_group(group):
+            start_time = time.time()
+            
+            # Retrieve once per question, then pass the de-duplicated union to a single call
+            chunks = {}
+            for question in group:
+                for doc in club_retriever.invoke(question):
+                    chunks.setdefault(doc.page_content, doc)
+            context = "\n\n---\n\n".join(chunks.keys())
+            numbered = "\n".join(f"{i+1}. {q}" for i, q in enumerate(group))
+            
+            raw_text = self.chat.invoke(
+                group_prompt.format(context=context, questions=numbered),
+                site="club_question_group"
+            ).content
+            
+            json_start = raw_text.find('{')
+            json_end = raw_text.rfind('}') + 1
+            if json_start == -1 or json_end == 0:
+                raise ValueError("Batched answer did not contain a JSON object")
+            parsed = json.loads(raw_text[json_start:json_end])
+            return {q: parsed.get(str(i+1)) for i, q in enumerate(group)}, time.time() - start_time
+        
+        answers = {}
+        for group, (outcome, error) in zip(groups, map_llm(answer_group, groups, cached=True)):
+            for question in group:
+                if error is not None:
+                    answers[question] = (None, error)
+                elif not outcome[0].get(question):
+                    answers[question] = (None, ValueError("No answer returned for this question"))
+                else:
+                    answers[question] = ((str(outcome[0][question]), outcome[1]), None)
+        return answers
+
     # Function to research company information with caching
-    def research_company(self, company_name):
-        """Research information about the target company with caching for efficiency."""
+    def research_company(self, company_name, previous=None):
+        """
+        Research information about the target company with caching for efficiency.
+        previous is the stale cached value when this runs as a background refresh.
+        """
         log_section(f"RESEARCHING COMPANY: {company_name}")
         
-        # Check for cached research
-        cache_dir = os.path.join(os.getcwd(), "cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        cache_file = os.path.join(cache_dir, f"company_{company_name.replace(' ', '_').lower()}.json")
-        
-        if os.path.exists(cache_file):
-            try:
+        # Check for cached research (stale research is served and refreshed in the background)
+        if previous is None:
+            cached_data = self.company_research.get(
+                company_name, refresh=lambda stale: self.research_company(company_name, previous=stale)
+            )
+            if cached_data:
                 print(f"Loading cached research for {company_name}")
-                with open(cache_file, 'r') as f:
-                    cached_data = json.load(f)
-                    print(f"  ✓ Found cached research from {cached_data.get('timestamp', 'unknown date')}")
-                    return cached_data.get('company_info', '')
-            except Exception as e:
-                print(f"  ❌ Error loading cache: {str(e)}")
-                print("  Proceeding with fresh research...")
+                print(f"  ✓ Found cached research from {cached_data.get('timestamp', 'unknown date')}")
+                return cached_data.get('company_info', '')
         
         # Create search queries
         search_queries = [
@@ -999,34 +1180,34 @@ class EmailGenerator:
             f"{company_name} technology"
         ]
         
-        # Collect search results
+        # Collect search results (queries run concurrently)
         search_results = []
-        for i, query in enumerate(search_queries):
+        search_hashes = {}
+        outcomes = fan_out_search(self.search, search_queries, num_results=3, fresh=previous is not None)
+        for i, (query, (outcome, error)) in enumerate(zip(search_queries, outcomes)):
+            print(f"\nSearch query {i+1}/{len(search_queries)}:")
+            print(f"  {query}")
             try:
-                print(f"\nSearch query {i+1}/{len(search_queries)}:")
-                print(f"  {query}")
-                
-                start_time = time.time()
-                results = self.search.results(query, num_results=3)
-                end_time = time.time()
-                
-                print(f"  ✓ Got {len(results)} results ({end_time - start_time:.2f}s)")
+                if error is not None:
+                    raise error
+                results, elapsed = outcome
+                search_hashes[query] = result_set_hash(results)
+                print(f"  ✓ Got {len(results)} results ({elapsed:.2f}s)")
                 
                 for j, result in enumerate(results):
-                    search_results.append(f"Title: {result['title']}\nLink: {result['link']}\nSnippet: {result['snippet']}\n")
+                    search_results.append(result)
                     print(f"    Result {j+1}: {result['title'][:50]}...")
-                
-                # Add delay between searches
-                delay = 2
-                print(f"  Waiting {delay}s before next query...")
-                time.sleep(delay)
-                
             except Exception as e:
                 print(f"  ❌ Error searching for '{query}': {str(e)}")
-                # Wait longer after error
-                recovery_delay = 5
-                print(f"  Waiting {recovery_delay}s to recover from error...")
-                time.sleep(recovery_delay)
+        
+        if self.company_research.keep_previous(company_name, previous, search_hashes, search_queries):
+            return previous.get('company_info', '')
+        run = IncrementalRun(previous)
+        
+        search_results = [
+            f"Title: {result['title']}\nLink: {result['link']}\nSnippet: {result['snippet']}\n"
+            for result in dedupe_search_results(search_results)
+        ]
         
         # Compile company research
         print(f"\nCompiling research on {company_name} from {len(search_results)} search results...")
@@ -1055,7 +1236,7 @@ class EmailGenerator:
         try:
             print("Generating company profile...")
             start_time = time.time()
-            company_info = self.llm.invoke(prompt).content
+            company_info = run.invoke_llm("company_info", prompt, self.chat, site="company_research")
             end_time = time.time()
             
             # Print preview of the result
@@ -1065,13 +1246,11 @@ class EmailGenerator:
             
             # Cache the results
             try:
-                with open(cache_file, 'w') as f:
-                    json.dump({
-                        'company_info': company_info,
-                        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-                        'query_count': len(search_queries)
-                    }, f)
-                print(f"  ✓ Research cached to {cache_file}")
+                self.company_research.set(company_name, {
+                    'company_info': company_info,
+                    'query_count': len(search_queries)
+                }, run, search_hashes)
+                print(f"  ✓ Research cached for {company_name}")
             except Exception as e:
                 print(f"  ❌ Error caching research: {str(e)}")
             
@@ -1101,37 +1280,29 @@ class EmailGenerator:
             "What persuasive strategies are used in the template?"
         ]
         
+        def answer_question(question):
+            start_time = time.time()
+            result = qa_chain.invoke({"query": question})
+            return result["result"], time.time() - start_time
+        
+        outcomes = map_llm(answer_question, template_questions)
+        
         template_info = {}
-        for i, question in enumerate(template_questions):
-            try:
-                print(f"\nEmail template question {i+1}/{len(template_questions)}:")
-                print(f"  {question}")
-                
-                start_time = time.time()
-                result = qa_chain.invoke({"query": question})
-                end_time = time.time()
-                
-                answer = result["result"]
-                preview = answer[:200] + "..." if len(answer) > 200 else answer
-                print(f"  ✓ Answer received ({len(answer)} chars, {end_time - start_time:.2f}s)")
-                print(f"  Preview: {preview}\n")
-                
-                template_info[question] = answer
-                
-                # Add delay between API calls
-                delay = 2
-                print(f"  Waiting {delay}s before next question...")
-                time.sleep(delay)
-                
-            except Exception as e:
+        for i, (question, (outcome, error)) in enumerate(zip(template_questions, outcomes)):
+            print(f"\nEmail template question {i+1}/{len(template_questions)}:")
+            print(f"  {question}")
+            if error is not None:
                 print(f"  ❌ Error analyzing email template with question: {question}")
-                print(f"  Error details: {str(e)}")
-                template_info[question] = f"Information unavailable due to API error: {str(e)}"
-                
-                # Wait longer after error
-                recovery_delay = 5
-                print(f"  Waiting {recovery_delay}s to recover from error...")
-                time.sleep(recovery_delay)
+                print(f"  Error details: {str(error)}")
+                template_info[question] = f"Information unavailable due to API error: {str(error)}"
+                continue
+            
+            answer, elapsed = outcome
+            preview = answer[:200] + "..." if len(answer) > 200 else answer
+            print(f"  ✓ Answer received ({len(answer)} chars, {elapsed:.2f}s)")
+            print(f"  Preview: {preview}\n")
+            
+            template_info[question] = answer
         
         # Combine the template analysis
         email_analysis = "\n\n".join([f"{q}:\n{a}" for q, a in template_info.items()])
@@ -1144,8 +1315,12 @@ class EmailGenerator:
         """Generate a tailored sponsorship request email."""
         log_section("GENERATING RESPONSE EMAIL")
         
-        # Format club info for better readability
-        formatted_club_info = "\n\n".join([f"QUESTION: {q}\nANSWER: {a}" for q, a in club_info.items()])
+        # Select the club facts relevant to this company and the analyzed template
+        formatted_club_info = self.club_context.select(
+            club_info,
+            query=f"{company_info}\n{email_analysis}",
+            label="response email"
+        )
         
         print(f"Club info: {len(formatted_club_info)} chars")
         print(f"Email analysis: {len(email_analysis)} chars")
@@ -1180,7 +1355,7 @@ class EmailGenerator:
         try:
             print("\nCreating final email...")
             start_time = time.time()
-            response_email = self.llm.invoke(prompt).content
+            response_email = self.chat.invoke(prompt, site="basic_email").content
             end_time = time.time()
             
             print(f"  ✓ Email generated successfully ({len(response_email)} chars, {end_time - start_time:.2f}s)")
@@ -1197,6 +1372,12 @@ class EmailGenerator:
         """Parse multiple email templates from a single file with improved structure recognition."""
         log_section("PARSING EMAIL TEMPLATES")
         
+        # Parsed templates are memoized per file version; every caller gets its own copy
+        memo_key = (os.path.abspath(email_template_path), os.path.getmtime(email_template_path))
+        if memo_key in self._parsed_templates:
+            print("  ✓ Using previously parsed templates")
+            return copy.deepcopy(self._parsed_templates[memo_key])
+        
         # Load the template file
         with open(email_template_path, 'r') as file:
             content = file.read()
@@ -1251,77 +1432,147 @@ class EmailGenerator:
                 print(f"  - Name and role fixed to: Matis, Business Development Lead")
         
         print(f"\nTotal templates parsed: {len(templates)}")
-        return templates
+        self._parsed_templates = {memo_key: templates}
+        return copy.deepcopy(templates)
 
     # NEW METHOD: Deep analysis of each template
     def analyze_templates(self, templates):
         """Analyze templates to understand their purpose, tone, and use cases."""
         log_section("ANALYZING TEMPLATES")
         
-        template_analysis = []
-        
-        for i, template in enumerate(templates):
-            print(f"\nAnalyzing template {i+1}: {template.get('title', 'Unnamed')}")
+        analysis_prompt = PromptTemplate(
+            input_variables=["title", "subject", "body"],
+            template="""
+            Analyze this email template for sponsorship requests:
             
-            analysis_prompt = PromptTemplate(
-                input_variables=["template"],
-                template="""
-                Analyze this email template for sponsorship requests:
-                
-                TITLE: {template[title]}
-                SUBJECT: {template[subject]}
-                BODY:
-                {template[body]}
-                
-                Please provide:
-                1. Primary purpose (monetary donation, parts donation, service request, etc.)
-                2. Target audience characteristics (industry type, company size, etc.)
-                3. Key persuasion techniques used
-                4. Tone analysis (formal, friendly, urgent, etc.)
-                5. Structure breakdown (how information is organized)
-                6. Strongest elements that should be preserved
-                7. Elements that could be improved
-                8. Keywords that signal when this template would be most appropriate
-                
-                Note: This template already uses the fixed introduction "My name is Matis, and I am the Business Development Lead for CU Hyperloop" which must be preserved in all emails.
-                """
-            )
+            TITLE: {title}
+            SUBJECT: {subject}
+            BODY:
+            {body}
             
-            try:
-                prompt = analysis_prompt.format(template=template)
-                
-                start_time = time.time()
-                analysis_result = self.llm.invoke(prompt).content
-                end_time = time.time()
-                
-                template['analysis'] = analysis_result
-                template_analysis.append({
-                    'template': template,
-                    'analysis': analysis_result
-                })
-                
-                print(f"  ✓ Analysis complete ({end_time - start_time:.2f}s)")
-                preview = analysis_result[:150] + "..." if len(analysis_result) > 150 else analysis_result
-                print(f"  Preview: {preview}")
-                
-            except Exception as e:
-                print(f"  ❌ Error analyzing template: {str(e)}")
-                template['analysis'] = f"Analysis failed: {str(e)}"
+            Please provide:
+            1. Primary purpose (monetary donation, parts donation, service request, etc.)
+            2. Target audience characteristics (industry type, company size, etc.)
+            3. Key persuasion techniques used
+            4. Tone analysis (formal, friendly, urgent, etc.)
+            5. Structure breakdown (how information is organized)
+            6. Strongest elements that should be preserved
+            7. Elements that could be improved
+            8. Keywords that signal when this template would be most appropriate
+            
+            Note: This template already uses the fixed introduction "My name is Matis, and I am the Business Development Lead for CU Hyperloop" which must be preserved in all emails.
+            """
+        )
+        
+        def analyze(template):
+            start_time = time.time()
+            analysis_result = self.chat.invoke(analysis_prompt.format(
+                title=template['title'], subject=template['subject'], body=template['body']
+            ), site="template_analysis").content
+            return analysis_result, time.time() - start_time
+        
+        # All templates are analyzed concurrently through the shared, rate-limited LLM executor
+        outcomes = map_llm(analyze, templates, cached=True)
+        
+        template_analysis = []
+        for i, (template, (outcome, error)) in enumerate(zip(templates, outcomes)):
+            print(f"\nAnalyzed template {i+1}: {template.get('title', 'Unnamed')}")
+            if error is not None:
+                print(f"  ❌ Error analyzing template: {str(error)}")
+                template['analysis'] = f"Analysis failed: {str(error)}"
                 template_analysis.append({
                     'template': template,
-                    'analysis': f"Analysis failed: {str(e)}"
+                    'analysis': f"Analysis failed: {str(error)}"
                 })
+                continue
             
-            # Add delay between API calls
-            time.sleep(2)
+            analysis_result, elapsed = outcome
+            template['analysis'] = analysis_result
+            template_analysis.append({
+                'template': template,
+                'analysis': analysis_result
+            })
+            
+            print(f"  ✓ Analysis complete ({elapsed:.2f}s)")
+            preview = analysis_result[:150] + "..." if len(analysis_result) > 150 else analysis_result
+            print(f"  Preview: {preview}")
         
         return template_analysis
 
+    def load_template_analyses(self, templates):
+        """Return template analyses, reusing those stored on the Template model by body hash."""
+        log_section("LOADING TEMPLATE ANALYSES")
+        if not self.providers.persistent:
+            # Replayed or synthetic analyses must not end up on the Template model
+            return self.analyze_templates(templates)
+        return load_template_analyses(templates, self.analyze_templates)
+
     # NEW METHOD: Enhanced template selection with relationship intelligence
-    def select_best_template_with_relationship_data(self, templates_analysis, company_info, relationship_intelligence):
-        """Select the most appropriate template based on company research and relationship intelligence."""
+    def select_best_template_with_relationship_data(self, templates_analysis, company_info, relationship_intelligence, strategy=None):
+        """
+        Select the most appropriate template based on company research and relationship intelligence.
+        strategy "embedding" ranks templates locally by vector similarity and only asks the LLM to
+        break near-ties; "llm" sends everything to the LLM ranking prompt.
+        """
         log_section("SELECTING BEST TEMPLATE WITH RELATIONSHIP INTELLIGENCE")
         
+        strategy = strategy or TEMPLATE_SELECTION_STRATEGY
+        if strategy == "llm" or len(templates_analysis) < 2:
+            return self._select_template_with_llm(templates_analysis, company_info, relationship_intelligence)
+        
+        try:
+            start_time = time.time()
+            summary = self._relationship_summary(company_info, relationship_intelligence)
+            ranking = self.template_selector.rank(templates_analysis, summary)
+            end_time = time.time()
+        except Exception as e:
+            print(f"  ❌ Error ranking templates by embedding: {str(e)}")
+            print("  Falling back to LLM ranking...")
+            return self._select_template_with_llm(templates_analysis, company_info, relationship_intelligence)
+        
+        print(f"  ✓ Embedding ranking complete ({(end_time - start_time) * 1000:.0f}ms):")
+        for r in ranking:
+            print(f"    {r['score']:.4f}  {r['title']}")
+        
+        # Close calls go to the LLM, limited to the templates within the margin of the best score
+        close = [r for r in ranking if ranking[0]['score'] - r['score'] <= TEMPLATE_TIE_MARGIN]
+        if len(close) > 1:
+            print(f"  {len(close)} templates within {TEMPLATE_TIE_MARGIN} of the best score, asking LLM to break the tie")
+            candidates = [templates_analysis[r['index']] for r in close]
+            selection = self._select_template_with_llm(candidates, company_info, relationship_intelligence)
+            selection['ranking'] = ranking
+            return selection
+        
+        best = ranking[0]
+        selected_template = templates_analysis[best['index']]['template']
+        print(f"  Selected template: {selected_template.get('title', 'Unnamed')}")
+        reasoning = (
+            f"Selected '{best['title']}' as the template most similar to this company's profile, "
+            f"partnership value propositions and communication recommendations. Similarity scores: "
+            + ", ".join(f"{r['title']} ({r['score']:.3f})" for r in ranking)
+        )
+        return {
+            'template': selected_template,
+            'reasoning': reasoning,
+            'ranking': ranking
+        }
+
+    def _relationship_summary(self, company_info, relationship_intelligence):
+        """Condense company research and relationship intelligence into text for template ranking."""
+        decision_makers = relationship_intelligence.get('decision_makers', {})
+        partnership_potential = relationship_intelligence.get('partnership_potential', {})
+        cultural_assessment = relationship_intelligence.get('cultural_assessment', {})
+        
+        parts = [
+            company_info,
+            partnership_potential.get('value_propositions', ''),
+            cultural_assessment.get('recommendations', ''),
+            cultural_assessment.get('decision_style', ''),
+        ] + [profile.get('communication_style', '') for profile in decision_makers.values()]
+        return "\n\n".join(p for p in parts if isinstance(p, str) and p)
+
+    def _select_template_with_llm(self, templates_analysis, company_info, relationship_intelligence):
+        """Ask the LLM to rank the given templates and pick the best one."""
         # Extract components of relationship intelligence
         decision_makers = relationship_intelligence.get('decision_makers', {})
         partnership_potential = relationship_intelligence.get('partnership_potential', {})
@@ -1379,6 +1630,7 @@ class EmailGenerator:
             
             First, rank the templates from most to least appropriate with clear reasoning based on the relationship intelligence.
             Then provide your final selection of the single best template, with a detailed explanation of why it's optimal given what we know about the specific people who will read it.
+            End your answer with a line in exactly this form: FINAL SELECTION: TEMPLATE <number>
             
             Note: All templates use the fixed introduction "My name is Matis, and I am the Business Development Lead for CU Hyperloop" which must be maintained.
             """
@@ -1403,20 +1655,23 @@ class EmailGenerator:
             
             print("Determining best template match with relationship intelligence...")
             start_time = time.time()
-            selection_result = self.llm.invoke(prompt).content
+            selection_result = self.chat.invoke(prompt, site="template_selection").content
             end_time = time.time()
             
             print(f"  ✓ Relationship-informed template selection complete ({end_time - start_time:.2f}s)")
             
-            # Extract the final selection
-            # This is a simplified approach - could be enhanced with regex pattern matching
+            # Extract the final selection, falling back to title matching
             selected_index = 0  # Default to first template
-            for i, ta in enumerate(templates_analysis):
-                title = ta['template'].get('title', '')
-                if f"TEMPLATE {i+1}" in selection_result and title in selection_result:
-                    if "best template" in selection_result.lower() and title.lower() in selection_result.lower():
-                        selected_index = i
-                        break
+            final_match = re.search(r'FINAL SELECTION:\s*TEMPLATE\s*(\d+)', selection_result, re.IGNORECASE)
+            if final_match and 1 <= int(final_match.group(1)) <= len(templates_analysis):
+                selected_index = int(final_match.group(1)) - 1
+            else:
+                for i, ta in enumerate(templates_analysis):
+                    title = ta['template'].get('title', '')
+                    if f"TEMPLATE {i+1}" in selection_result and title in selection_result:
+                        if "best template" in selection_result.lower() and title.lower() in selection_result.lower():
+                            selected_index = i
+                            break
             
             selected_template = templates_analysis[selected_index]['template']
             print(f"  Selected template: {selected_template.get('title', 'Unnamed')}")
@@ -1435,7 +1690,7 @@ class EmailGenerator:
             }
 
     # NEW METHOD: Enhanced email generation with relationship intelligence
-    def generate_relationship_informed_email(self, template_selection, club_info, company_info, relationship_intelligence):
+    def generate_relationship_informed_email(self, template_selection, club_info, company_info, relationship_intelligence, on_token=None):
             """Generate a tailored email using relationship intelligence."""
             log_section("GENERATING RELATIONSHIP-INFORMED EMAIL")
             
@@ -1470,21 +1725,29 @@ class EmailGenerator:
             value_propositions = partnership_potential.get('value_propositions', '')
             recommendations = cultural_assessment.get('recommendations', '')
             
-            # Format club info for better readability
-            formatted_club_info = "\n\n".join([f"QUESTION: {q}\nANSWER: {a}" for q, a in club_info.items()])
+            # Select the club facts relevant to this company, template and value propositions
+            formatted_club_info = self.club_context.select(
+                club_info,
+                query="\n".join([
+                    selected_template.get('subject', ''),
+                    company_info,
+                    value_propositions
+                ]),
+                label="relationship-informed email"
+            )
             
             generation_prompt = PromptTemplate(
-                input_variables=["template", "selection_reasoning", "company_info", "club_info", 
+                input_variables=["template_title", "template_subject", "template_body", "selection_reasoning", "company_info", "club_info", 
                             "primary_recipient", "communication_style", 
                             "value_propositions", "recommendations"],
                 template="""
                 Create a highly personalized sponsorship email for CU Hyperloop using this selected template
                 and comprehensive relationship intelligence:
                 
-                TEMPLATE TITLE: {template[title]}
-                TEMPLATE SUBJECT: {template[subject]}
+                TEMPLATE TITLE: {template_title}
+                TEMPLATE SUBJECT: {template_subject}
                 TEMPLATE BODY:
-                {template[body]}
+                {template_body}
                 
                 TEMPLATE SELECTION REASONING:
                 {selection_reasoning}
@@ -1526,7 +1789,9 @@ class EmailGenerator:
             
             try:
                 prompt = generation_prompt.format(
-                    template=selected_template,
+                    template_title=selected_template['title'],
+                    template_subject=selected_template['subject'],
+                    template_body=selected_template['body'],
                     selection_reasoning=selection_reasoning,
                     company_info=company_info,
                     club_info=formatted_club_info,
@@ -1538,7 +1803,16 @@ class EmailGenerator:
                 
                 print("Generating relationship-informed email...")
                 start_time = time.time()
-                generated_email = self.llm.invoke(prompt).content
+                if on_token is None:
+                    generated_email = self.chat.invoke(prompt, site="final_email").content
+                else:
+                    # Stream so callers can show the email as Gemini writes it
+                    chunks = []
+                    for chunk in llm_stream(self.llm.stream, prompt):
+                        if chunk.content:
+                            chunks.append(chunk.content)
+                            on_token(chunk.content)
+                    generated_email = "".join(chunks)
                 end_time = time.time()
                 
                 print(f"  ✓ Relationship-informed email generated successfully ({len(generated_email)} chars, {end_time - start_time:.2f}s)")
@@ -1598,79 +1872,121 @@ class EmailGenerator:
                 [Note: This is a simplified fallback email due to an error in generation: {str(e)}]
                 """
                 
-    # NEW METHOD: Enhanced workflow that incorporates relationship intelligence
-    def relationship_intelligence_workflow(self, company_name, sponsorship_packet_path, fdp_path, email_template_path):
-        """A comprehensive workflow that incorporates relationship intelligence for deeper personalization."""
-        try:
-            log_section("STARTING RELATIONSHIP INTELLIGENCE WORKFLOW")
-            
-            # Steps 1-2: Load club context and extract info (same as existing code)
-            print("\nStep 1: Loading club context")
+    def load_club_info(self, sponsorship_packet_path, fdp_path, email_template_path):
+        """Load club context (only when some answers aren't cached) and extract club information."""
+        # Resolved before hashing, so the cache key sees the same files the index is built from
+        sponsorship_packet_path, fdp_path, email_template_path = self.resolve_document_paths(
+            sponsorship_packet_path, fdp_path, email_template_path
+        )
+        club_info_cache = ClubInfoCache([sponsorship_packet_path, fdp_path], location=self.providers.cache)
+        club_retriever = None
+        if club_info_cache.missing(CLUB_QUESTIONS):
             club_retriever, _ = self.load_club_context(
                 sponsorship_packet_path=sponsorship_packet_path,
                 fdp_path=fdp_path,
                 email_template_path=email_template_path
             )
+        else:
+            print("  ✓ All club answers cached, skipping document loading")
+        
+        return self.extract_club_info(
+            club_retriever=club_retriever,
+            club_info_cache=club_info_cache
+        )
+
+    # NEW METHOD: Enhanced workflow that incorporates relationship intelligence
+    def relationship_intelligence_workflow(self, company_name, sponsorship_packet_path, fdp_path, email_template_path, on_event=None, on_token=None, should_stop=None):
+        """
+        A comprehensive workflow that incorporates relationship intelligence for deeper personalization.
+        Steps run as a dependency graph: club info, template analysis, company research, decision
+        makers and cultural assessment are independent and run in parallel; partnership analysis
+        waits on club info, and template selection and email generation wait on everything they use.
+        on_event receives per-step progress events (see WorkflowGraph) and on_token each streamed
+        chunk of the final email. Once should_stop returns True no further steps are started.
+        """
+        try:
+            log_section("STARTING RELATIONSHIP INTELLIGENCE WORKFLOW")
+            engine = self.relationship_engine
+            
+            # Template selection and generation consume the size-capped form
+            def relationship_intelligence(decision_makers, partnership_potential, cultural_assessment):
+                return compact_relationship_intelligence({
+                    'decision_makers': decision_makers,
+                    'partnership_potential': partnership_potential,
+                    'cultural_assessment': cultural_assessment
+                })
             
-            print("\nStep 2: Extracting club information")
-            club_info = self.extract_club_info(club_retriever=club_retriever)
-            
-            # Step 3: Parse and analyze email templates (same as enhanced workflow)
-            print("\nStep 3: Parsing email templates")
-            templates = self.parse_email_templates(email_template_path)
-            
-            print("\nStep 4: Analyzing email templates")
-            templates_analysis = self.analyze_templates(templates)
-            
-            # Step 5: Basic company research (same as existing code)
-            print("\nStep 5: Researching company")
-            company_info = self.research_company(company_name=company_name)
-            
-            # NEW STEP 6: Relationship Intelligence Analysis
-            log_section("RELATIONSHIP INTELLIGENCE ANALYSIS")
+            graph = WorkflowGraph("relationship_intelligence", on_event=on_event, should_stop=should_stop)
             
-            # Profile decision makers
-            print("\nStep 6a: Profiling decision makers")
-            decision_makers = self.relationship_engine.profile_decision_makers(company_name)
+            # Steps 1-2: Load club context and extract info
+            graph.add_step("club_info", lambda: self.load_club_info(
+                sponsorship_packet_path, fdp_path, email_template_path
+            ))
             
-            # Analyze strategic partnership potential
-            print("\nStep 6b: Analyzing strategic partnership potential")
-            partnership_analysis = self.relationship_engine.analyze_strategic_partnership_potential(
-                company_name, club_info
+            # Steps 3-4: Parse and analyze email templates
+            graph.add_step("templates", lambda: self.parse_email_templates(email_template_path))
+            graph.add_step(
+                "templates_analysis",
+                lambda templates: self.load_template_analyses(templates),
+                depends_on=["templates"]
             )
             
-            # Assess cultural compatibility
-            print("\nStep 6c: Assessing cultural compatibility")
-            cultural_assessment = self.relationship_engine.assess_cultural_compatibility(company_name)
+            # Step 5: Basic company research
+            graph.add_step("company_info", lambda: self.research_company(company_name=company_name))
             
-            # Combine all relationship intelligence
-            relationship_intelligence = {
-                'decision_makers': decision_makers,
-                'partnership_potential': partnership_analysis,
-                'cultural_assessment': cultural_assessment
-            }
+            # Step 6: Relationship intelligence analysis
+            graph.add_step("decision_makers", lambda: engine.profile_decision_makers(company_name))
+            graph.add_step("cultural_assessment", lambda: engine.assess_cultural_compatibility(company_name))
+            graph.add_step(
+                "partnership_potential",
+                lambda club_info: engine.analyze_strategic_partnership_potential(company_name, club_info),
+                depends_on=["club_info"]
+            )
+            graph.add_step(
+                "relationship_intelligence",
+                relationship_intelligence,
+                depends_on=["decision_makers", "partnership_potential", "cultural_assessment"]
+            )
             
             # Step 7: Select best template with relationship intelligence
-            print("\nStep 7: Selecting best template with relationship intelligence")
-            template_selection = self.select_best_template_with_relationship_data(
-                templates_analysis, 
-                company_info,
-                relationship_intelligence
+            graph.add_step(
+                "template_selection",
+                lambda templates_analysis, company_info, relationship_intelligence:
+                    self.select_best_template_with_relationship_data(
+                        templates_analysis,
+                        company_info,
+                        relationship_intelligence
+                    ),
+                depends_on=["templates_analysis", "company_info", "relationship_intelligence"]
             )
             
             # Step 8: Generate tailored email using relationship intelligence
-            print("\nStep 8: Generating relationship-informed email")
-            response_email = self.generate_relationship_informed_email(
-                template_selection, 
-                club_info, 
-                company_info,
-                relationship_intelligence
+            graph.add_step(
+                "email",
+                lambda template_selection, club_info, company_info, relationship_intelligence:
+                    self.generate_relationship_informed_email(
+                        template_selection,
+                        club_info,
+                        company_info,
+                        relationship_intelligence,
+                        on_token=on_token
+                    ),
+                depends_on=["template_selection", "club_info", "company_info", "relationship_intelligence"]
             )
             
+            response_email = graph.run()["email"]
+            
+            stats = self.embeddings.stats()
+            print(f"\nEmbedding cache: {stats['hits']} hits, {stats['misses']} misses, {stats['embedding_calls']} embedding calls")
+            stats = self.search.stats()
+            print(f"Search cache: {stats['hits']} hits, {stats['misses']} misses")
+            stats = self.chat.stats()
+            print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses, ~{stats['tokens_saved']} tokens saved")
+            
             log_section("RELATIONSHIP INTELLIGENCE WORKFLOW COMPLETED SUCCESSFULLY")
             return response_email
             
         except Exception as e:
             error_msg = f"Error in relationship intelligence workflow: {str(e)}"
             print(f"\n❌ {error_msg}")
-            return f"An error occurred during the relationship-enhanced email generation process: {str(e)}"
\ No newline at end of file
+            return f"{WORKFLOW_ERROR_PREFIX}: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,116 @@
+import time
+
+import pytest
+
+from app.services import cacheStore
+from app.services.cacheStore import BLOB_NAMESPACE, CacheLocation, CacheStore
+
+LONG_TEXT = "generic role profile " * 100
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def location(request, tmp_path):
+    return CacheLocation(request.param, str(tmp_path))
+
+
+def _record_writes(store):
+    """Wrap store's backend so every set() is recorded as (namespace, key)."""
+    backend = store.location.get_backend()
+    writes = []
+    original = backend.set
+
+    def set(namespace, key, entry):
+        writes.append((namespace, key))
+        original(namespace, key, entry)
+
+    backend.set = set
+    return writes
+
+
+def test_round_trip(location):
+    store = CacheStore("llm", location=location)
+    value = {'text': LONG_TEXT, 'items': [1, "two", {'three': 3.0}], 'short': "x"}
+
+    store.set("key", value)
+
+    assert store.get("key") == value
+    assert store.get("missing", default="fallback") == "fallback"
+
+
+@pytest.mark.parametrize("codec", ["zstd", "gzip", "none"])
+def test_every_codec_round_trips(location, monkeypatch, codec):
+    monkeypatch.setenv("CACHE_COMPRESSION", codec)
+    store = CacheStore("llm", location=location)
+
+    store.set("key", {'text': LONG_TEXT})
+
+    assert store.get("key") == {'text': LONG_TEXT}
+
+
+def test_expired_entries_read_as_missing(location):
+    store = CacheStore("llm", location=location)
+
+    store.set("old", "value", ttl=60, stored_at=time.time() - 120)
+    store.set("new", "value", ttl=60)
+
+    assert store.get("old") is None
+    assert store.get("new") == "value"
+
+
+def test_shared_text_is_stored_once_and_not_rewritten(location):
+    store = CacheStore("contacts", location=location)
+    store.set("acme", {'profile': LONG_TEXT})
+    writes = _record_writes(store)
+
+    store.set("globex", {'profile': LONG_TEXT})
+
+    assert writes == [("contacts", "globex")]
+    assert store.get("globex") == {'profile': LONG_TEXT}
+
+
+def test_entry_with_an_evicted_blob_reads_as_missing(location):
+    store = CacheStore("contacts", location=location)
+    store.set("acme", {'profile': LONG_TEXT})
+
+    for digest in list(_blob_digests(store)):
+        store.blobs.delete(digest)
+
+    assert store.get("acme") is None
+
+
+def _blob_digests(store):
+    blobs = {}
+    cacheStore._extract_blobs({'profile': LONG_TEXT}, blobs)
+    return blobs.keys()
+
+
+def test_evict_keeps_the_most_recently_written(location):
+    store = CacheStore("search", max_entries=2, location=location)
+    now = time.time()
+    for i, key in enumerate(["a", "b", "c"]):
+        store.set(key, key, stored_at=now - 30 + i)
+
+    store.evict()
+
+    assert store.get("a") is None
+    assert store.get("b") == "b"
+    assert store.get("c") == "c"
+
+
+def test_touch_refreshes_only_live_entries(location):
+    store = CacheStore(BLOB_NAMESPACE, location=location)
+    store.set("live", "text")
+    store.set("expired", "text", ttl=1, stored_at=time.time() - 10)
+
+    assert store.touch("live")
+    assert not store.touch("expired")
+    assert not store.touch("missing")
+
+
+def test_locations_do_not_share_entries(tmp_path):
+    live = CacheStore("llm", location=CacheLocation("sqlite", str(tmp_path / "live")))
+    fake = CacheStore("llm", location=CacheLocation("sqlite", str(tmp_path / "fake")))
+
+    live.set("key", "live value")
+
+    assert fake.get("key") is None
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from app import test2
+from app.services.concurrency import llm_limiter, search_limiter
+from app.services.providers import build_providers
+from app.services.vectorIndex import unload_indexes
+
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """An EmailGenerator on fake providers with its caches under tmp_path and no quota waits."""
+    for prefix in ["FAKE_LLM", "FAKE_SEARCH", "FAKE_EMBEDDING"]:
+        monkeypatch.setenv(f"{prefix}_LATENCY_MS", "0")
+        monkeypatch.setenv(f"{prefix}_ERROR_RATE", "0")
+    monkeypatch.setattr(test2, "VECTOR_BACKEND", "chroma")
+    for limiter in [llm_limiter, search_limiter]:
+        monkeypatch.setattr(limiter, "rate", 1e6)
+        monkeypatch.setattr(limiter, "capacity", 10 ** 6)
+        monkeypatch.setattr(limiter, "tokens", float(10 ** 6))
+
+    providers = build_providers(
+        mode="fake",
+        llm_model="gemini-test",
+        embedding_model=test2.EMBEDDING_MODEL,
+        cache_root=str(tmp_path / "cache")
+    )
+    unload_indexes()
+    yield test2.EmailGenerator(providers)
+    unload_indexes()
+
+
+@pytest.fixture
+def documents():
+    return {
+        'sponsorship_packet_path': os.path.join(DATA_DIR, "fixtures", "sponsorship.txt"),
+        'fdp_path': os.path.join(DATA_DIR, "fixtures", "fdp.txt"),
+        'email_template_path': os.path.join(DATA_DIR, "emailTemplates.txt")
+    }
+
+
+def test_workflow_runs_end_to_end_on_fake_providers(generator, documents):
+    events = []
+    email = generator.relationship_intelligence_workflow("Acme Tunneling", on_event=events.append, **documents)
+
+    assert email and not email.startswith(test2.WORKFLOW_ERROR_PREFIX)
+    assert not [e for e in events if e['event'] == 'failed']
+    finished = {e['step'] for e in events if e['event'] == 'finished'}
+    assert {"club_info", "company_info", "decision_makers", "template_selection", "email"} <= finished
+    assert generator.providers.llm.behaviour.calls > 0
+    assert generator.providers.search.behaviour.calls > 0
+
+
+def test_repeat_run_is_served_from_the_caches(generator, documents):
+    generator.relationship_intelligence_workflow("Acme Tunneling", **documents)
+    llm_calls = generator.providers.llm.behaviour.calls
+    search_calls = generator.providers.search.behaviour.calls
+
+    email = generator.relationship_intelligence_workflow("Acme Tunneling", **documents)
+
+    assert not email.startswith(test2.WORKFLOW_ERROR_PREFIX)
+    # Only the final email is generated again; it is never cached (LLM_CACHE_TTL_POLICIES)
+    assert generator.providers.llm.behaviour.calls == llm_calls + 1
+    assert generator.providers.search.behaviour.calls == search_calls
+
+
+def test_fake_mode_leaves_the_process_environment_alone(tmp_path, monkeypatch):
+    monkeypatch.delenv("HYPERMAIL_CACHE_DIR", raising=False)
+    monkeypatch.setenv("CACHE_BACKEND", "postgres")
+
+    providers = build_providers(mode="fake", llm_model="gemini-test", cache_root=str(tmp_path))
+
+    assert "HYPERMAIL_CACHE_DIR" not in os.environ
+    assert os.environ["CACHE_BACKEND"] == "postgres"
+    assert providers.cache.root == str(tmp_path)
+    assert providers.cache.backend == "sqlite"
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from app.services import freshness
+from app.services.cacheStore import CacheLocation, company_key
+from app.services.freshness import (
+    DAY, REFRESH_RETRY_SECONDS, IncrementalRun, ResearchCache, result_set_hash
+)
+
+QUERIES = ["acme sponsorship manager", "acme marketing director"]
+
+
+class _Inline:
+    """Stands in for refresh_executor, running each refresh straight away."""
+
+    def submit(self, fn):
+        fn()
+
+
+@pytest.fixture
+def research(tmp_path, monkeypatch):
+    monkeypatch.setattr(freshness, "refresh_executor", _Inline())
+    return ResearchCache("contacts", location=CacheLocation("sqlite", str(tmp_path)))
+
+
+def _store(research, value, age):
+    research.store.set(company_key("Acme"), value, stored_at=time.time() - age)
+
+
+def _age(research):
+    return time.time() - research.store.get_entry(company_key("Acme"))['stored_at']
+
+
+def test_missing_research_reads_as_none(research):
+    assert research.get("Acme", refresh=lambda previous: pytest.fail("refreshed")) is None
+
+
+def test_fresh_research_is_served_without_a_refresh(research):
+    _store(research, {'profiles': {"Jane Doe": {}}}, age=DAY)
+
+    value = research.get("Acme", refresh=lambda previous: pytest.fail("refreshed"))
+
+    assert value == {'profiles': {"Jane Doe": {}}}
+
+
+def test_stale_research_is_served_and_refreshed(research):
+    _store(research, {'profiles': {"Jane Doe": {}}}, age=research.fresh_for + DAY)
+    refreshed = []
+
+    value = research.get("Acme", refresh=refreshed.append)
+
+    assert value == {'profiles': {"Jane Doe": {}}}
+    assert refreshed == [value]
+
+
+def test_unchanged_searches_keep_the_previous_research_as_fresh(research):
+    previous = {'profiles': {}, 'search_hashes': {query: "same" for query in QUERIES}}
+    _store(research, previous, age=research.fresh_for + DAY)
+
+    assert research.keep_previous("Acme", previous, {query: "same" for query in QUERIES}, QUERIES)
+    assert _age(research) < 60
+
+
+def test_changed_searches_do_not_keep_the_previous_research(research):
+    previous = {'profiles': {}, 'search_hashes': {query: "same" for query in QUERIES}}
+
+    assert not research.keep_previous("Acme", previous, {QUERIES[0]: "same", QUERIES[1]: "new"}, QUERIES)
+
+
+def test_failed_searches_keep_the_previous_research_and_back_off(research):
+    previous = {'profiles': {}, 'search_hashes': {query: "same" for query in QUERIES}}
+    _store(research, previous, age=research.fresh_for + DAY)
+
+    assert research.keep_previous("Acme", previous, {QUERIES[0]: "same"}, QUERIES)
+
+    # Fresh again until the retry is due, so requests meanwhile don't each schedule a refresh
+    age = _age(research)
+    assert research.fresh_for - REFRESH_RETRY_SECONDS - 60 < age < research.fresh_for
+    assert research.get("Acme", refresh=lambda previous: pytest.fail("refreshed")) == previous
+
+
+def test_incremental_run_reuses_steps_whose_inputs_are_unchanged():
+    first = IncrementalRun()
+    first.step("profile:Jane", ["Jane", "Acme"], lambda: "profile of Jane")
+    first.step("profile:John", ["John", "Acme"], lambda: "profile of John")
+
+    second = IncrementalRun({'steps': first.steps})
+    assert second.step("profile:Jane", ["Jane", "Acme"], lambda: pytest.fail("recomputed")) == "profile of Jane"
+    assert second.step("profile:John", ["John", "Globex"], lambda: "new profile") == "new profile"
+    assert (second.reused, second.recomputed) == (["profile:Jane"], ["profile:John"])
+
+
+def test_result_set_hash_ignores_order_and_whitespace():
+    results = [
+        {'link': "https://acme.com/team", 'snippet': "Jane Doe, sponsorship manager", 'title': "Team"},
+        {'link': "https://acme.com/about", 'snippet': "About Acme", 'title': "About"},
+    ]
+    reordered = [
+        {'link': "https://acme.com/about", 'snippet': "About  Acme", 'title': "About us"},
+        {'link': "https://acme.com/team", 'snippet': "Jane Doe, sponsorship manager", 'title': "Team"},
+    ]
+
+    assert result_set_hash(results) == result_set_hash(reordered)
+    assert result_set_hash(results) != result_set_hash(results[:1])
@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from app import test2
+from app.models import GenerationJob
+from app.services import generationJobs
+from app.services.generationJobs import (
+    JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, cancel_job, claim_next_job, enqueue_job, run_job
+)
+
+
+@pytest.fixture(autouse=True)
+def jobs_table():
+    with connection.schema_editor() as editor:
+        editor.create_model(GenerationJob)
+    yield
+    with connection.schema_editor() as editor:
+        editor.delete_model(GenerationJob)
+
+
+def _running(company_name, heartbeat_age, attempts=1, worker="old-worker", **fields):
+    """A job claimed by worker whose last heartbeat was heartbeat_age seconds ago."""
+    at = timezone.now() - timedelta(seconds=heartbeat_age)
+    return GenerationJob.objects.create(
+        company_name=company_name, status='running', worker=worker,
+        started_at=at, heartbeat_at=at, attempts=attempts, **fields
+    )
+
+
+def test_claims_the_oldest_queued_job():
+    older = enqueue_job("Acme")
+    enqueue_job("Globex")
+
+    job = claim_next_job("worker-1")
+
+    assert job.pk == older.pk
+    job.refresh_from_db()
+    assert (job.status, job.worker, job.attempts) == ('running', "worker-1", 1)
+    assert job.heartbeat_at is not None
+
+
+def test_nothing_to_claim():
+    assert claim_next_job("worker-1") is None
+
+
+def test_job_with_a_live_lease_is_left_alone():
+    _running("Acme", heartbeat_age=JOB_LEASE_SECONDS / 2)
+
+    assert claim_next_job("worker-1") is None
+
+
+def test_job_with_an_expired_lease_is_reclaimed():
+    abandoned = _running("Acme", heartbeat_age=JOB_LEASE_SECONDS + 60)
+
+    job = claim_next_job("worker-1")
+
+    assert job.pk == abandoned.pk
+    assert (job.worker, job.attempts) == ("worker-1", 2)
+
+
+def test_job_claimed_before_heartbeats_ages_from_started_at():
+    job = _running("Acme", heartbeat_age=JOB_LEASE_SECONDS + 60)
+    GenerationJob.objects.filter(pk=job.pk).update(heartbeat_at=None)
+
+    assert claim_next_job("worker-1").pk == job.pk
+
+
+def test_job_out_of_attempts_fails_instead_of_being_reclaimed():
+    job = _running("Acme", heartbeat_age=JOB_LEASE_SECONDS + 60, attempts=JOB_MAX_ATTEMPTS)
+
+    assert claim_next_job("worker-1") is None
+    job.refresh_from_db()
+    assert job.status == 'failed'
+    assert job.finished_at is not None
+
+
+def test_cancel_queued_and_running_jobs():
+    queued = enqueue_job("Acme")
+    running = _running("Globex", heartbeat_age=0)
+
+    cancel_job(queued.pk)
+    cancel_job(running.pk)
+
+    queued.refresh_from_db()
+    running.refresh_from_db()
+    assert queued.status == 'cancelled'
+    assert (running.status, running.cancel_requested) == ('running', True)
+
+
+def test_run_job_stores_the_email_and_progress(monkeypatch):
+    def generate(company_name, on_event=None, should_stop=None):
+        on_event({'event': 'started', 'step': 'email'})
+        on_event({'event': 'finished', 'step': 'email', 'seconds': 0.1})
+        return f"Hello {company_name}"
+
+    monkeypatch.setattr(generationJobs, "generate_relationship_email", generate)
+    enqueue_job("Acme")
+    job = claim_next_job("worker-1")
+
+    run_job(job)
+
+    job.refresh_from_db()
+    assert (job.status, job.result) == ('succeeded', "Hello Acme")
+    assert [e['event'] for e in job.progress] == ['started', 'finished']
+
+
+def test_run_job_fails_on_a_workflow_error_message(monkeypatch):
+    monkeypatch.setattr(
+        generationJobs, "generate_relationship_email",
+        lambda company_name, **kwargs: f"{test2.WORKFLOW_ERROR_PREFIX} search failed"
+    )
+    enqueue_job("Acme")
+    job = claim_next_job("worker-1")
+
+    run_job(job)
+
+    job.refresh_from_db()
+    assert job.status == 'failed'
+    assert job.error.startswith(test2.WORKFLOW_ERROR_PREFIX)
+
+
+def test_run_job_does_not_overwrite_a_job_reclaimed_by_another_worker(monkeypatch):
+    enqueue_job("Acme")
+    job = claim_next_job("worker-1")
+
+    def generate(company_name, **kwargs):
+        # The lease lapsed meanwhile and another worker took the job over
+        GenerationJob.objects.filter(pk=job.pk).update(worker="worker-2", attempts=2)
+        return "Hello Acme"
+
+    monkeypatch.setattr(generationJobs, "generate_relationship_email", generate)
+
+    run_job(job)
+
+    job.refresh_from_db()
+    assert (job.status, job.worker, job.result) == ('running', "worker-2", None)
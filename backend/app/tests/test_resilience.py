@@ -0,0 +1,194 @@
+import pytest
+
+from app.services import resilience
+from app.services.resilience import CircuitBreaker, CircuitOpenError, Dependency
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class _Response:
+    def __init__(self, status, headers):
+        self.status = status
+        self.headers = headers
+
+
+class HttpError(Exception):
+    def __init__(self, status, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.resp = _Response(status, headers or {})
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(resilience.time, "sleep", sleeps.append)
+    return sleeps
+
+
+def _failing(*errors, result="ok"):
+    """A function raising each of errors in turn, then returning result."""
+    remaining = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if remaining:
+            raise remaining.pop(0)
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+def test_errors_are_classified():
+    assert resilience.is_retryable(ServiceUnavailable())
+    assert resilience.is_retryable(HttpError(503))
+    assert resilience.is_rate_limited(HttpError(429))
+    assert resilience.is_rate_limited(ResourceExhausted("Quota exceeded"))
+    assert not resilience.is_retryable(HttpError(400))
+    assert not resilience.is_retryable(ValueError("bad prompt"))
+
+
+def test_retry_after_reads_the_header_or_the_message():
+    assert resilience.retry_after(HttpError(429, {"Retry-After": "7"})) == 7.0
+    assert resilience.retry_after(ResourceExhausted("429 Quota exceeded, please retry in 12.5s")) == 12.5
+    assert resilience.retry_after(ResourceExhausted("429 Quota exceeded")) is None
+
+
+def test_transient_failures_are_retried(sleeps):
+    dependency = Dependency("test", max_concurrency=1, max_attempts=3)
+    fn = _failing(ServiceUnavailable(), ServiceUnavailable())
+
+    assert dependency.call(fn) == "ok"
+    assert len(fn.calls) == 3
+    assert len(sleeps) == 2
+
+
+def test_gives_up_after_max_attempts(sleeps):
+    dependency = Dependency("test", max_concurrency=1, max_attempts=2)
+    fn = _failing(ServiceUnavailable(), ServiceUnavailable(), ServiceUnavailable())
+
+    with pytest.raises(ServiceUnavailable):
+        dependency.call(fn)
+    assert len(fn.calls) == 2
+
+
+def test_rate_limits_wait_for_the_suggested_delay(sleeps):
+    dependency = Dependency("test", max_concurrency=1)
+    fn = _failing(HttpError(429, {"Retry-After": "3"}))
+
+    assert dependency.call(fn) == "ok"
+    assert sleeps == [3.0]
+
+
+def test_rate_limits_longer_than_the_max_delay_are_raised_at_once(sleeps):
+    dependency = Dependency("test", max_concurrency=1)
+    fn = _failing(HttpError(429, {"Retry-After": str(resilience.RETRY_MAX_DELAY + 60)}))
+
+    with pytest.raises(HttpError):
+        dependency.call(fn)
+    assert len(fn.calls) == 1
+    assert sleeps == []
+
+
+def test_bad_requests_are_not_retried_or_counted_against_the_circuit(sleeps):
+    dependency = Dependency("test", max_concurrency=1)
+    fn = _failing(ValueError("bad prompt"))
+
+    with pytest.raises(ValueError):
+        dependency.call(fn)
+    assert len(fn.calls) == 1
+    assert dependency.breaker.state()['recent_failures'] == 0
+
+
+def test_circuit_opens_then_closes_after_a_successful_probe(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=10, min_calls=4, cooldown=30)
+    for success in [True, False, False, False]:
+        breaker.before_call()
+        breaker.record(success)
+
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == 30
+
+    clock.now += 31
+    breaker.before_call()
+    # Only one probe at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record(True)
+
+    breaker.before_call()
+    assert breaker.state() == {'open': False, 'recent_calls': 0, 'recent_failures': 0}
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_rate=0.5, window=10, min_calls=2, cooldown=30)
+    for _ in range(2):
+        breaker.record(False)
+
+    clock.now += 31
+    breaker.before_call()
+    breaker.record(False)
+
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.retry_in() == 30
+
+
+def test_open_circuit_fails_fast_without_calling(clock):
+    dependency = Dependency("test", max_concurrency=1)
+    dependency.breaker.opened_at = clock.now
+    fn = _failing()
+
+    with pytest.raises(CircuitOpenError):
+        dependency.ensure_available()
+    with pytest.raises(CircuitOpenError):
+        dependency.call(fn)
+    assert fn.calls == []
+
+
+def test_stream_is_retried_only_before_its_first_item(sleeps):
+    dependency = Dependency("test", max_concurrency=1, max_attempts=3)
+    attempts = []
+
+    def stream(fail_midway):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ServiceUnavailable()
+        yield "Hello"
+        if fail_midway:
+            raise ServiceUnavailable()
+        yield " world"
+
+    assert list(dependency.stream(stream, False)) == ["Hello", " world"]
+    assert len(attempts) == 2
+
+    attempts.clear()
+    received = []
+    with pytest.raises(ServiceUnavailable):
+        for item in dependency.stream(stream, True):
+            received.append(item)
+    assert received == ["Hello"]
+    assert len(attempts) == 2
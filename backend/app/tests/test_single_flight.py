@@ -0,0 +1,140 @@
+import threading
+import time
+
+import pytest
+
+from app.services.singleFlight import SingleFlight, flight_key
+
+
+@pytest.fixture
+def flights(tmp_path, monkeypatch):
+    # Locks and shared results live under the cache root
+    monkeypatch.setenv("HYPERMAIL_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("CACHE_BACKEND", "file")
+    return SingleFlight("test")
+
+
+def _in_thread(fn):
+    """Run fn in a thread; returns a function that joins it and returns (result, error)."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome['result'] = fn()
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+
+    def join():
+        thread.join(5)
+        assert not thread.is_alive()
+        return outcome.get('result'), outcome.get('error')
+
+    return join
+
+
+def _wait_for_joiners(flights, key, count):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        call = flights._calls.get(key)
+        if call is not None and len(call.stop_checks) >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError("callers never joined the flight")
+
+
+def test_concurrent_callers_share_one_run(flights):
+    key = flight_key("email", "acme")
+    release = threading.Event()
+    runs = []
+
+    def work(publish, should_stop):
+        runs.append(1)
+        release.wait(5)
+        return "email"
+
+    leader = _in_thread(lambda: flights.do(key, work))
+    _wait_for_joiners(flights, key, 1)
+    follower = _in_thread(lambda: flights.do(key, work))
+    _wait_for_joiners(flights, key, 2)
+    release.set()
+
+    assert leader() == ("email", None)
+    assert follower() == ("email", None)
+    assert len(runs) == 1
+
+
+def test_errors_reach_every_caller(flights):
+    key = flight_key("email", "acme")
+    release = threading.Event()
+
+    def work(publish, should_stop):
+        release.wait(5)
+        raise RuntimeError("search failed")
+
+    leader = _in_thread(lambda: flights.do(key, work))
+    _wait_for_joiners(flights, key, 1)
+    follower = _in_thread(lambda: flights.do(key, work))
+    _wait_for_joiners(flights, key, 2)
+    release.set()
+
+    assert isinstance(leader()[1], RuntimeError)
+    assert isinstance(follower()[1], RuntimeError)
+    assert key not in flights._calls
+
+
+def test_listeners_receive_published_events(flights):
+    events = []
+
+    def work(publish, should_stop):
+        publish({'event': 'started', 'step': 'company_info'})
+        publish({'event': 'finished', 'step': 'company_info'})
+        return "email"
+
+    flights.do(flight_key("email", "acme"), work, listener=events.append)
+
+    assert [e['event'] for e in events] == ['started', 'finished']
+
+
+def test_run_stops_only_once_every_caller_gave_up(flights):
+    key = flight_key("email", "acme")
+    release = threading.Event()
+    leader_cancelled, follower_cancelled = threading.Event(), threading.Event()
+    seen = []
+
+    def work(publish, should_stop):
+        release.wait(5)
+        seen.append(should_stop())
+        follower_cancelled.set()
+        seen.append(should_stop())
+        return "email"
+
+    leader = _in_thread(lambda: flights.do(key, work, should_stop=leader_cancelled.is_set))
+    _wait_for_joiners(flights, key, 1)
+    follower = _in_thread(lambda: flights.do(key, work, should_stop=follower_cancelled.is_set))
+    _wait_for_joiners(flights, key, 2)
+    leader_cancelled.set()
+    release.set()
+
+    leader()
+    follower()
+    assert seen == [False, True]
+
+
+def test_result_finished_by_another_worker_is_reused(flights):
+    key = flight_key("email", "acme")
+    # What the leader in another worker leaves behind once its run finishes
+    flights.results.set(key, {'result': "email from another worker", 'finished_at': time.time() + 60})
+
+    result = flights.do(key, lambda publish, should_stop: pytest.fail("ran again"))
+
+    assert result == "email from another worker"
+
+
+def test_result_finished_before_the_request_is_not_reused(flights):
+    key = flight_key("email", "acme")
+    flights.results.set(key, {'result': "old email", 'finished_at': time.time() - 60})
+
+    assert flights.do(key, lambda publish, should_stop: "new email") == "new email"
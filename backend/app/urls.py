@@ -27,6 +27,8 @@ router.register(r'templates', TemplateViewSet)
 router.register(r'emails', EmailViewSet)
 router.register(r'prompts', PromptViewSet)
 router.register(r'emailGenerator', EmailGeneratorViewSet, basename='emailgenerator')
+router.register(r'generationJobs', GenerationJobViewSet)
+router.register(r'health', HealthViewSet, basename='health')
 
 # The API URLs are determined automatically by the router
 urlpatterns = [
@@ -1,22 +1,28 @@
-from rest_framework import viewsets, filters, status
+from rest_framework import viewsets, filters, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
 from rest_framework import status
 import os
+import json
+import time
 
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
-from .models import Company, Template, Email, Prompt
+from .models import Company, Template, Email, Prompt, GenerationJob
 from .serializers import *
-from .test2 import EmailGenerator 
 
 import os
 
-from .services.generateEmails import GenerateEmails
+from .services.concurrency import gemini, google_search
+from .services.generationJobs import cancel_job, enqueue_job
+from .services.resilience import CircuitOpenError
+from .services.warmState import get_company_finder, readiness
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BaseRenderer
 from django.conf import settings
 import traceback
 
@@ -25,6 +31,36 @@ import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+# Seconds between keep-alive comments on an idle event stream
+STREAM_HEARTBEAT_SECONDS = 15
+
+# Seconds between reads of a streamed job's row
+STREAM_POLL_SECONDS = float(os.environ.get("STREAM_POLL_SECONDS", "0.5"))
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets EventSource clients (Accept: text/event-stream) through content negotiation."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses are rendered here; the stream itself bypasses renderers
+        return json.dumps(data)
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def circuit_open_response(error):
+    """503 with Retry-After so clients back off while a dependency's circuit is open."""
+    return Response(
+        {'error': str(error), 'dependency': error.dependency},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(int(error.retry_after) + 1)}
+    )
+
+
 class EmailGeneratorViewSet(viewsets.ViewSet):
     """
     ViewSet for generating sponsorship emails using Gemini AI.
@@ -59,10 +95,11 @@ class EmailGeneratorViewSet(viewsets.ViewSet):
                 'details': request.data.get('details', '')
             }
             
-            # Initialize email generator
-            email_generator = GenerateEmails()
+            # Reuse the worker's email generator (Gemini client is configured once per process)
+            email_generator = get_company_finder()
             
             # Generate companies
+            gemini.ensure_available()
             results = email_generator.generateEmails(params)
             
             # Save companies to database
@@ -99,6 +136,8 @@ class EmailGeneratorViewSet(viewsets.ViewSet):
             
             return Response(results, status=status.HTTP_200_OK)
             
+        except CircuitOpenError as e:
+            return circuit_open_response(e)
         except Exception as e:
             traceback.print_exc()
             return Response(
@@ -297,62 +336,158 @@ class PromptViewSet(viewsets.ModelViewSet):
     def generate_email(self, request):
         """
         API endpoint to generate an email based on company name and other parameters.
+        
+        Queues a GenerationJob for the generation worker and returns it immediately (202);
+        poll /api/generationJobs/<id>/ for its progress and result, or follow it with stream_email.
         """
         try:
             # Get company name from request data
             print(f"Received request: {request.data}")
             company_name = request.data.get('company_name')
-            # company_name = "hydro engineering consultant"
             if not company_name:
                 return Response(
                     {"error": "Company name is required"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            print("generating info for company");            
-            # Set paths to your files 
-            SPONSORSHIP_PACKET_PATH = "./data/sponsorShipPacket.pdf"
-            FDP_PATH = "./data/fdp.pdf"
-            # EMAIL_TEMPLATE_PATH = "./data/emailTemplates.pdf"
-            EMAIL_TEMPLATE_PATH = "./data/emailTemplates.txt"
-
-            import os
-            # Check if files exist
-            print(f"Sponsorship packet exists: {os.path.exists(SPONSORSHIP_PACKET_PATH)}")
-            print(f"FDP exists: {os.path.exists(FDP_PATH)}")
-            print(f"Email template exists: {os.path.exists(EMAIL_TEMPLATE_PATH)}")
-           
-            # Initialize the email generator
-            try:
-                email_generator = EmailGenerator()
-                print("Successfully created EmailGenerator instance")
-            except Exception as e:
-                error_msg = f"Failed to initialize EmailGenerator: {str(e)}"
-                print(f"Error: {error_msg}")
-                return Response(
-                    {"error": error_msg}, 
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
-                
-            # Generate the email
-            # response_email = email_generator.sponsorship_email_workflow(
-            #     company_name=company_name,
-            #     sponsorship_packet_path=SPONSORSHIP_PACKET_PATH,
-            #     fdp_path=FDP_PATH,
-            #     email_template_path=EMAIL_TEMPLATE_PATH
-            # )
-
-            response_email = email_generator.relationship_intelligence_workflow(
-                company_name=company_name,
-                sponsorship_packet_path=SPONSORSHIP_PACKET_PATH,
-                fdp_path=FDP_PATH,
-                email_template_path=EMAIL_TEMPLATE_PATH
-            )
             
-            # Return the generated email
-            return Response({"email": response_email}, status=status.HTTP_200_OK)
+            # Shed load straight away rather than queueing a workflow that can only fall back
+            gemini.ensure_available()
+            google_search.ensure_available()
             
+            job = enqueue_job(company_name)
+            return Response(GenerationJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+            
+        except CircuitOpenError as e:
+            return circuit_open_response(e)
         except Exception as e:
             return Response(
                 {"error": str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+    @action(detail=False, methods=['get'], renderer_classes=[EventStreamRenderer])
+    def stream_email(self, request):
+        """
+        Server-sent events for generating an email: step started/finished/failed events while
+        the workflow runs, token events as the final email streams, then a done event with the
+        complete email (or an error event).
+        
+        The workflow runs as a GenerationJob in the generation worker; this view only follows
+        the job row, so a web worker never runs it. Pass job_id to follow an existing job
+        instead of queueing one for company_name. A job queued here is cancelled if the
+        client disconnects before it finishes.
+        """
+        job_id = request.query_params.get('job_id')
+        company_name = request.query_params.get('company_name')
+        if job_id:
+            job = get_object_or_404(GenerationJob, pk=job_id)
+        elif not company_name:
+            return Response(
+                {"error": "Company name is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        else:
+            try:
+                gemini.ensure_available()
+                google_search.ensure_available()
+            except CircuitOpenError as e:
+                return circuit_open_response(e)
+            job = enqueue_job(company_name)
+        
+        def stream():
+            sent_events, sent_chars = 0, 0
+            finished = False
+            last_write = time.monotonic()
+            try:
+                yield format_sse('job', {'event': 'job', 'id': str(job.id)})
+                while True:
+                    current = GenerationJob.objects.get(pk=job.pk)
+                    chunks = [format_sse(event['event'], event) for event in current.progress[sent_events:]]
+                    sent_events = len(current.progress)
+                    
+                    partial = current.partial_result or ""
+                    if len(partial) > sent_chars:
+                        chunks.append(format_sse('token', {'event': 'token', 'text': partial[sent_chars:]}))
+                        sent_chars = len(partial)
+                    
+                    if current.status == 'succeeded':
+                        chunks.append(format_sse('done', {'event': 'done', 'email': current.result}))
+                    elif current.status in ['failed', 'cancelled']:
+                        chunks.append(format_sse('error', {'event': 'error', 'error': current.error or current.status}))
+                    finished = current.status in ['succeeded', 'failed', 'cancelled']
+                    
+                    if chunks:
+                        yield "".join(chunks)
+                        last_write = time.monotonic()
+                    elif time.monotonic() - last_write >= STREAM_HEARTBEAT_SECONDS:
+                        # Also how a disconnected client is noticed when nothing else is sent
+                        yield ": keep-alive\n\n"
+                        last_write = time.monotonic()
+                    if finished:
+                        return
+                    time.sleep(STREAM_POLL_SECONDS)
+            finally:
+                if not finished and not job_id:
+                    # The client went away; don't keep spending quota on an email nobody is waiting for
+                    print(f"Stream for job {job.id} closed early, cancelling it")
+                    cancel_job(job.pk)
+        
+        response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class GenerationJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                           mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    API endpoint for background email generation.
+    
+    create:
+        Queue a generation job for company_name and return its id immediately (202)
+    retrieve:
+        Poll a job's status, per-step progress and, once finished, the generated email
+    cancel:
+        Cancel a queued job, or stop a running one before its next step
+    """
+    queryset = GenerationJob.objects.all().order_by('-created_at')
+    serializer_class = GenerationJobSerializer
+    permission_classes = [AllowAny]
+    
+    def create(self, request, *args, **kwargs):
+        company_name = request.data.get('company_name')
+        if not company_name:
+            return Response(
+                {"error": "Company name is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        job = enqueue_job(company_name)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a queued job, or stop a running one before its next step"""
+        job = self.get_object()
+        cancel_job(job.pk)
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class HealthViewSet(viewsets.ViewSet):
+    """
+    Worker health checks.
+    
+    ready:
+        Report whether this worker's warm state (clients, club context, templates) has loaded
+    """
+    permission_classes = [AllowAny]
+    
+    @action(detail=False, methods=['get'])
+    def ready(self, request):
+        """Return 200 once the warm state is loaded, 503 while it is still loading."""
+        state = readiness()
+        return Response(
+            state,
+            status=status.HTTP_200_OK if state['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
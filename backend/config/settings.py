@@ -84,6 +84,11 @@ GEMINI_MODEL =  os.environ.get('GEMINI_MODEL')
 GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
 GOOGLE_CSE_ID =  os.environ.get('GOOGLE_CSE_ID')
 
+# Club documents used for email generation
+SPONSORSHIP_PACKET_PATH = os.environ.get('SPONSORSHIP_PACKET_PATH', './data/sponsorShipPacket.pdf')
+FDP_PATH = os.environ.get('FDP_PATH', './data/fdp.pdf')
+EMAIL_TEMPLATE_PATH = os.environ.get('EMAIL_TEMPLATE_PATH', './data/emailTemplates.txt')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [],
     'DEFAULT_PERMISSION_CLASSES': [
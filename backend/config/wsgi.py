@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# Warm each server worker's clients and club context in the background when enabled. This
+# runs in the server entrypoint only (after gunicorn forks, or in runserver's serving
+# process), never for management commands such as migrate.
+from app.services.warmState import preload_enabled, start_preload
+
+if preload_enabled():
+    start_preload()
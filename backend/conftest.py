@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+import django
+
+# Settings for tests run with plain pytest (python -m pytest from backend/)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("ALLOWED_HOSTS", "localhost")
+
+from django.conf import settings  # noqa: E402
+
+# Tests never touch the app's Postgres database: the few that need tables create them
+# in a throwaway SQLite file (shared by every thread, unlike an in-memory database)
+settings.DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(tempfile.mkdtemp(prefix="hypermail-test-db-"), "db.sqlite3"),
+    }
+}
+django.setup()
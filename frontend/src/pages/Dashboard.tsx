@@ -15,8 +15,8 @@ import {
   Modal
 } from "@mantine/core";
 import { useNavigate } from "react-router";
-import { useState, useEffect } from "react";
-import generateEmail from "../services/emailServices";
+import { useState, useEffect, useRef } from "react";
+import { streamEmail, submitEmailJob, waitForEmailJob } from "../services/emailServices";
 import { useLocation } from "react-router";
 import { sendEmail } from "../api";
 import LangGraphVisualizer from "../pages/LangGraphVisualizer";
@@ -40,6 +40,10 @@ export default function Dashboard() {
   const [error, setError] = useState<string | null>(null);
   const [activeTab, setActiveTab] = useState("generate");
   const [showConfirmation, setShowConfirmation] = useState(false);
+  // Workflow steps reported by the email stream, in the order they started
+  const [steps, setSteps] = useState<{ step: string; status: string; seconds?: number }[]>([]);
+  const [streamedEmail, setStreamedEmail] = useState("");
+  const closeStream = useRef<(() => void) | null>(null);
 
   
   // Visualizer states
@@ -64,28 +68,62 @@ export default function Dashboard() {
     setSubject(`Partnership Opportunity with CU Hyperloop: ${company.name}`);
   };
 
+  // Close any open email stream when leaving the page (the server cancels its job)
+  useEffect(() => () => closeStream.current?.(), []);
+
+  // Resolves to the email streamed from the server, showing each step and the text as it is written
+  const streamGeneratedEmail = (company: string) =>
+    new Promise<string>((resolve, reject) => {
+      closeStream.current = streamEmail(company, {
+        onStep: (event) =>
+          setSteps((prev) => [
+            ...prev.filter((s) => s.step !== event.step),
+            { step: event.step, status: event.event, seconds: event.seconds },
+          ]),
+        onToken: (text) => setStreamedEmail((prev) => prev + text),
+        onDone: resolve,
+        onError: (message, connectionLost) => {
+          if (!connectionLost) {
+            reject(new Error(message));
+            return;
+          }
+          // The stream dropped (and its job with it); fall back to queueing a job and polling it
+          console.warn(message);
+          setStreamedEmail("");
+          submitEmailJob(company)
+            .then((job) => waitForEmailJob(job.id))
+            .then(resolve, reject);
+        },
+      });
+    });
+
   const handleGenerateEmail = async () => {
     if (!companyName) {
       setError("Please enter a company name");
       return;
     }
 
-    // Open the visualization popup before starting the API call
-    setVisualizerOpen(true);
+    // The arcade visualizer covers the live progress, so only show it when asked for
+    setVisualizerOpen(preferArcadeMode);
+    setSteps([]);
+    setStreamedEmail("");
     setIsGenerating(true);
     setIsLoading(true);
     setError(null);
     setKeepVisualizerOpen(false);
 
     try {
-      // Make the actual API call
-      const generatedEmail = await generateEmail(companyName);
+      // Stream progress while the generation worker runs the job; poll it if streaming is unavailable
+      const generatedEmail = typeof EventSource === "undefined"
+        ? await waitForEmailJob((await submitEmailJob(companyName)).id)
+        : await streamGeneratedEmail(companyName);
+      closeStream.current = null;
       
-      // Set the email content when API call completes
-      setEmailContent(generatedEmail.email);
+      // Set the email content when the job completes
+      setEmailContent(generatedEmail);
       
       // Auto-fill the email body with generated content
-      setBody(generatedEmail.email);
+      setBody(generatedEmail);
       
       // Signal the visualizer that generation is complete
       setIsGenerating(false);
@@ -100,6 +138,7 @@ export default function Dashboard() {
       
       setIsLoading(false);
     } catch (err: any) {
+      closeStream.current = null;
       setError(err.message || "Failed to generate email");
       setIsLoading(false);
       setIsGenerating(false);
@@ -297,6 +336,15 @@ export default function Dashboard() {
                         <Text mt="md">
                           Generating email... This may take a minute...
                         </Text>
+                        {steps.map(({ step, status, seconds }) => (
+                          <Text key={step} size="sm">
+                            {status === "started" ? "…" : status === "failed" ? "✗" : "✓"} {step}
+                            {seconds !== undefined ? ` (${seconds.toFixed(1)}s)` : ""}
+                          </Text>
+                        ))}
+                        {streamedEmail && (
+                          <div className="email-content">{streamedEmail}</div>
+                        )}
                       </div>
                     ) : (
                       <div className="email-content">{emailContent}</div>
@@ -1,7 +1,7 @@
 import { Container, Card, Textarea, Button, TextInput, Loader } from "@mantine/core";
 import { useNavigate } from 'react-router';
 import { useState, useEffect, useRef } from 'react';
-import generateEmail from '../services/emailServices';
+import { submitEmailJob, waitForEmailJob } from '../services/emailServices';
 
 export default function EmailFeedback() {
     const [companyName, setCompanyName] = useState("");
@@ -22,8 +22,8 @@ export default function EmailFeedback() {
       setError(null);
       
       try {
-        const generatedEmail = await generateEmail(companyName);
-        setEmailContent(generatedEmail.email);
+        const job = await submitEmailJob(companyName);
+        setEmailContent(await waitForEmailJob(job.id));
       } catch (err: any) {
         setError(err.message || "Failed to generate email");
       } finally {
@@ -1,28 +1,75 @@
 // emailServices.ts
-const generateEmail = async (company: string) => {
-  console.log(`Sending request for company: ${company}`);
-  try {
-    const response = await fetch('http://localhost:8000/api/prompts/generate_email/', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({ company_name: company }),
-    });
+// Queue a background generation job; resolves to the job (with its id) immediately
+export const submitEmailJob = async (company: string) => {
+  const response = await fetch('http://localhost:8000/api/generationJobs/', {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({ company_name: company }),
+  });
 
-    console.log(`Response status: ${response.status}`);
-    if (!response.ok) {
-      const errorText = await response.text();
-      console.log('Error response:', errorText);
-      throw new Error('Failed to generate email');
-    }
+  if (!response.ok) {
+    throw new Error('Failed to queue email generation');
+  }
+  return response.json();
+};
 
-    const data = await response.json();
-    return data;
-  } catch (error) {
-    console.error('Error generating email:', error);
-    throw error;
+// Poll a job for its status, per-step progress and, once succeeded, the email in `result`
+export const getEmailJob = async (jobId: string) => {
+  const response = await fetch(`http://localhost:8000/api/generationJobs/${jobId}/`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch email generation job');
+  }
+  return response.json();
+};
+
+// Poll a job until it finishes; resolves to the generated email or rejects with the job's error
+export const waitForEmailJob = async (jobId: string, onUpdate?: (job: any) => void, intervalMs = 1000) => {
+  for (;;) {
+    const job = await getEmailJob(jobId);
+    onUpdate?.(job);
+    if (job.status === 'succeeded') {
+      return job.result as string;
+    }
+    if (job.status === 'failed' || job.status === 'cancelled') {
+      throw new Error(job.error || `Email generation ${job.status}`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
   }
 };
 
-export default generateEmail
\ No newline at end of file
+type StreamHandlers = {
+  onStep?: (event: { event: string; step: string; seconds?: number; error?: string }) => void;
+  onToken?: (text: string) => void;
+  onDone?: (email: string) => void;
+  // connectionLost is true when the stream itself failed rather than the job
+  onError?: (error: string, connectionLost: boolean) => void;
+};
+
+// Stream workflow progress and the email as it is written; returns a function that closes the stream
+export const streamEmail = (company: string, handlers: StreamHandlers) => {
+  const source = new EventSource(
+    `http://localhost:8000/api/prompts/stream_email/?company_name=${encodeURIComponent(company)}`
+  );
+
+  ['started', 'finished', 'failed'].forEach((name) =>
+    source.addEventListener(name, (e) => handlers.onStep?.(JSON.parse((e as MessageEvent).data)))
+  );
+  source.addEventListener('token', (e) => handlers.onToken?.(JSON.parse((e as MessageEvent).data).text));
+  source.addEventListener('done', (e) => {
+    handlers.onDone?.(JSON.parse((e as MessageEvent).data).email);
+    source.close();
+  });
+  source.addEventListener('error', (e) => {
+    const data = (e as MessageEvent).data;
+    if (data) {
+      handlers.onError?.(JSON.parse(data).error, false);
+    } else {
+      handlers.onError?.('Connection to the email stream was lost', true);
+    }
+    source.close();
+  });
+
+  return () => source.close();
+};